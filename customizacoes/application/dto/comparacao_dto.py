@@ -2,7 +2,7 @@
 DTOs for comparison operations.
 """
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
@@ -31,6 +31,8 @@ class ComparacaoResponseDTO:
     tabela: str
     registro_atual: RegistroComparacaoDTO
     registro_anterior: Optional[RegistroComparacaoDTO] = None
+    # Line/word diff of SENTENCA (SQL) or DESCRICAO (Report/FV), see customizacoes/diferencas.py
+    diff: Optional[Dict[str, Any]] = None
 
 
 
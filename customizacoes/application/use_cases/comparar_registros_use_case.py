@@ -7,6 +7,7 @@ from ...domain.repositories.aud_repository import (
 )
 from ...domain.repositories.dependencia_repository import IDependenciaRepository
 from ..dto.comparacao_dto import RegistroComparacaoDTO, ComparacaoResponseDTO
+from ...diferencas import obter_diff
 
 
 class CompararRegistrosUseCase:
@@ -27,7 +28,8 @@ class CompararRegistrosUseCase:
     def execute(
         self, 
         tabela: str, 
-        registro_id: str
+        registro_id: str,
+        modo: str = 'texto'
     ) -> ComparacaoResponseDTO:
         """
         Execute the use case.
@@ -35,6 +37,7 @@ class CompararRegistrosUseCase:
         Args:
             tabela: Table name (AUD_SQL, AUD_REPORT, AUD_FV)
             registro_id: Record identifier
+            modo: Diff mode, 'texto' or 'semantico' (normalized SQL tokens, AUD_SQL only)
             
         Returns:
             ComparacaoResponseDTO with current and previous records
@@ -42,7 +45,7 @@ class CompararRegistrosUseCase:
         tabela = tabela.upper()
         
         if tabela == 'AUD_SQL':
-            return self._compare_sql(registro_id)
+            return self._compare_sql(registro_id, modo)
         elif tabela == 'AUD_REPORT':
             return self._compare_report(registro_id)
         elif tabela == 'AUD_FV':
@@ -50,7 +53,19 @@ class CompararRegistrosUseCase:
         else:
             raise ValueError(f"Tabela inválida: {tabela}")
     
-    def _compare_sql(self, codsentenca: str) -> ComparacaoResponseDTO:
+    @staticmethod
+    def _diff(
+        anterior: Optional[RegistroComparacaoDTO],
+        atual: RegistroComparacaoDTO,
+        campo: str,
+        modo: str = 'texto'
+    ) -> Optional[dict]:
+        """Server-side line/word (or SQL token) diff of the compared text field, cached by content hashes."""
+        if anterior is None:
+            return None
+        return obter_diff(getattr(anterior, campo), getattr(atual, campo), modo=modo)
+    
+    def _compare_sql(self, codsentenca: str, modo: str = 'texto') -> ComparacaoResponseDTO:
         """Compare AUD_SQL records."""
         records = self._aud_sql_repo.get_all_by_id(codsentenca)
         
@@ -97,7 +112,8 @@ class CompararRegistrosUseCase:
         return ComparacaoResponseDTO(
             tabela='AUD_SQL',
             registro_atual=registro_atual,
-            registro_anterior=registro_anterior
+            registro_anterior=registro_anterior,
+            diff=self._diff(registro_anterior, registro_atual, 'sentenca', modo)
         )
     
     def _compare_report(self, aud_id: str) -> ComparacaoResponseDTO:
@@ -130,7 +146,8 @@ class CompararRegistrosUseCase:
         return ComparacaoResponseDTO(
             tabela='AUD_REPORT',
             registro_atual=registro_atual,
-            registro_anterior=registro_anterior
+            registro_anterior=registro_anterior,
+            diff=self._diff(registro_anterior, registro_atual, 'descricao')
         )
     
     def _compare_fv(self, aud_id: int) -> ComparacaoResponseDTO:
@@ -167,7 +184,8 @@ class CompararRegistrosUseCase:
         return ComparacaoResponseDTO(
             tabela='AUD_FV',
             registro_atual=registro_atual,
-            registro_anterior=registro_anterior
+            registro_anterior=registro_anterior,
+            diff=self._diff(registro_anterior, registro_atual, 'descricao')
         )
 
 
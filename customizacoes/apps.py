@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class CustomizacoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'customizacoes'
\ No newline at end of file
+    name = 'customizacoes'
+
+    def ready(self):
+        # Registra os signals que mantêm o índice do grafo, os termos de busca, a
+        # timeline e a versão da exportação
+        from . import busca, exportacao, grafo, timeline  # noqa: F401
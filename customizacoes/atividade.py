@@ -0,0 +1,183 @@
+# customizacoes/atividade.py
+"""
+Atividade agregada das tabelas AUD: criações e modificações por (dia, usuário,
+tabela, coligada), para os gráficos de quem alterou o quê e quando.
+
+Os eventos saem das versões gravadas em AUD_VERSAO pelo import_aud: a primeira
+versão de um registro conta a criação (RECCREATEDBY/RECCREATEDON) e, se já vier
+modificado, a modificação; cada versão seguinte conta uma modificação
+(RECMODIFIEDBY/RECMODIFIEDON) quando a data de modificação difere da versão
+anterior. As datas de origem só decidem o dia do evento.
+
+A soma é incremental na ordem de importação: a marca guarda o último ID de
+AUD_VERSAO já somado, e cada execução (task do Celery beat ou comando
+atualizar_atividade) lê só as versões com ID maior, em lotes que avançam a marca
+na mesma transação. Um registro importado depois com datas antigas entra na
+próxima execução. Versões importadas há menos de MARGEM_IMPORTACAO esperam a
+execução seguinte, para que um ID menor ainda não gravado por outra transação
+não fique para trás da marca.
+
+A linha da marca é travada (SELECT ... FOR UPDATE) em cada lote: duas execuções
+ao mesmo tempo (beat atrasado + comando manual) se revezam em vez de somar o
+mesmo lote duas vezes. Como AUD_VERSAO guarda todo o histórico, a reconstrução
+completa (reconstruir_atividade) chega às mesmas contagens.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import AtividadeDiaria, AtividadeMarca, AudVersao, TAMANHO_LOTE_IN
+
+# Versões de AUD_VERSAO lidas por transação
+TAMANHO_LOTE_PADRAO = 5000
+
+# Chave da marca: a tabela lida
+TABELA_ORIGEM = AudVersao._meta.db_table
+
+# Idade mínima de uma versão para ser somada (transações de importação ainda abertas)
+MARGEM_IMPORTACAO = timedelta(minutes=1)
+
+ESCALAS = {
+    'dia': F('dia'),
+    'semana': TruncWeek('dia'),
+    'mes': TruncMonth('dia'),
+}
+
+# Parâmetro de agrupamento da API -> campo de AtividadeDiaria
+AGRUPAMENTOS = {'usuario': 'usuario', 'tabela': 'tabela', 'coligada': 'codcoligada'}
+
+COLUNAS_EVENTOS = (
+    'id', 'tabela', 'versao', 'codcoligada', 'reccreatedby', 'reccreatedon',
+    'recmodifiedby', 'recmodifiedon', 'modificado_antes',
+)
+
+
+def _somar_lote(linhas):
+    """Soma os eventos de um lote de versões: {(tabela, dia, usuário, coligada): [criações, modificações]}"""
+    contagens = {}
+
+    def adicionar(tabela, data, usuario, coligada, posicao):
+        chave = (tabela, timezone.localtime(data).date(), (usuario or '')[:100], coligada or 0)
+        contagens.setdefault(chave, [0, 0])[posicao] += 1
+
+    for (_, tabela, versao, coligada, criado_por, criado_em,
+         modificado_por, modificado_em, modificado_antes) in linhas:
+        if versao == 1:
+            if criado_em:
+                adicionar(tabela, criado_em, criado_por, coligada, 0)
+            if modificado_em and modificado_em != criado_em:
+                adicionar(tabela, modificado_em, modificado_por or criado_por, coligada, 1)
+        elif modificado_em and modificado_em != modificado_antes:
+            adicionar(tabela, modificado_em, modificado_por or criado_por, coligada, 1)
+    return contagens
+
+
+def _gravar_contagens(contagens):
+    """Soma as contagens às linhas existentes de AtividadeDiaria e cria as que faltam"""
+    tabelas = {tabela for tabela, _, _, _ in contagens}
+    dias = sorted({dia for _, dia, _, _ in contagens})
+    existentes = {}
+    for inicio in range(0, len(dias), TAMANHO_LOTE_IN):
+        for linha in AtividadeDiaria.objects.filter(tabela__in=tabelas, dia__in=dias[inicio:inicio + TAMANHO_LOTE_IN]):
+            existentes[(linha.tabela, linha.dia, linha.usuario, linha.codcoligada)] = linha
+
+    novas, alteradas = [], []
+    for (tabela, dia, usuario, coligada), (criacoes, modificacoes) in contagens.items():
+        linha = existentes.get((tabela, dia, usuario, coligada))
+        if linha is None:
+            novas.append(AtividadeDiaria(
+                dia=dia, usuario=usuario, tabela=tabela, codcoligada=coligada,
+                criacoes=criacoes, modificacoes=modificacoes,
+            ))
+        else:
+            linha.criacoes += criacoes
+            linha.modificacoes += modificacoes
+            alteradas.append(linha)
+    AtividadeDiaria.objects.bulk_create(novas, batch_size=300)
+    AtividadeDiaria.objects.bulk_update(alteradas, ['criacoes', 'modificacoes'], batch_size=300)
+
+
+def _ler_versoes(ultimo_id, tamanho_lote):
+    """Próximo lote de versões depois da marca, parando antes da primeira importada dentro da margem"""
+    versoes = AudVersao.objects.filter(id__gt=ultimo_id)
+    limite = versoes.filter(
+        data_importacao__gt=timezone.now() - MARGEM_IMPORTACAO
+    ).aggregate(limite=Min('id'))['limite']
+    if limite is not None:
+        versoes = versoes.filter(id__lt=limite)
+    anterior = AudVersao.objects.filter(
+        tabela=OuterRef('tabela'), registro_id=OuterRef('registro_id'), versao=OuterRef('versao') - 1,
+    ).values('recmodifiedon')[:1]
+    return list(
+        versoes.annotate(modificado_antes=Subquery(anterior))
+        .order_by('id').values_list(*COLUNAS_EVENTOS)[:tamanho_lote]
+    )
+
+
+def atualizar_atividade(tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Soma à atividade as versões importadas depois da marca. Retorna
+    {tabela AUD: versões lidas}.
+    """
+    AtividadeMarca.objects.get_or_create(tabela=TABELA_ORIGEM, defaults={'ultimo_id': 0})
+    lidas = {}
+    while True:
+        with transaction.atomic():
+            # A trava da marca serializa execuções simultâneas; a segunda lê a marca já avançada
+            marca = AtividadeMarca.objects.select_for_update().get(tabela=TABELA_ORIGEM)
+            linhas = _ler_versoes(marca.ultimo_id, tamanho_lote)
+            if not linhas:
+                return lidas
+            _gravar_contagens(_somar_lote(linhas))
+            marca.ultimo_id = linhas[-1][0]
+            marca.save(update_fields=['ultimo_id', 'atualizado_em'])
+        for linha in linhas:
+            lidas[linha[1]] = lidas.get(linha[1], 0) + 1
+        if len(linhas) < tamanho_lote:
+            return lidas
+
+
+def reconstruir_atividade(tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Apaga a atividade, volta a marca ao início e soma de novo todas as versões de AUD_VERSAO"""
+    AtividadeMarca.objects.get_or_create(tabela=TABELA_ORIGEM, defaults={'ultimo_id': 0})
+    with transaction.atomic():
+        marca = AtividadeMarca.objects.select_for_update().get(tabela=TABELA_ORIGEM)
+        AtividadeDiaria.objects.all().delete()
+        marca.ultimo_id = 0
+        marca.save(update_fields=['ultimo_id', 'atualizado_em'])
+    return atualizar_atividade(tamanho_lote)
+
+
+def consultar_atividade(dia_inicio, dia_fim, escala='dia', agrupar=(), tabela=None, usuario=None, coligada=None):
+    """
+    Soma criações e modificações por período (dia, semana ou mês) e pelos
+    agrupamentos pedidos ('usuario', 'tabela', 'coligada'), a partir da atividade diária.
+    """
+    queryset = AtividadeDiaria.objects.filter(dia__gte=dia_inicio, dia__lte=dia_fim)
+    if tabela:
+        queryset = queryset.filter(tabela=tabela)
+    if usuario is not None:
+        queryset = queryset.filter(usuario=usuario)
+    if coligada is not None:
+        queryset = queryset.filter(codcoligada=coligada)
+
+    campos = [AGRUPAMENTOS[nome] for nome in agrupar]
+    linhas = (
+        queryset.annotate(periodo=ESCALAS[escala])
+        .values('periodo', *campos)
+        .annotate(criacoes=Sum('criacoes'), modificacoes=Sum('modificacoes'))
+        .order_by('periodo', *campos)
+    )
+    resultado = []
+    for linha in linhas:
+        item = {'periodo': linha['periodo'].isoformat()}
+        for nome in agrupar:
+            item[nome] = linha[AGRUPAMENTOS[nome]]
+        item['criacoes'] = linha['criacoes']
+        item['modificacoes'] = linha['modificacoes']
+        item['total'] = linha['criacoes'] + linha['modificacoes']
+        resultado.append(item)
+    return resultado
@@ -0,0 +1,160 @@
+# customizacoes/busca.py
+"""
+Busca de dependências por nome, código, ID ou criador.
+
+Os textos de origem e destino (título/código/nome e ID do registro AUD) e o nome
+de quem criou a dependência são normalizados em termos (minúsculos, sem acento)
+e gravados em Cadastro_Dependencias_Busca, indexada por termo. Cada palavra da
+busca vira um LIKE 'palavra%' sobre esse índice, então a consulta não varre o
+cadastro nem depende de CAST nas colunas inteiras.
+
+Os termos são mantidos nos pontos de escrita (signals de dependências, registros
+AUD e usuários; criar-multiplas chama indexar_dependencias após o bulk_create) e
+podem ser reconstruídos pelo comando reindexar_busca_dependencias. O save de um
+registro AUD só reindexa as suas dependências quando pode ter mudado o
+título/código/nome (save sem update_fields ou com o campo nele); dentro de
+timeline.atualizacao_em_lote (import_aud) os registros são acumulados e as
+dependências reindexadas uma vez no final do lote. A reindexação compara os
+termos calculados com os gravados e só reescreve as dependências que mudaram.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import (
+    CAMPO_POR_TIPO, MODELO_POR_TIPO, TAMANHO_LOTE_IN, TIPO_POR_TABELA,
+    CadastroDependencias, DependenciaBusca, Usuario, carregar_registros_aud
+)
+from .timeline import adicionar_ao_lote, registrar_no_lote
+
+TAMANHO_MAXIMO_TERMO = 100
+
+# Campo de cada tabela AUD que entra nos termos de busca das dependências
+CAMPO_NOME = {'sql': 'titulo', 'report': 'codigo', 'fv': 'nome'}
+
+
+def normalizar(texto):
+    """Quebra um texto em termos minúsculos, sem acentos e sem pontuação"""
+    if texto is None:
+        return set()
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return {termo[:TAMANHO_MAXIMO_TERMO] for termo in re.split(r'[^0-9a-z]+', texto) if termo}
+
+
+def indexar_dependencias(ids):
+    """
+    Recalcula os termos de busca das dependências informadas e regrava só as
+    que mudaram (ou deixaram de existir) em relação aos termos gravados.
+    """
+    ids = list(set(ids))
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+        dependencias = list(CadastroDependencias.objects.filter(id__in=lote))
+        gravados = {}
+        for dependencia_id, termo in DependenciaBusca.objects.filter(
+            dependencia_id__in=lote
+        ).values_list('dependencia_id', 'termo'):
+            gravados.setdefault(dependencia_id, set()).add(termo)
+
+        registros = {
+            tipo: carregar_registros_aud(tipo, [getattr(d, campo) for d in dependencias])
+            for tipo, campo in CAMPO_POR_TIPO.items()
+        }
+        usuarios = dict(Usuario.objects.filter(
+            id_usuario__in={d.criado_por for d in dependencias if d.criado_por}
+        ).values_list('id_usuario', 'nome'))
+
+        termos = []
+        alteradas = set(gravados) - {dep.id for dep in dependencias}
+        for dep in dependencias:
+            termos_dep = set()
+            for tipo, campo in CAMPO_POR_TIPO.items():
+                registro_id = getattr(dep, campo)
+                if not registro_id:
+                    continue
+                termos_dep.add(str(registro_id))
+                registro = registros[tipo].get(registro_id)
+                if registro:
+                    termos_dep |= normalizar(registro['nome'])
+            if dep.criado_por:
+                termos_dep.add(str(dep.criado_por))
+                termos_dep |= normalizar(usuarios.get(dep.criado_por))
+            if termos_dep == gravados.get(dep.id, set()):
+                continue
+            alteradas.add(dep.id)
+            termos.extend(DependenciaBusca(dependencia_id=dep.id, termo=t) for t in termos_dep)
+
+        if not alteradas:
+            continue
+        with transaction.atomic():
+            DependenciaBusca.objects.filter(dependencia_id__in=alteradas).delete()
+            DependenciaBusca.objects.bulk_create(termos, batch_size=500)
+
+
+def reindexar_tudo():
+    """Reconstrói os termos de todas as dependências. Retorna a quantidade indexada"""
+    ids = list(CadastroDependencias.objects.values_list('id', flat=True))
+    DependenciaBusca.objects.exclude(dependencia_id__in=CadastroDependencias.objects.values('id')).delete()
+    indexar_dependencias(ids)
+    return len(ids)
+
+
+def filtrar_busca(queryset, texto):
+    """Mantém no queryset as dependências que têm todos os termos buscados (por prefixo)"""
+    for termo in normalizar(texto):
+        queryset = queryset.filter(
+            id__in=DependenciaBusca.objects.filter(termo__startswith=termo).values('dependencia_id')
+        )
+    return queryset
+
+
+def _reindexar_apos_commit(filtro):
+    def _executar():
+        indexar_dependencias(CadastroDependencias.objects.filter(filtro).values_list('id', flat=True))
+    transaction.on_commit(_executar)
+
+
+@receiver(post_save, sender=CadastroDependencias)
+def _dependencia_salva(sender, instance, **kwargs):
+    _reindexar_apos_commit(Q(id=instance.id))
+
+
+def _reindexar_registros(registros):
+    """Reindexa as dependências que apontam para os registros AUD {(tipo, id)}"""
+    por_tipo = {}
+    for tipo, registro_id in registros:
+        por_tipo.setdefault(tipo, []).append(registro_id)
+    ids = set()
+    for tipo, registro_ids in por_tipo.items():
+        campo = CAMPO_POR_TIPO[tipo]
+        for inicio in range(0, len(registro_ids), TAMANHO_LOTE_IN):
+            ids.update(CadastroDependencias.objects.filter(
+                **{f'{campo}__in': registro_ids[inicio:inicio + TAMANHO_LOTE_IN]}
+            ).values_list('id', flat=True))
+    indexar_dependencias(ids)
+
+
+registrar_no_lote('busca', _reindexar_registros)
+
+
+def _registro_aud_salvo(sender, instance, update_fields=None, **kwargs):
+    tipo = TIPO_POR_TABELA[sender._meta.db_table]
+    # Save restrito a outros campos (lida, observação, prioridade...): o nome não mudou
+    if update_fields is not None and CAMPO_NOME[tipo] not in update_fields:
+        return
+    if not adicionar_ao_lote('busca', [(tipo, instance.pk)]):
+        _reindexar_apos_commit(Q(**{CAMPO_POR_TIPO[tipo]: instance.pk}))
+
+
+for _modelo in MODELO_POR_TIPO.values():
+    post_save.connect(_registro_aud_salvo, sender=_modelo, dispatch_uid=f'busca-{_modelo._meta.db_table}')
+
+
+@receiver(post_save, sender=Usuario)
+def _usuario_salvo(sender, instance, **kwargs):
+    _reindexar_apos_commit(Q(criado_por=instance.id_usuario))
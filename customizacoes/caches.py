@@ -0,0 +1,24 @@
+# customizacoes/caches.py
+"""
+Cache compartilhado entre os processos (alias 'historico' de CACHES).
+
+Os caches do histórico e das diferenças são invalidados ou preenchidos fora do
+processo web (import_aud, tasks do Celery, outros workers), então só valem com
+um backend visto por todos os processos (Redis, ver CACHES em settings). Com um
+backend local ao processo (LocMemCache, DummyCache) quem depende disso lê
+direto do banco. O cache 'default' continua local e não depende do Redis.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.connection import ConnectionProxy
+
+ALIAS_COMPARTILHADO = 'historico'
+
+# Como django.core.cache.cache, mas para o alias compartilhado
+cache_historico = ConnectionProxy(caches, ALIAS_COMPARTILHADO)
+
+
+def cache_compartilhado():
+    """Se o cache do histórico é visto por todos os processos (web, Celery, comandos)"""
+    return not isinstance(caches[ALIAS_COMPARTILHADO], (LocMemCache, DummyCache))
@@ -0,0 +1,61 @@
+# customizacoes/dependencias_orfas.py
+"""
+Detecção e limpeza de dependências órfãs: linhas de CadastroDependencias cujo
+ID_AUD_SQL / ID_AUD_REPORT / ID_AUD_FV não existe mais na tabela AUD (ex.: após
+reimportar CSVs). A detecção é um anti-join (NOT EXISTS) por tabela.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import CAMPO_POR_TIPO, MODELO_POR_TIPO, CadastroDependencias, DependenciaQuarentena
+
+TAMANHO_LOTE_PADRAO = 500
+
+
+def encontrar_orfas():
+    """Retorna {tipo: [ids de dependências]} com as referências quebradas de cada tabela AUD"""
+    orfas = {}
+    for tipo, modelo in MODELO_POR_TIPO.items():
+        campo = CAMPO_POR_TIPO[tipo]
+        existe = modelo.objects.filter(pk=OuterRef(campo))
+        orfas[tipo] = list(
+            CadastroDependencias.objects.filter(**{f'{campo}__isnull': False})
+            .exclude(Exists(existe))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+    return orfas
+
+
+def limpar_orfas(orfas, acao, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Remove ('remover') ou move para Cadastro_Dependencias_Quarentena ('quarentena')
+    as dependências órfãs, em lotes (uma transação por lote).
+    Retorna o número de dependências tratadas.
+    """
+    motivos = {}
+    for tipo, ids in orfas.items():
+        for dep_id in ids:
+            motivos.setdefault(dep_id, []).append(f"{MODELO_POR_TIPO[tipo]._meta.db_table} inexistente")
+    ids = sorted(motivos)
+
+    tratadas = 0
+    for inicio in range(0, len(ids), tamanho_lote):
+        lote = ids[inicio:inicio + tamanho_lote]
+        with transaction.atomic():
+            if acao == 'quarentena':
+                DependenciaQuarentena.objects.bulk_create([
+                    DependenciaQuarentena(
+                        id_original=dep.id,
+                        id_aud_sql=dep.id_aud_sql,
+                        id_aud_report=dep.id_aud_report,
+                        id_aud_fv=dep.id_aud_fv,
+                        data_criacao=dep.data_criacao,
+                        criado_por=dep.criado_por,
+                        motivo='; '.join(motivos[dep.id]),
+                    )
+                    for dep in CadastroDependencias.objects.filter(id__in=lote)
+                ], batch_size=200)
+            CadastroDependencias.objects.filter(id__in=lote).delete()
+        tratadas += len(lote)
+    return tratadas
@@ -0,0 +1,196 @@
+# customizacoes/diferencas.py
+"""
+Diferença entre duas versões de um texto (SENTENCA do AUD_SQL, DESCRICAO do
+AUD_REPORT/AUD_FV), calculada no servidor para a tela de comparação.
+
+O formato é compacto: trechos iguais vêm só com a quantidade de linhas, linhas
+inseridas/removidas vêm com o texto e linhas alteradas vêm com a diferença por
+palavra. O resultado é gravado em AUD_DIFERENCA pela dupla de hashes dos
+textos (e fica também no cache), então a mesma comparação (ou a mesma dupla em
+outro registro) não é recalculada por nenhum processo; a task pre_calcular_diffs
+grava as diferenças quando o import_aud cria versões novas.
+
+Para SENTENCA há também o modo semântico: o texto é quebrado em tokens pelo
+sqlparse, sem espaços e comentários e com palavras-chave em maiúsculas, e a
+diferença é feita sobre os tokens. Versões que só mudam formatação, caixa das
+palavras-chave ou comentários aparecem como sem mudança semântica. Os tokens de
+cada texto ficam em cache pelo hash do conteúdo.
+"""
+import difflib
+import hashlib
+import re
+
+import sqlparse
+from django.db import IntegrityError, transaction
+from sqlparse import sql, tokens as T
+
+from .caches import cache_historico as cache
+from .models import AudDiferenca
+
+TEMPO_CACHE_DIFF = 60 * 60 * 24 * 7
+
+MODOS_DIFF = ('texto', 'semantico')
+
+# Palavras e espaços separados, para que a diferença por palavra preserve a formatação
+PADRAO_PALAVRA = re.compile(r'\s+|\w+|[^\w\s]')
+
+
+def hash_texto(texto):
+    return hashlib.sha1((texto or '').encode()).hexdigest()
+
+
+def _diff_palavras(antes, depois):
+    """[[operação, texto]] de uma linha alterada ('=' igual, '-' removido, '+' inserido)"""
+    palavras_antes = PADRAO_PALAVRA.findall(antes)
+    palavras_depois = PADRAO_PALAVRA.findall(depois)
+    trechos = []
+    matcher = difflib.SequenceMatcher(None, palavras_antes, palavras_depois, autojunk=False)
+    for operacao, i1, i2, j1, j2 in matcher.get_opcodes():
+        if operacao == 'equal':
+            trechos.append(['=', ''.join(palavras_antes[i1:i2])])
+            continue
+        if i2 > i1:
+            trechos.append(['-', ''.join(palavras_antes[i1:i2])])
+        if j2 > j1:
+            trechos.append(['+', ''.join(palavras_depois[j1:j2])])
+    return trechos
+
+
+def calcular_diff(antes, depois):
+    """
+    Diferença por linha e por palavra entre dois textos. Retorna {'blocos': [...],
+    'linhas_adicionadas', 'linhas_removidas', 'linhas_alteradas', 'identicos'}.
+    Cada bloco tem 'tipo' (igual, inserido, removido, alterado) e as faixas de
+    linhas (base 1) em cada lado.
+    """
+    linhas_antes = (antes or '').splitlines()
+    linhas_depois = (depois or '').splitlines()
+    blocos = []
+    adicionadas = removidas = alteradas = 0
+
+    def bloco(tipo, i1, i2, j1, j2, **extra):
+        blocos.append({'tipo': tipo, 'antes': [i1 + 1, i2], 'depois': [j1 + 1, j2], **extra})
+
+    matcher = difflib.SequenceMatcher(None, linhas_antes, linhas_depois, autojunk=False)
+    for operacao, i1, i2, j1, j2 in matcher.get_opcodes():
+        if operacao == 'equal':
+            bloco('igual', i1, i2, j1, j2, quantidade=i2 - i1)
+        elif operacao == 'insert':
+            bloco('inserido', i1, i2, j1, j2, linhas=linhas_depois[j1:j2])
+            adicionadas += j2 - j1
+        elif operacao == 'delete':
+            bloco('removido', i1, i2, j1, j2, linhas=linhas_antes[i1:i2])
+            removidas += i2 - i1
+        else:
+            # Linhas pareadas viram diferença por palavra; as que sobram de um lado, inserção ou remoção
+            pares = min(i2 - i1, j2 - j1)
+            bloco('alterado', i1, i1 + pares, j1, j1 + pares, linhas=[
+                _diff_palavras(linhas_antes[i1 + k], linhas_depois[j1 + k]) for k in range(pares)
+            ])
+            alteradas += pares
+            if i2 - i1 > pares:
+                bloco('removido', i1 + pares, i2, j1 + pares, j1 + pares, linhas=linhas_antes[i1 + pares:i2])
+                removidas += i2 - i1 - pares
+            if j2 - j1 > pares:
+                bloco('inserido', i1 + pares, i1 + pares, j1 + pares, j2, linhas=linhas_depois[j1 + pares:j2])
+                adicionadas += j2 - j1 - pares
+
+    return {
+        'identicos': (antes or '') == (depois or ''),
+        'linhas_adicionadas': adicionadas,
+        'linhas_removidas': removidas,
+        'linhas_alteradas': alteradas,
+        'blocos': blocos,
+    }
+
+
+def _nome_de_funcao(token):
+    """Se o token é o nome em uma chamada de função (ex.: getdate em getdate())"""
+    identificador = token.parent
+    return (
+        token.ttype in T.Name and identificador is not None
+        and isinstance(identificador.parent, sql.Function) and identificador.parent.get_name() == token.value
+    )
+
+
+def _normalizar_tokens(texto):
+    tokens = []
+    for instrucao in sqlparse.parse(texto or ''):
+        for token in instrucao.flatten():
+            if token.is_whitespace or token.ttype in T.Comment:
+                continue
+            # Palavras-chave, tipos e nomes de função não diferenciam maiúsculas no SQL Server
+            if token.is_keyword or token.ttype in T.Name.Builtin or _nome_de_funcao(token):
+                tokens.append(token.normalized.upper())
+            else:
+                tokens.append(token.value)
+    return tokens
+
+
+def tokens_sql(texto):
+    """Tokens normalizados de uma sentença SQL, do cache (chave: hash do texto) ou calculados"""
+    chave = f'sql_tokens:{hash_texto(texto)}'
+    tokens = cache.get(chave)
+    if tokens is None:
+        tokens = _normalizar_tokens(texto)
+        cache.set(chave, tokens, timeout=TEMPO_CACHE_DIFF)
+    return tokens
+
+
+def sem_mudanca_semantica(antes, depois):
+    """Se as duas sentenças SQL têm os mesmos tokens normalizados"""
+    return tokens_sql(antes) == tokens_sql(depois)
+
+
+def calcular_diff_semantico(antes, depois):
+    """
+    Diferença por token entre duas sentenças SQL normalizadas. Retorna
+    {'sem_mudanca_semantica', 'tokens_adicionados', 'tokens_removidos', 'trechos'},
+    em que cada trecho é ['=', quantidade de tokens] ou ['-'/'+', texto dos tokens].
+    """
+    tokens_antes, tokens_depois = tokens_sql(antes), tokens_sql(depois)
+    trechos = []
+    adicionados = removidos = 0
+    matcher = difflib.SequenceMatcher(None, tokens_antes, tokens_depois, autojunk=False)
+    for operacao, i1, i2, j1, j2 in matcher.get_opcodes():
+        if operacao == 'equal':
+            trechos.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            trechos.append(['-', ' '.join(tokens_antes[i1:i2])])
+            removidos += i2 - i1
+        if j2 > j1:
+            trechos.append(['+', ' '.join(tokens_depois[j1:j2])])
+            adicionados += j2 - j1
+    return {
+        'sem_mudanca_semantica': tokens_antes == tokens_depois,
+        'tokens_adicionados': adicionados,
+        'tokens_removidos': removidos,
+        'trechos': trechos,
+    }
+
+
+def obter_diff(antes, depois, modo='texto'):
+    """
+    Diferença entre os textos no modo pedido ('texto' ou 'semantico', este só para
+    SQL), do cache ou de AUD_DIFERENCA (chave: modo e hashes dos dois textos), ou
+    calculada e gravada nos dois.
+    """
+    hash_antes, hash_depois = hash_texto(antes), hash_texto(depois)
+    chave = f'diff:{modo}:{hash_antes}:{hash_depois}'
+    diff = cache.get(chave)
+    if diff is not None:
+        return diff
+    diff = AudDiferenca.objects.filter(
+        modo=modo, hash_antes=hash_antes, hash_depois=hash_depois,
+    ).values_list('diff', flat=True).first()
+    if diff is None:
+        diff = calcular_diff_semantico(antes, depois) if modo == 'semantico' else calcular_diff(antes, depois)
+        try:
+            with transaction.atomic():
+                AudDiferenca.objects.create(modo=modo, hash_antes=hash_antes, hash_depois=hash_depois, diff=diff)
+        except IntegrityError:
+            # Outro processo gravou a mesma diferença entre a leitura e a gravação
+            pass
+    cache.set(chave, diff, timeout=TEMPO_CACHE_DIFF)
+    return diff
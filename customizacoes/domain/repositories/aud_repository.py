@@ -17,7 +17,7 @@ class IAudSQLRepository(ABC):
     
     @abstractmethod
     def get_all_by_id(self, codsentenca: str) -> List[Dict[str, Any]]:
-        """Get all records with the same CODSENTENCA, ordered by date DESC."""
+        """Get all versions of a CODSENTENCA, newest first."""
         pass
     
     @abstractmethod
@@ -36,7 +36,7 @@ class IAudReportRepository(ABC):
     
     @abstractmethod
     def get_all_by_id(self, aud_id: str) -> List[Dict[str, Any]]:
-        """Get all records with the same ID, ordered by date DESC."""
+        """Get all versions of an ID, newest first."""
         pass
     
     @abstractmethod
@@ -55,7 +55,7 @@ class IAudFVRepository(ABC):
     
     @abstractmethod
     def get_all_by_id(self, aud_id: int) -> List[Dict[str, Any]]:
-        """Get all records with the same ID, ordered by date DESC."""
+        """Get all versions of an ID, newest first."""
         pass
     
     @abstractmethod
@@ -0,0 +1,241 @@
+# customizacoes/estado.py
+"""
+Estado das customizações em uma data ("as-of") e mudanças entre duas datas.
+
+Estado em T: a versão em vigor em T de cada registro de AUD_SQL, AUD_REPORT e
+AUD_FV, lida de AUD_VERSAO: a mais recente com DATA_REF até T (empate pela maior
+versão), buscada por registro no índice idx_versao_registro_data. Registros sem
+versão até T não existiam no estado. A listagem é ordenada por (tabela, id) e
+paginada por keyset sobre o índice único (TABELA, ID_REGISTRO, VERSAO); nenhuma
+página carrega o histórico inteiro.
+
+Mudanças entre T1 e T2: registros cuja versão em vigor em T2 é posterior a T1.
+Cada item traz a versão em T1 (versao_antes, vazia se o registro ainda não tinha
+versão) e a versão em T2 (versao_depois), que podem ser abertas em /api/versoes/.
+É criado quando não tinha versão em T1 e RECCREATEDON não é anterior a T1, e
+modificado nos demais casos. As contagens por tabela (criados, modificados,
+inalterados) saem de uma query agrupada; a lista segue a ordem do histórico
+(DATA_REF DESC, tabela, id), pelo índice idx_versao_data.
+"""
+import base64
+import json
+from datetime import datetime, time
+
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Left
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .historico import (
+    TABELAS_HISTORICO, codificar_cursor as codificar_posicao, decodificar_cursor as decodificar_posicao
+)
+from .models import AudTimeline, AudVersao, tipo_da_tabela
+from .timeline import TAMANHO_RESUMO
+from .versoes import CAMPO_TITULO, ORDEM_MAIS_RECENTE
+
+COLUNAS_ESTADO = (
+    'tabela', 'registro_id', 'versao', 'data_ref', 'titulo', 'codigo', 'nome',
+    'reccreatedon', 'recmodifiedon', 'usuario', 'prioridade',
+)
+
+ROTULOS = {'sql': 'SQL', 'report': 'Report', 'fv': 'FV'}
+
+
+def data_pura(valor):
+    """O dia de um valor 'AAAA-MM-DD' sem hora, ou None"""
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
+
+
+def interpretar_data(valor):
+    """
+    Converte 'AAAA-MM-DD' (fim do dia) ou data/hora ISO em datetime com fuso.
+    Retorna None se o valor for vazio ou inválido.
+    """
+    # parse_datetime também aceita só a data (meia-noite): a data pura é tratada antes
+    dia = data_pura(valor)
+    try:
+        data = datetime.combine(dia, time.max) if dia else parse_datetime(valor or '')
+    except ValueError:
+        return None
+    if data is not None and timezone.is_naive(data):
+        data = timezone.make_aware(data)
+    return data
+
+
+def codificar_cursor(item):
+    """Cursor opaco com a posição (tabela, id) do último item da página"""
+    return base64.urlsafe_b64encode(json.dumps([item['tabela'], item['registro_id']]).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Retorna (tabela, id). Levanta ValueError se o cursor for inválido"""
+    try:
+        tabela, registro_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Cursor inválido.')
+    if tabela not in TABELAS_HISTORICO or not isinstance(registro_id, int):
+        raise ValueError('Cursor inválido.')
+    return tabela, registro_id
+
+
+def _vigente_em(data, campo='id'):
+    """Subquery com um campo da versão em vigor na data, do mesmo registro da linha externa"""
+    return AudVersao.objects.filter(
+        tabela=OuterRef('tabela'), registro_id=OuterRef('registro_id'), data_ref__lte=data,
+    ).order_by(*ORDEM_MAIS_RECENTE).values(campo)[:1]
+
+
+def versoes_em(data, tabelas):
+    """Versão em vigor na data de cada registro das tabelas, com usuário, prioridade atual e resumo"""
+    prioridade = AudTimeline.objects.filter(
+        tabela=OuterRef('tabela'), registro_id=OuterRef('registro_id'),
+    ).values('prioridade')[:1]
+    return AudVersao.objects.filter(
+        tabela__in=tabelas, data_ref__lte=data, id=Subquery(_vigente_em(data)),
+    ).annotate(
+        usuario=Coalesce('recmodifiedby', 'reccreatedby'),
+        prioridade=Subquery(prioridade),
+        resumo=Left(Coalesce('descricao', 'sentenca'), TAMANHO_RESUMO),
+    )
+
+
+def filtrar_estado(data, tabelas, prioridade=None, sem_prioridade=False, usuario=None):
+    """Versões em vigor na data dos registros que passam pelos filtros"""
+    queryset = versoes_em(data, tabelas)
+    if sem_prioridade:
+        queryset = queryset.filter(Q(prioridade__isnull=True) | Q(prioridade=''))
+    elif prioridade:
+        queryset = queryset.filter(prioridade=prioridade)
+    if usuario:
+        queryset = queryset.filter(usuario=usuario)
+    return queryset
+
+
+def buscar_estado(data, tabelas, cursor=None, tamanho=50, **filtros):
+    """
+    Uma página do estado em `data`, a partir do cursor. Retorna (itens, cursor da
+    próxima página, total de registros no estado com os filtros).
+    """
+    queryset = filtrar_estado(data, tabelas, **filtros)
+    total = queryset.count()
+    if cursor:
+        tabela, registro_id = decodificar_cursor(cursor)
+        queryset = queryset.filter(Q(tabela__gt=tabela) | Q(tabela=tabela, registro_id__gt=registro_id))
+
+    linhas = list(queryset.order_by('tabela', 'registro_id').values(*COLUNAS_ESTADO, 'resumo')[:tamanho + 1])
+    proximo = codificar_cursor(linhas[tamanho - 1]) if len(linhas) > tamanho else None
+    return [formatar_item(linha) for linha in linhas[:tamanho]], proximo, total
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor else None
+
+
+def _titulo(linha):
+    tipo = tipo_da_tabela(linha['tabela'])
+    return linha[CAMPO_TITULO[tipo]] or f"{ROTULOS[tipo]} {linha['registro_id']}"
+
+
+def formatar_item(linha):
+    """Converte uma versão em vigor no formato de resposta do endpoint de estado"""
+    return {
+        'id': f"{tipo_da_tabela(linha['tabela'])}-{linha['registro_id']}",
+        'tabela': linha['tabela'],
+        'registro_id': linha['registro_id'],
+        'titulo': _titulo(linha),
+        'resumo': (linha['resumo'] or '').strip() or 'Sem descrição disponível.',
+        'usuario': linha['usuario'],
+        'prioridade': linha['prioridade'] or None,
+        'versao': linha['versao'],
+        'data_ref': _isoformat(linha['data_ref']),
+        'data_criacao': _isoformat(linha['reccreatedon']),
+        'data_modificacao': _isoformat(linha['recmodifiedon']),
+    }
+
+
+# ----------------------------------------------------------------------
+# Mudanças entre duas datas
+# ----------------------------------------------------------------------
+def _condicoes_mudanca(data_inicio):
+    """Q de cada situação da versão em vigor em T2 de um registro, em relação a T1"""
+    existia_antes = Exists(AudVersao.objects.filter(
+        tabela=OuterRef('tabela'), registro_id=OuterRef('registro_id'), data_ref__lte=data_inicio,
+    ))
+    criado_depois = Q(reccreatedon__isnull=True) | Q(reccreatedon__gt=data_inicio)
+    mudou = Q(data_ref__gt=data_inicio)
+    return {
+        'criados': mudou & ~existia_antes & criado_depois,
+        'modificados': mudou & (existia_antes | ~criado_depois),
+        'inalterados': Q(data_ref__lte=data_inicio),
+    }
+
+
+def resumir_mudancas(data_inicio, data_fim, tabelas):
+    """{tabela: {situação: quantidade}} em uma query agrupada por tabela"""
+    condicoes = _condicoes_mudanca(data_inicio)
+    linhas = (
+        versoes_em(data_fim, tabelas)
+        .values('tabela')
+        .annotate(**{situacao: Count('id', filter=condicao) for situacao, condicao in condicoes.items()})
+        .order_by()
+    )
+    resumo = {tabela: {situacao: 0 for situacao in condicoes} for tabela in tabelas}
+    for linha in linhas:
+        resumo[linha.pop('tabela')].update(linha)
+    return resumo
+
+
+def buscar_mudancas(data_inicio, data_fim, tabelas, tipo=None, cursor=None, tamanho=50):
+    """
+    Uma página dos registros criados ou modificados entre as datas (tipo: 'criado'
+    ou 'modificado' restringe a um deles). Retorna (itens, cursor da próxima página).
+    """
+    condicoes = _condicoes_mudanca(data_inicio)
+    if tipo == 'criado':
+        filtro = condicoes['criados']
+    elif tipo == 'modificado':
+        filtro = condicoes['modificados']
+    else:
+        filtro = Q(data_ref__gt=data_inicio)
+    queryset = versoes_em(data_fim, tabelas).filter(filtro)
+
+    if cursor:
+        (data, tabela, registro_id), _ = decodificar_posicao(cursor)
+        queryset = queryset.filter(
+            Q(data_ref__lt=data) |
+            Q(data_ref=data, tabela__gt=tabela) |
+            Q(data_ref=data, tabela=tabela, registro_id__gt=registro_id)
+        )
+
+    linhas = list(
+        queryset.annotate(
+            versao_antes=Subquery(_vigente_em(data_inicio, 'versao')),
+            data_antes=Subquery(_vigente_em(data_inicio, 'data_ref')),
+        ).order_by('-data_ref', 'tabela', 'registro_id')
+        .values(*COLUNAS_ESTADO, 'versao_antes', 'data_antes')[:tamanho + 1]
+    )
+    proximo = codificar_posicao(linhas[tamanho - 1], 'n') if len(linhas) > tamanho else None
+    return [formatar_mudanca(linha, data_inicio) for linha in linhas[:tamanho]], proximo
+
+
+def formatar_mudanca(linha, data_inicio):
+    """Item da lista de mudanças, com as versões em vigor antes (T1) e depois (T2)"""
+    criado = linha['versao_antes'] is None and (
+        linha['reccreatedon'] is None or linha['reccreatedon'] > data_inicio
+    )
+    return {
+        'id': f"{tipo_da_tabela(linha['tabela'])}-{linha['registro_id']}",
+        'tabela': linha['tabela'],
+        'registro_id': linha['registro_id'],
+        'titulo': _titulo(linha),
+        'usuario': linha['usuario'],
+        'prioridade': linha['prioridade'] or None,
+        'mudanca': 'criado' if criado else 'modificado',
+        'versao_antes': linha['versao_antes'],
+        'versao_depois': linha['versao'],
+        'data_antes': _isoformat(linha['data_antes']),
+        'data_depois': _isoformat(linha['data_ref']),
+    }
@@ -0,0 +1,175 @@
+# customizacoes/estatisticas.py
+"""
+Estatísticas de alteração por registro AUD (AUD_ESTATISTICA): quantidade de
+versões, primeira data, última alteração e editores distintos.
+
+Cada versão gravada em AUD_VERSAO pelo import_aud conta uma versão do registro;
+os editores são o RECCREATEDBY e o RECMODIFIEDBY de cada versão, a primeira data
+é a menor entre RECCREATEDON e DATA_REF e a última alteração a maior DATA_REF.
+Versões intermediárias, que o retrato nas tabelas AUD e a timeline não guardam,
+entram nas contagens.
+
+A soma é incremental na ordem de importação, como a atividade
+(customizacoes/atividade.py): a marca AUD_ESTATISTICA guarda o último ID de
+AUD_VERSAO já somado, e cada execução (task do Celery beat ou comando
+atualizar_estatisticas) lê só as versões com ID maior, em lotes que avançam a
+marca na mesma transação, respeitando a mesma margem de importação. Os editores
+de cada registro ficam em AUD_ESTATISTICA_EDITOR, para que a contagem de
+distintos só aumente quando aparece um usuário novo. Os rankings leem índices
+por (versões, editores, última alteração), então o top-N não depende do tamanho
+da tabela e cada atualização custa uma busca no índice.
+"""
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .atividade import MARGEM_IMPORTACAO
+from .models import (
+    AtividadeMarca, AudEstatisticaEditor, AudEstatisticaRegistro, AudVersao, MODELO_POR_TIPO, TAMANHO_LOTE_IN,
+)
+
+# Linhas por INSERT/UPDATE em lote (SQL Server aceita no máximo 2100 parâmetros)
+TAMANHO_LOTE_ESCRITA = 100
+
+# Versões de AUD_VERSAO lidas por transação
+TAMANHO_LOTE_PADRAO = 5000
+
+# Chave da marca: a tabela mantida
+MARCA = AudEstatisticaRegistro._meta.db_table
+
+CAMPOS_ATUALIZADOS = ['versoes', 'editores', 'primeira_data', 'ultima_alteracao']
+
+COLUNAS_VERSAO = (
+    'id', 'tabela', 'registro_id', 'data_ref', 'reccreatedon', 'reccreatedby', 'recmodifiedby', 'data_importacao',
+)
+
+
+def _resumir_lote(linhas):
+    """Agrupa um lote de versões por registro: {(tabela, id): [versões, primeira data, última data, editores]}"""
+    resumos = {}
+    for _, tabela, registro_id, data_ref, criado_em, criado_por, modificado_por, importado_em in linhas:
+        # Versão sem datas de origem: vale a data em que foi importada
+        data = data_ref or criado_em or importado_em
+        primeira = min(data, criado_em) if criado_em else data
+        resumo = resumos.get((tabela, registro_id))
+        if resumo is None:
+            resumo = resumos[(tabela, registro_id)] = [0, primeira, data, set()]
+        resumo[0] += 1
+        resumo[1] = min(resumo[1], primeira)
+        resumo[2] = max(resumo[2], data)
+        resumo[3].update((usuario or '')[:100] for usuario in (criado_por, modificado_por) if usuario)
+    return resumos
+
+
+def _gravar_resumos(resumos):
+    """Soma os resumos às estatísticas existentes e cria as que faltam"""
+    por_tabela = {}
+    for tabela, registro_id in resumos:
+        por_tabela.setdefault(tabela, []).append(registro_id)
+
+    for tabela, ids in por_tabela.items():
+        for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+            existentes = {
+                estatistica.registro_id: estatistica
+                for estatistica in AudEstatisticaRegistro.objects.filter(tabela=tabela, registro_id__in=lote)
+            }
+            editores = set(
+                AudEstatisticaEditor.objects.filter(tabela=tabela, registro_id__in=lote)
+                .values_list('registro_id', 'usuario')
+            )
+
+            novas, alteradas, novos_editores = [], [], []
+            for registro_id in lote:
+                versoes, primeira, ultima, usuarios = resumos[(tabela, registro_id)]
+                estatistica = existentes.get(registro_id)
+                if estatistica is None:
+                    estatistica = AudEstatisticaRegistro(
+                        tabela=tabela, registro_id=registro_id, versoes=0, editores=0,
+                        primeira_data=primeira, ultima_alteracao=ultima,
+                    )
+                    novas.append(estatistica)
+                else:
+                    estatistica.primeira_data = min(estatistica.primeira_data, primeira)
+                    estatistica.ultima_alteracao = max(estatistica.ultima_alteracao, ultima)
+                    alteradas.append(estatistica)
+                estatistica.versoes += versoes
+                for usuario in usuarios:
+                    if (registro_id, usuario) not in editores:
+                        editores.add((registro_id, usuario))
+                        novos_editores.append(AudEstatisticaEditor(tabela=tabela, registro_id=registro_id, usuario=usuario))
+                        estatistica.editores += 1
+
+            AudEstatisticaRegistro.objects.bulk_create(novas, batch_size=TAMANHO_LOTE_ESCRITA)
+            AudEstatisticaRegistro.objects.bulk_update(alteradas, CAMPOS_ATUALIZADOS, batch_size=TAMANHO_LOTE_ESCRITA)
+            AudEstatisticaEditor.objects.bulk_create(novos_editores, batch_size=TAMANHO_LOTE_ESCRITA)
+
+
+def _ler_versoes(ultimo_id, tamanho_lote):
+    """Próximo lote de versões depois da marca, parando antes da primeira importada dentro da margem"""
+    versoes = AudVersao.objects.filter(id__gt=ultimo_id)
+    limite = versoes.filter(
+        data_importacao__gt=timezone.now() - MARGEM_IMPORTACAO
+    ).aggregate(limite=Min('id'))['limite']
+    if limite is not None:
+        versoes = versoes.filter(id__lt=limite)
+    return list(versoes.order_by('id').values_list(*COLUNAS_VERSAO)[:tamanho_lote])
+
+
+def atualizar_estatisticas(tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Soma às estatísticas as versões importadas depois da marca. Retorna
+    {tabela AUD: versões lidas}.
+    """
+    AtividadeMarca.objects.get_or_create(tabela=MARCA, defaults={'ultimo_id': 0})
+    lidas = {}
+    while True:
+        with transaction.atomic():
+            # A trava da marca serializa execuções simultâneas; a segunda lê a marca já avançada
+            marca = AtividadeMarca.objects.select_for_update().get(tabela=MARCA)
+            linhas = _ler_versoes(marca.ultimo_id, tamanho_lote)
+            if not linhas:
+                return lidas
+            _gravar_resumos(_resumir_lote(linhas))
+            marca.ultimo_id = linhas[-1][0]
+            marca.save(update_fields=['ultimo_id', 'atualizado_em'])
+        for linha in linhas:
+            lidas[linha[1]] = lidas.get(linha[1], 0) + 1
+        if len(linhas) < tamanho_lote:
+            return lidas
+
+
+def remover_estatisticas(tabela, ids):
+    """Remove as estatísticas de registros excluídos das tabelas AUD"""
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+        AudEstatisticaRegistro.objects.filter(tabela=tabela, registro_id__in=lote).delete()
+        AudEstatisticaEditor.objects.filter(tabela=tabela, registro_id__in=lote).delete()
+
+
+def reconstruir_estatisticas(tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Apaga as estatísticas, volta a marca ao início e soma de novo todas as
+    versões de AUD_VERSAO; depois remove as de registros que não estão mais nas
+    tabelas AUD. Retorna {tabela AUD: versões lidas}.
+    """
+    AtividadeMarca.objects.get_or_create(tabela=MARCA, defaults={'ultimo_id': 0})
+    with transaction.atomic():
+        marca = AtividadeMarca.objects.select_for_update().get(tabela=MARCA)
+        AudEstatisticaRegistro.objects.all().delete()
+        AudEstatisticaEditor.objects.all().delete()
+        marca.ultimo_id = 0
+        marca.save(update_fields=['ultimo_id', 'atualizado_em'])
+    lidas = atualizar_estatisticas(tamanho_lote)
+
+    for modelo in MODELO_POR_TIPO.values():
+        tabela = modelo._meta.db_table
+        # Anti-join com a chave primária da tabela AUD
+        excluidos = (
+            AudEstatisticaRegistro.objects.filter(tabela=tabela)
+            .exclude(registro_id__in=modelo.objects.values('pk'))
+            .values_list('registro_id', flat=True)
+        )
+        remover_estatisticas(tabela, list(excluidos))
+    return lidas
@@ -0,0 +1,129 @@
+# customizacoes/exportacao.py
+"""
+Exportação do grafo de dependências completo a partir do índice em memória.
+Nomes e prioridades são resolvidos em lote (uma query IN por tabela e lote).
+
+O ETag da exportação combina a assinatura do grafo com uma versão guardada no
+cache compartilhado, trocada a cada escrita de registro AUD (nome, prioridade),
+de dependência e de prioridade em lote (elevar_prioridade, propagação). Dentro
+de timeline.atualizacao_em_lote a versão é trocada uma vez no final do lote.
+Sem cache compartilhado não há versão e a exportação é sempre gerada.
+"""
+import csv
+import uuid
+from io import BytesIO, StringIO
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from openpyxl import Workbook
+
+from .caches import cache_compartilhado, cache_historico as cache
+from .grafo import desempacotar, resolver_nos
+from .models import MODELO_POR_TIPO, CadastroDependencias
+from .timeline import adicionar_ao_lote, registrar_no_lote
+
+CHAVE_VERSAO = 'exportacao-dependencias-versao'
+
+# Pares (tipo origem, tipo destino) possíveis e o título da aba na matriz XLSX
+PARES_MATRIZ = [
+    ('sql', 'report', 'SQL x Report'),
+    ('sql', 'fv', 'SQL x FV'),
+    ('report', 'fv', 'Report x FV'),
+]
+
+
+def _nos_e_arestas(grafo):
+    arestas = sorted(grafo.arestas())
+    nos = sorted({no for aresta in arestas for no in aresta}, key=desempacotar)
+    return nos, arestas, resolver_nos(nos)
+
+
+def exportar_json(grafo):
+    """
+    Grafo compacto: 'nos' é uma lista de [tabela, id, nome, prioridade] e
+    'arestas' uma lista de [índice origem, índice destino] nessa lista.
+    """
+    nos, arestas, resolvidos = _nos_e_arestas(grafo)
+    indice = {no: posicao for posicao, no in enumerate(nos)}
+    return {
+        'colunas_nos': ['tabela', 'id', 'nome', 'prioridade'],
+        'nos': [
+            [resolvidos[no]['tabela'], resolvidos[no]['id'], resolvidos[no]['nome'], resolvidos[no]['prioridade']]
+            for no in nos
+        ],
+        'arestas': [[indice[origem], indice[destino]] for origem, destino in arestas],
+    }
+
+
+def exportar_csv(grafo):
+    """Lista de arestas em CSV, uma dependência por linha"""
+    _, arestas, resolvidos = _nos_e_arestas(grafo)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([
+        'origem_tabela', 'origem_id', 'origem_nome', 'origem_prioridade',
+        'destino_tabela', 'destino_id', 'destino_nome', 'destino_prioridade',
+    ])
+    for origem, destino in arestas:
+        o, d = resolvidos[origem], resolvidos[destino]
+        writer.writerow([
+            o['tabela'], o['id'], o['nome'] or '', o['prioridade'] or '',
+            d['tabela'], d['id'], d['nome'] or '', d['prioridade'] or '',
+        ])
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def exportar_xlsx(grafo):
+    """
+    Matriz de adjacência em XLSX (openpyxl write-only), uma aba por par de
+    tabelas: linhas são as origens, colunas os destinos, 1 onde há dependência.
+    """
+    _, arestas, resolvidos = _nos_e_arestas(grafo)
+    workbook = Workbook(write_only=True)
+
+    for tipo_origem, tipo_destino, titulo in PARES_MATRIZ:
+        destinos_por_origem = {}
+        for origem, destino in arestas:
+            if desempacotar(origem)[0] == tipo_origem and desempacotar(destino)[0] == tipo_destino:
+                destinos_por_origem.setdefault(origem, set()).add(destino)
+
+        colunas = sorted({d for destinos in destinos_por_origem.values() for d in destinos}, key=desempacotar)
+        sheet = workbook.create_sheet(title=titulo)
+        sheet.append([''] + [f"{resolvidos[no]['id']} - {resolvidos[no]['nome'] or ''}" for no in colunas])
+        for origem in sorted(destinos_por_origem, key=desempacotar):
+            destinos = destinos_por_origem[origem]
+            sheet.append(
+                [f"{resolvidos[origem]['id']} - {resolvidos[origem]['nome'] or ''}"] +
+                [1 if no in destinos else None for no in colunas]
+            )
+
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def versao_exportacao():
+    """Versão atual dos dados exportados, ou None sem cache compartilhado"""
+    if not cache_compartilhado():
+        return None
+    # Um valor aleatório (e não um contador) para que a perda da chave nunca
+    # repita uma versão antiga
+    cache.add(CHAVE_VERSAO, uuid.uuid4().hex, None)
+    return cache.get(CHAVE_VERSAO)
+
+
+def invalidar_exportacao():
+    """Troca a versão da exportação depois do commit da transação atual"""
+    transaction.on_commit(lambda: cache.set(CHAVE_VERSAO, uuid.uuid4().hex, None))
+
+
+def _registro_alterado(sender, **kwargs):
+    if not adicionar_ao_lote('exportacao', [True]):
+        invalidar_exportacao()
+
+
+registrar_no_lote('exportacao', lambda itens: invalidar_exportacao())
+
+for _modelo in (*MODELO_POR_TIPO.values(), CadastroDependencias):
+    post_save.connect(_registro_alterado, sender=_modelo, dispatch_uid=f'exportacao-save-{_modelo._meta.db_table}')
+    post_delete.connect(_registro_alterado, sender=_modelo, dispatch_uid=f'exportacao-delete-{_modelo._meta.db_table}')
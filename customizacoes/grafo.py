@@ -0,0 +1,313 @@
+# customizacoes/grafo.py
+"""
+Índice em memória do grafo de dependências (CadastroDependencias).
+
+Cada nó (tipo, id) é empacotado em um único inteiro: o id deslocado dois bits
+à esquerda, com o código do tipo nos dois bits baixos. As arestas vão da origem
+para o destino e ficam em arrays de inteiros por nó (sucessores e predecessores).
+
+O índice é carregado sob demanda e mantido incrementalmente: criações e remoções
+feitas neste processo são aplicadas pelos signals, e alterações feitas por outros
+processos são detectadas pela assinatura (quantidade, maior ID) da tabela. Novos
+IDs são aplicados como delta; qualquer outra divergência reconstrói o índice.
+
+Como a origem de uma dependência é sempre o campo SQL > Report > FV, as arestas
+orientadas nunca formam ciclo. O que o cadastro permite são caminhos redundantes
+entre registros (SQL -> Report -> FV junto com SQL -> FV, ou dois Reports entre o
+mesmo SQL e a mesma FV), laços só no grafo não orientado: esses agrupamentos são
+os componentes biconexos (Tarjan), não ciclos de dependência.
+"""
+import threading
+from array import array
+from collections import deque
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    CadastroDependencias, HIERARQUIA_PRIORIDADE, MODELO_POR_TIPO, carregar_registros_aud,
+    par_origem_destino
+)
+
+CODIGO_POR_TIPO = {'sql': 0, 'report': 1, 'fv': 2}
+TIPO_POR_CODIGO = {codigo: tipo for tipo, codigo in CODIGO_POR_TIPO.items()}
+
+
+def empacotar(tipo, registro_id):
+    """Converte (tipo, id) no inteiro compacto usado como nó do grafo"""
+    return (int(registro_id) << 2) | CODIGO_POR_TIPO[tipo]
+
+
+def desempacotar(no):
+    """Converte o inteiro compacto de volta em (tipo, id)"""
+    return TIPO_POR_CODIGO[no & 3], no >> 2
+
+
+class GrafoDependencias:
+    """Listas de adjacência das dependências, com fecho transitivo por BFS"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sucessores = {}
+        self._predecessores = {}
+        self._arestas = {}  # id da dependência -> (nó origem, nó destino)
+        self.assinatura = None
+        self._versao = 0  # incrementada a cada alteração das arestas
+        self._agrupamentos_cache = None  # (versão, componentes)
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+    def reconstruir(self):
+        """Carrega todas as dependências do banco"""
+        with self._lock:
+            assinatura = CadastroDependencias.objects.assinatura()
+            self._sucessores = {}
+            self._predecessores = {}
+            self._arestas = {}
+            self._versao += 1
+            linhas = CadastroDependencias.objects.values_list(
+                'id', 'id_aud_sql', 'id_aud_report', 'id_aud_fv'
+            ).iterator(chunk_size=5000)
+            for dep_id, sql, report, fv in linhas:
+                self._adicionar(dep_id, sql, report, fv)
+            self.assinatura = assinatura
+
+    def sincronizar(self):
+        """Garante que o índice reflete a tabela, aplicando apenas o delta quando possível"""
+        with self._lock:
+            atual = CadastroDependencias.objects.assinatura()
+            if self.assinatura is None:
+                self.reconstruir()
+                return
+            if atual == self.assinatura:
+                return
+
+            total, maior_id = self.assinatura
+            novas = list(CadastroDependencias.objects.filter(id__gt=maior_id).values_list(
+                'id', 'id_aud_sql', 'id_aud_report', 'id_aud_fv'
+            ))
+            if total + len(novas) != atual[0]:
+                # Houve remoções feitas por outro processo
+                self.reconstruir()
+                return
+            for dep_id, sql, report, fv in novas:
+                self._adicionar(dep_id, sql, report, fv)
+            self.assinatura = atual
+
+    def adicionar(self, dep_id, sql, report, fv, criada=True):
+        """Registra (ou atualiza) uma dependência salva neste processo"""
+        with self._lock:
+            if self.assinatura is None:
+                return
+            if dep_id in self._arestas:
+                self._remover(dep_id)
+            self._adicionar(dep_id, sql, report, fv)
+            if criada:
+                total, maior_id = self.assinatura
+                self.assinatura = (total + 1, max(maior_id, dep_id))
+
+    def remover(self, dep_id):
+        """Remove uma dependência excluída neste processo"""
+        with self._lock:
+            if self.assinatura is None:
+                return
+            if dep_id in self._arestas:
+                self._remover(dep_id)
+            total, maior_id = self.assinatura
+            self.assinatura = (total - 1, maior_id)
+
+    def _adicionar(self, dep_id, sql, report, fv):
+        par = par_origem_destino(sql, report, fv)
+        if par is None:
+            return False
+        origem, destino = empacotar(*par[0]), empacotar(*par[1])
+        self._arestas[dep_id] = (origem, destino)
+        self._sucessores.setdefault(origem, array('q')).append(destino)
+        self._predecessores.setdefault(destino, array('q')).append(origem)
+        self._versao += 1
+        return True
+
+    def _remover(self, dep_id):
+        origem, destino = self._arestas.pop(dep_id)
+        self._sucessores[origem].remove(destino)
+        if not self._sucessores[origem]:
+            del self._sucessores[origem]
+        self._predecessores[destino].remove(origem)
+        if not self._predecessores[destino]:
+            del self._predecessores[destino]
+        self._versao += 1
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def nos(self):
+        """Todos os nós que participam de alguma dependência"""
+        with self._lock:
+            return set(self._sucessores) | set(self._predecessores)
+
+    def arestas(self):
+        """Lista de (nó origem, nó destino) de todas as dependências válidas"""
+        with self._lock:
+            return list(self._arestas.values())
+
+    def vizinhos(self, no, direcao='downstream'):
+        """Vizinhos diretos de um nó ('downstream' = destinos, 'upstream' = origens)"""
+        adjacencia = self._sucessores if direcao == 'downstream' else self._predecessores
+        return adjacencia.get(no, ())
+
+    def fecho(self, no, direcao='downstream', profundidade_max=None):
+        """
+        Fecho transitivo a partir de um nó, por BFS.
+        'downstream' segue origem -> destino; 'upstream' segue destino -> origem.
+        Retorna {nó: profundidade}, sem incluir o nó inicial.
+        """
+        adjacencia = self._sucessores if direcao == 'downstream' else self._predecessores
+        vazio = array('q')
+        with self._lock:
+            visitados = {no: 0}
+            fila = deque([no])
+            while fila:
+                atual = fila.popleft()
+                profundidade = visitados[atual]
+                if profundidade_max is not None and profundidade >= profundidade_max:
+                    continue
+                for vizinho in adjacencia.get(atual, vazio):
+                    if vizinho not in visitados:
+                        visitados[vizinho] = profundidade + 1
+                        fila.append(vizinho)
+        del visitados[no]
+        return visitados
+
+    def componentes_biconexos(self):
+        """
+        Agrupamentos biconexos, em tempo linear: componentes biconexos (Tarjan)
+        com 3 ou mais nós do grafo não orientado. Entre dois membros há sempre
+        dois caminhos de dependências independentes; as arestas orientadas não
+        formam ciclo (ver o docstring do módulo). O resultado fica em cache até a
+        próxima alteração das arestas.
+        """
+        with self._lock:
+            if self._agrupamentos_cache and self._agrupamentos_cache[0] == self._versao:
+                return self._agrupamentos_cache[1]
+
+            vizinhos = {}
+            for origem, destino in self._arestas.values():
+                if origem != destino:
+                    vizinhos.setdefault(origem, set()).add(destino)
+                    vizinhos.setdefault(destino, set()).add(origem)
+
+            descoberta = {}
+            menor = {}
+            componentes = []
+            contador = 0
+            for raiz in vizinhos:
+                if raiz in descoberta:
+                    continue
+                descoberta[raiz] = menor[raiz] = contador
+                contador += 1
+                pilha = [(raiz, None, iter(vizinhos[raiz]))]
+                pilha_arestas = []
+                while pilha:
+                    v, pai, restantes = pilha[-1]
+                    avancou = False
+                    for w in restantes:
+                        if w == pai:
+                            continue
+                        if w not in descoberta:
+                            descoberta[w] = menor[w] = contador
+                            contador += 1
+                            pilha_arestas.append((v, w))
+                            pilha.append((w, v, iter(vizinhos[w])))
+                            avancou = True
+                            break
+                        if descoberta[w] < descoberta[v]:
+                            menor[v] = min(menor[v], descoberta[w])
+                            pilha_arestas.append((v, w))
+                    if avancou:
+                        continue
+
+                    pilha.pop()
+                    if not pilha:
+                        continue
+                    u = pilha[-1][0]
+                    menor[u] = min(menor[u], menor[v])
+                    if menor[v] >= descoberta[u]:
+                        # u separa o componente de v: desempilha suas arestas
+                        componente = set()
+                        while True:
+                            aresta = pilha_arestas.pop()
+                            componente.update(aresta)
+                            if aresta == (u, v):
+                                break
+                        if len(componente) >= 3:
+                            componentes.append(sorted(componente))
+
+            self._agrupamentos_cache = (self._versao, componentes)
+            return componentes
+
+
+def resolver_nos(nos):
+    """
+    Resolve tabela, id, nome e prioridade de vários nós com uma query IN por tabela.
+    Retorna {nó: {'tabela', 'id', 'nome', 'prioridade'}}.
+    """
+    ids_por_tipo = {}
+    for no in nos:
+        tipo, registro_id = desempacotar(no)
+        ids_por_tipo.setdefault(tipo, set()).add(registro_id)
+    registros = {tipo: carregar_registros_aud(tipo, ids) for tipo, ids in ids_por_tipo.items()}
+
+    resolvidos = {}
+    for no in nos:
+        tipo, registro_id = desempacotar(no)
+        registro = registros[tipo].get(registro_id)
+        resolvidos[no] = {
+            'tabela': MODELO_POR_TIPO[tipo]._meta.db_table,
+            'id': registro_id,
+            'nome': registro['nome'] if registro else None,
+            'prioridade': registro['prioridade'] if registro else None,
+        }
+    return resolvidos
+
+
+def listar_agrupamentos(grafo):
+    """Agrupamentos biconexos do grafo com nome e prioridade de cada membro"""
+    componentes = grafo.componentes_biconexos()
+    resolvidos = resolver_nos({no for componente in componentes for no in componente})
+    agrupamentos = []
+    for componente in componentes:
+        membros = [resolvidos[no] for no in componente]
+        niveis = [HIERARQUIA_PRIORIDADE.get(m['prioridade'], 0) for m in membros]
+        agrupamentos.append({
+            'tamanho': len(membros),
+            'prioridade_maxima': next(
+                (nome for nome, peso in HIERARQUIA_PRIORIDADE.items() if peso == max(niveis)), None
+            ),
+            'membros': membros,
+        })
+    agrupamentos.sort(key=lambda a: (-HIERARQUIA_PRIORIDADE.get(a['prioridade_maxima'], 0), -a['tamanho']))
+    return agrupamentos
+
+
+# Índice compartilhado pelo processo
+grafo_dependencias = GrafoDependencias()
+
+
+def obter_grafo():
+    """Retorna o índice do processo sincronizado com a tabela de dependências"""
+    grafo_dependencias.sincronizar()
+    return grafo_dependencias
+
+
+@receiver(post_save, sender=CadastroDependencias)
+def _dependencia_salva(sender, instance, created, **kwargs):
+    dados = (instance.id, instance.id_aud_sql, instance.id_aud_report, instance.id_aud_fv, created)
+    transaction.on_commit(lambda: grafo_dependencias.adicionar(*dados))
+
+
+@receiver(post_delete, sender=CadastroDependencias)
+def _dependencia_removida(sender, instance, **kwargs):
+    dep_id = instance.id
+    transaction.on_commit(lambda: grafo_dependencias.remover(dep_id))
@@ -0,0 +1,320 @@
+# customizacoes/historico.py
+"""
+Histórico de alterações das tabelas AUD (AUD_SQL, AUD_REPORT, AUD_FV).
+
+Os itens vêm da linha do tempo unificada (AUD_TIMELINE), ordenados por
+(DATA_REF DESC, tabela, id) e paginados por keyset: o cursor guarda a posição
+(data, tabela, id) do último item entregue.
+
+O histórico é servido a partir de baldes em cache, um por (tabela, dia do
+calendário no fuso do projeto, America/Sao_Paulo), com os itens já serializados.
+Dias passados são imutáveis: o balde só é refeito quando invalidar_dias() atinge
+aquele dia (chamado pela manutenção da timeline). O dia atual é sempre lido do
+banco. Um índice (dia -> quantidade) por tabela, também em cache, permite pular
+dias vazios e somar o total sem consultar a timeline. Índices e baldes que
+faltam no cache são montados em paralelo, uma tarefa por tabela.
+
+As invalidações partem de outros processos (import_aud, tasks do Celery), então
+os baldes só são guardados com o cache compartilhado (alias 'historico' de CACHES em
+settings). Com um cache local ao processo tudo é lido do banco.
+"""
+import base64
+import json
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .caches import cache_compartilhado, cache_historico as cache
+from .models import AudTimeline, CustomizacaoFV, CustomizacaoReport, CustomizacaoSQL
+from .paralelo import executar_em_paralelo
+
+# Tabela -> (modelo, campo descritivo, que também é a chave dele na resposta)
+TABELAS_HISTORICO = {
+    'AUD_SQL': (CustomizacaoSQL, 'titulo'),
+    'AUD_REPORT': (CustomizacaoReport, 'descricao'),
+    'AUD_FV': (CustomizacaoFV, 'nome'),
+}
+
+COLUNAS_HISTORICO = (
+    'tabela', 'registro_id', 'data_ref', 'data_criacao', 'data_modificacao', 'usuario', 'prioridade',
+)
+
+# Baldes de dias passados não expiram por conteúdo; o prazo só limita a memória do cache
+TEMPO_CACHE_DIA = 60 * 60 * 24 * 7
+
+# Dias carregados por leitura do cache ao montar uma página
+DIAS_POR_LEITURA = 10
+
+
+def codificar_cursor(item, direcao):
+    """Cursor opaco com a posição (data, tabela, id) de um item e a direção ('n' ou 'p')"""
+    posicao = [item['data_ref'].isoformat(), item['tabela'], item['registro_id'], direcao]
+    return base64.urlsafe_b64encode(json.dumps(posicao).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Retorna ((data, tabela, id), direção). Levanta ValueError se o cursor for inválido"""
+    try:
+        data, tabela, registro_id, direcao = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        data = datetime.fromisoformat(data)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Cursor inválido.')
+    if tabela not in TABELAS_HISTORICO or direcao not in ('n', 'p') or not isinstance(registro_id, int):
+        raise ValueError('Cursor inválido.')
+    if timezone.is_naive(data):
+        raise ValueError('Cursor inválido.')
+    return (data, tabela, registro_id), direcao
+
+
+def _ordem(data_ref, tabela, registro_id):
+    """Chave de ordenação do histórico: (data DESC, tabela, id)"""
+    return (-data_ref.timestamp(), tabela, registro_id)
+
+
+def dia_local(data):
+    """Dia do calendário de uma data no fuso do projeto (America/Sao_Paulo)"""
+    return timezone.localtime(data).date()
+
+
+def _limites_dia(dia):
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+
+
+# ----------------------------------------------------------------------
+# Chaves e invalidação
+# ----------------------------------------------------------------------
+def _chave_versao_dia(tabela, dia):
+    return f'historico:versao-dia:{tabela}:{dia.isoformat()}'
+
+
+def _chave_versao_indice(tabela):
+    return f'historico:versao-indice:{tabela}'
+
+
+def _incrementar(chave):
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # A chave expirou entre o add e o incr
+        cache.set(chave, 1, timeout=None)
+
+
+def invalidar_dias(tabela, datas, contagem=False):
+    """
+    Invalida os baldes dos dias das datas informadas. Com contagem=True (linhas
+    criadas, removidas ou que mudaram de dia) invalida também o índice de dias.
+    """
+    if not cache_compartilhado():
+        return
+    dias = {dia_local(data) for data in datas if data}
+    hoje = timezone.localdate()
+    passados = [dia for dia in dias if dia < hoje]
+    if not passados:
+        return
+
+    def _invalidar():
+        for dia in passados:
+            _incrementar(_chave_versao_dia(tabela, dia))
+        if contagem:
+            _incrementar(_chave_versao_indice(tabela))
+
+    # Só depois do commit, para que uma leitura concorrente não guarde o estado antigo
+    transaction.on_commit(_invalidar)
+
+
+# ----------------------------------------------------------------------
+# Índice de dias e baldes
+# ----------------------------------------------------------------------
+def _consultar_indice(tabela, hoje):
+    inicio_hoje, _ = _limites_dia(hoje)
+    return {
+        linha['dia']: linha['total']
+        for linha in AudTimeline.objects.filter(tabela=tabela, data_ref__lt=inicio_hoje)
+        .annotate(dia=TruncDate('data_ref', tzinfo=timezone.get_current_timezone()))
+        .values('dia').annotate(total=Count('id')).order_by()
+    }
+
+
+def _indice_dias(tabela):
+    """{dia: quantidade} dos dias passados com itens da tabela (em cache)"""
+    hoje = timezone.localdate()
+    if not cache_compartilhado():
+        return _consultar_indice(tabela, hoje)
+    versao = cache.get(_chave_versao_indice(tabela), 0)
+    chave = f'historico:indice:{tabela}:{hoje.isoformat()}:{versao}'
+    indice = cache.get(chave)
+    if indice is None:
+        indice = _consultar_indice(tabela, hoje)
+        cache.set(chave, indice, timeout=TEMPO_CACHE_DIA)
+    return indice
+
+
+def _montar_balde(tabela, dia):
+    """Itens serializados de uma tabela em um dia, em ordem do histórico"""
+    inicio, fim = _limites_dia(dia)
+    linhas = list(
+        AudTimeline.objects.filter(tabela=tabela, data_ref__gte=inicio, data_ref__lt=fim)
+        .order_by('-data_ref', 'registro_id').values(*COLUNAS_HISTORICO)
+    )
+    detalhes = _carregar_detalhes(tabela, [linha['registro_id'] for linha in linhas])
+    return [
+        (_ordem(linha['data_ref'], tabela, linha['registro_id']), linha['data_ref'], formatar_item(linha, detalhes))
+        for linha in linhas
+    ]
+
+
+def _baldes(tabela, dias):
+    """{dia: itens} de vários dias; dias passados vêm do cache, o dia atual do banco"""
+    hoje = timezone.localdate()
+    passados = [dia for dia in dias if dia < hoje] if cache_compartilhado() else []
+    versoes = cache.get_many([_chave_versao_dia(tabela, dia) for dia in passados])
+    chaves = {
+        dia: f'historico:dia:{tabela}:{dia.isoformat()}:{versoes.get(_chave_versao_dia(tabela, dia), 0)}'
+        for dia in passados
+    }
+    em_cache = cache.get_many(list(chaves.values()))
+
+    baldes, novos = {}, {}
+    for dia in dias:
+        if dia in chaves and chaves[dia] in em_cache:
+            baldes[dia] = em_cache[chaves[dia]]
+            continue
+        baldes[dia] = _montar_balde(tabela, dia)
+        if dia in chaves:
+            novos[chaves[dia]] = baldes[dia]
+    if novos:
+        cache.set_many(novos, timeout=TEMPO_CACHE_DIA)
+    return baldes
+
+
+def _contagens_hoje(tabelas):
+    """{tabela: quantidade} do dia atual, em uma query agrupada"""
+    inicio, fim = _limites_dia(timezone.localdate())
+    return dict(
+        AudTimeline.objects.filter(tabela__in=tabelas, data_ref__gte=inicio, data_ref__lt=fim)
+        .values_list('tabela').annotate(total=Count('id')).order_by()
+    )
+
+
+def _dias_no_periodo(tabelas, dia_inicio=None, dia_fim=None):
+    """{tabela: {dia: quantidade}} dos dias com itens dentro do período"""
+    hoje = timezone.localdate()
+    inclui_hoje = (not dia_inicio or dia_inicio <= hoje) and (not dia_fim or dia_fim >= hoje)
+    contagens_hoje = _contagens_hoje(tabelas) if inclui_hoje else {}
+    indices = executar_em_paralelo({tabela: (lambda tabela=tabela: _indice_dias(tabela)) for tabela in tabelas})
+    resultado = {}
+    for tabela in tabelas:
+        dias = dict(indices[tabela])
+        if contagens_hoje.get(tabela):
+            dias[hoje] = contagens_hoje[tabela]
+        resultado[tabela] = {
+            dia: total for dia, total in dias.items()
+            if (not dia_inicio or dia >= dia_inicio) and (not dia_fim or dia <= dia_fim)
+        }
+    return resultado
+
+
+def _carregar_detalhes(tabela, ids):
+    """Descrição e observação dos registros: {id: (descrição, observação)}"""
+    modelo, campo_descricao = TABELAS_HISTORICO[tabela]
+    detalhes = {}
+    for inicio in range(0, len(ids), 1000):
+        for registro_id, descricao, observacao in modelo.objects.filter(
+            pk__in=ids[inicio:inicio + 1000]
+        ).values_list('pk', campo_descricao, 'observacao'):
+            detalhes[registro_id] = (descricao, observacao)
+    return detalhes
+
+
+def buscar_pagina(tabelas, data_inicio=None, data_fim=None, cursor=None, tamanho=20):
+    """
+    Monta uma página do histórico juntando os baldes diários, a partir do dia
+    do cursor. Retorna (itens, cursor da próxima página, cursor da página
+    anterior, total no período); o total é somado do índice de dias.
+    """
+    posicao, direcao = decodificar_cursor(cursor) if cursor else (None, 'n')
+    limite = _ordem(*posicao) if posicao else None
+
+    dias_por_tabela = _dias_no_periodo(
+        tabelas,
+        dia_local(data_inicio) if data_inicio else None,
+        dia_local(data_fim) if data_fim else None,
+    )
+    total = sum(quantidade for por_dia in dias_por_tabela.values() for quantidade in por_dia.values())
+    dias = sorted({dia for por_dia in dias_por_tabela.values() for dia in por_dia}, reverse=(direcao == 'n'))
+    if posicao:
+        dia_cursor = dia_local(posicao[0])
+        dias = [dia for dia in dias if (dia <= dia_cursor if direcao == 'n' else dia >= dia_cursor)]
+
+    # Percorre os dias na direção buscada até ter um item a mais que a página
+    selecionados = []
+    for inicio in range(0, len(dias), DIAS_POR_LEITURA):
+        trecho = dias[inicio:inicio + DIAS_POR_LEITURA]
+        baldes = executar_em_paralelo({
+            tabela: (lambda tabela=tabela: _baldes(tabela, [dia for dia in trecho if dia in dias_por_tabela[tabela]]))
+            for tabela in tabelas
+        })
+        for dia in trecho:
+            itens_dia = sorted(
+                (item for tabela in tabelas for item in baldes[tabela].get(dia, ())),
+                key=lambda item: item[0], reverse=(direcao == 'p'),
+            )
+            for item in itens_dia:
+                if data_inicio and item[1] < data_inicio or data_fim and item[1] > data_fim:
+                    continue
+                if limite and (item[0] <= limite if direcao == 'n' else item[0] >= limite):
+                    continue
+                selecionados.append(item)
+                if len(selecionados) > tamanho:
+                    break
+            if len(selecionados) > tamanho:
+                break
+        if len(selecionados) > tamanho:
+            break
+
+    ha_mais = len(selecionados) > tamanho
+    selecionados = selecionados[:tamanho]
+    if direcao == 'p':
+        selecionados.reverse()
+    if not selecionados:
+        return [], None, None, total
+
+    def posicao_de(item):
+        return {'data_ref': item[1], 'tabela': item[2]['tabela'], 'registro_id': item[2]['id']}
+
+    if direcao == 'n':
+        proximo = codificar_cursor(posicao_de(selecionados[-1]), 'n') if ha_mais else None
+        anterior = codificar_cursor(posicao_de(selecionados[0]), 'p') if posicao else None
+    else:
+        proximo = codificar_cursor(posicao_de(selecionados[-1]), 'n')
+        anterior = codificar_cursor(posicao_de(selecionados[0]), 'p') if ha_mais else None
+    return [item[2] for item in selecionados], proximo, anterior, total
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor and hasattr(valor, 'isoformat') else (str(valor) if valor else None)
+
+
+def formatar_item(item, detalhes):
+    """Converte uma linha da timeline no formato de resposta do endpoint de histórico"""
+    tabela = item['tabela']
+    campo_descricao = TABELAS_HISTORICO[tabela][1]
+    descricao, observacao = detalhes.get(item['registro_id'], (None, None))
+    dados = {
+        'tabela': tabela,
+        'id': item['registro_id'],
+        campo_descricao: descricao or 'N/A',
+        'reccreatedby': item['usuario'] or 'N/A',
+        'prioridade': item['prioridade'] or None,
+        'observacao': observacao or None,
+        'data_criacao': _isoformat(item['data_criacao']),
+        'data_modificacao': _isoformat(item['data_modificacao']),
+    }
+    if tabela == 'AUD_SQL':
+        dados['codsentenca'] = item['registro_id']
+    return dados
@@ -8,6 +8,7 @@ from rest_framework import status
 from ...application.use_cases.get_historico_use_case import GetHistoricoUseCase
 from ...application.use_cases.comparar_registros_use_case import CompararRegistrosUseCase
 from ...application.use_cases.adicionar_observacao_use_case import AdicionarObservacaoUseCase
+from ...diferencas import MODOS_DIFF
 from ...infrastructure.repositories.aud_sql_repository import DjangoAudSQLRepository
 from ...infrastructure.repositories.dependencia_repository import DjangoDependenciaRepository
 from ...infrastructure.repositories.observacao_repository import DjangoObservacaoRepository
@@ -88,7 +89,7 @@ class CompararRegistrosViewRefatorada(APIView):
         )
     
     def get(self, request):
-        """Compare current and previous registro."""
+        """Compare current and previous registro (?modo=texto|semantico for the diff)."""
         tabela = request.query_params.get('tabela', '').upper()
         registro_id = request.query_params.get('id')
         
@@ -98,8 +99,15 @@ class CompararRegistrosViewRefatorada(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        modo = request.query_params.get('modo', 'texto')
+        if modo not in MODOS_DIFF or (modo == 'semantico' and tabela != 'AUD_SQL'):
+            return Response(
+                {"error": "Modo inválido. Use: texto ou semantico (semantico só para AUD_SQL)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
-            result = self._use_case.execute(tabela=tabela, registro_id=registro_id)
+            result = self._use_case.execute(tabela=tabela, registro_id=registro_id, modo=modo)
             
             # Convert DTOs to dict for response
             registro_atual_dict = {
@@ -141,7 +149,8 @@ class CompararRegistrosViewRefatorada(APIView):
             return Response({
                 'tabela': result.tabela,
                 'registro_atual': registro_atual_dict,
-                'registro_anterior': registro_anterior_dict
+                'registro_anterior': registro_anterior_dict,
+                'diff': result.diff
             })
         except ValueError as e:
             return Response(
@@ -16,17 +16,32 @@ class DjangoAudSQLRepository(IAudSQLRepository):
         return records[0] if records else None
     
     def get_all_by_id(self, codsentenca: str) -> List[Dict[str, Any]]:
-        """Get all records with the same CODSENTENCA, ordered by date DESC."""
+        """
+        Get all versions of a CODSENTENCA from AUD_VERSAO, newest first.
+        AUD_SQL keeps only the current state (CODSENTENCA is its primary key), so
+        it is only read for records that have no versions yet.
+        """
         with connection.cursor() as cursor:
+            # Range on the unique (TABELA, ID_REGISTRO, VERSAO) index. Newest means the
+            # latest DATA_REF (the state mirrored in AUD_SQL), then the highest version,
+            # as in versoes.ORDEM_MAIS_RECENTE; a null DATA_REF sorts last on DESC
             cursor.execute("""
-                SELECT CODSENTENCA, TITULO, SENTENCA, APLICACAO, TAMANHO, 
+                SELECT ID_REGISTRO, TITULO, SENTENCA, APLICACAO, TAMANHO, 
                        RECCREATEDBY, RECCREATEDON, RECMODIFIEDBY
-                FROM AUD_SQL 
-                WHERE CODSENTENCA = %s 
-                ORDER BY RECCREATEDON DESC
+                FROM AUD_VERSAO 
+                WHERE TABELA = 'AUD_SQL' AND ID_REGISTRO = %s 
+                ORDER BY DATA_REF DESC, VERSAO DESC
             """, [codsentenca])
             
             rows = cursor.fetchall()
+            if not rows:
+                cursor.execute("""
+                    SELECT CODSENTENCA, TITULO, SENTENCA, APLICACAO, TAMANHO, 
+                           RECCREATEDBY, RECCREATEDON, RECMODIFIEDBY
+                    FROM AUD_SQL 
+                    WHERE CODSENTENCA = %s
+                """, [codsentenca])
+                rows = cursor.fetchall()
             result = []
             
             for row in rows:
@@ -45,7 +60,7 @@ class DjangoAudSQLRepository(IAudSQLRepository):
     
     def get_all(self) -> List[Dict[str, Any]]:
         """Get all records."""
-        records = CustomizacaoSQL.objects.all().order_by('-reccreatedon')
+        records = CustomizacaoSQL.objects.all().order_by('-data_ref', '-reccreatedon')
         result = []
         
         for reg in records:
@@ -0,0 +1,31 @@
+# customizacoes/management/commands/atualizar_atividade.py
+from django.core.management.base import BaseCommand
+from customizacoes.atividade import TAMANHO_LOTE_PADRAO, atualizar_atividade, reconstruir_atividade
+
+
+class Command(BaseCommand):
+    help = 'Soma à atividade diária (AUD_ATIVIDADE_DIARIA) as versões importadas em AUD_VERSAO desde a última execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE_PADRAO,
+            help=f'Versões de AUD_VERSAO lidas por transação (padrão: {TAMANHO_LOTE_PADRAO})'
+        )
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Apaga a atividade e soma de novo todas as versões de AUD_VERSAO'
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = max(1, options['lote'])
+        if options['reconstruir']:
+            resultado = reconstruir_atividade(tamanho_lote)
+        else:
+            resultado = atualizar_atividade(tamanho_lote)
+
+        for tabela, lidos in resultado.items():
+            self.stdout.write(f'  - {tabela}: {lidos} versões lidas')
+        self.stdout.write(self.style.SUCCESS('\nAtividade atualizada.'))
@@ -0,0 +1,21 @@
+# customizacoes/management/commands/atualizar_estatisticas.py
+from django.core.management.base import BaseCommand
+from customizacoes.estatisticas import TAMANHO_LOTE_PADRAO, atualizar_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Soma às estatísticas por registro (AUD_ESTATISTICA) as versões importadas em AUD_VERSAO desde a última execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE_PADRAO,
+            help=f'Versões de AUD_VERSAO lidas por transação (padrão: {TAMANHO_LOTE_PADRAO})'
+        )
+
+    def handle(self, *args, **options):
+        resultado = atualizar_estatisticas(max(1, options['lote']))
+        for tabela, lidos in resultado.items():
+            self.stdout.write(f'  - {tabela}: {lidos} versões lidas')
+        self.stdout.write(self.style.SUCCESS('\nEstatísticas atualizadas.'))
@@ -0,0 +1,30 @@
+# customizacoes/management/commands/detectar_agrupamentos_biconexos.py
+from django.core.management.base import BaseCommand
+from customizacoes.grafo import obter_grafo, listar_agrupamentos
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista os agrupamentos biconexos (registros AUD ligados por caminhos de dependência '
+        'redundantes) no cadastro de dependências'
+    )
+
+    def handle(self, *args, **options):
+        agrupamentos = listar_agrupamentos(obter_grafo())
+
+        if not agrupamentos:
+            self.stdout.write(self.style.SUCCESS('Nenhum agrupamento biconexo encontrado.'))
+            return
+
+        for numero, agrupamento in enumerate(agrupamentos, start=1):
+            self.stdout.write(self.style.WARNING(
+                f"\nAgrupamento {numero}: {agrupamento['tamanho']} registros "
+                f"(prioridade máxima: {agrupamento['prioridade_maxima'] or 'Sem Prioridade'})"
+            ))
+            for membro in agrupamento['membros']:
+                self.stdout.write(
+                    f"  - {membro['tabela']} {membro['id']}: {membro['nome'] or 'N/A'} "
+                    f"[{membro['prioridade'] or 'Sem Prioridade'}]"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'\n{len(agrupamentos)} agrupamento(s) biconexo(s) encontrado(s).'))
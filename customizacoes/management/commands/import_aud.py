@@ -2,8 +2,15 @@
 import csv
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils.dateparse import parse_datetime
-from customizacoes.models import CustomizacaoFV, CustomizacaoSQL, CustomizacaoReport
+from customizacoes.models import MODELO_POR_TIPO
+from customizacoes.tasks import pre_calcular_diffs
+from customizacoes.timeline import atualizacao_em_lote
+from customizacoes.versoes import data_ref_dos_dados, registrar_versao, substitui_retrato
+
+# Versões novas por task de pré-cálculo das diferenças
+TAMANHO_LOTE_DIFFS = 200
 
 
 def parse_int(value):
@@ -70,7 +77,10 @@ def parse_datetime_field(value):
 
 
 class Command(BaseCommand):
-    help = 'Importa CSV para tabelas AUD_ (permite importação parcial de dados)'
+    help = (
+        'Importa CSV para tabelas AUD_ (permite importação parcial de dados). Cada estado novo '
+        'de um registro vira uma versão em AUD_VERSAO e a tabela AUD_ fica com o mais recente'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Caminho do arquivo CSV')
@@ -78,35 +88,50 @@ class Command(BaseCommand):
         parser.add_argument(
             '--update',
             action='store_true',
-            help='Atualiza registros existentes ao invés de apenas criar novos'
+            help='Obsoleto: versões novas sempre atualizam o registro atual (mantido por compatibilidade)'
+        )
+        parser.add_argument(
+            '--sem-diffs',
+            action='store_true',
+            help='Não agenda o pré-cálculo das diferenças das versões novas (Celery)'
         )
 
     def handle(self, *args, **options):
         path = options['csv_file']
         model_type = options['model']
-        update_existing = options['update']
+        self.agendar_diffs = not options['sem_diffs']
+        self.versoes_novas = []
 
         imported = 0
         updated = 0
+        versioned = 0
+        unchanged = 0
         errors = []
 
         try:
-            with open(path, newline='', encoding='utf-8') as f:
+            # A linha do tempo (AUD_TIMELINE) é atualizada em lote ao final do arquivo
+            with open(path, newline='', encoding='utf-8') as f, atualizacao_em_lote():
                 reader = csv.DictReader(f)
                 
                 for row_num, row in enumerate(reader, start=2):  # Começa em 2 (linha 1 é header)
                     try:
                         if model_type == 'fv':
-                            result = self._import_fv(row, update_existing)
+                            result = self._import_fv(row)
                         elif model_type == 'sql':
-                            result = self._import_sql(row, update_existing)
+                            result = self._import_sql(row)
                         elif model_type == 'report':
-                            result = self._import_report(row, update_existing)
+                            result = self._import_report(row)
                         
                         if result == 'created':
                             imported += 1
                         elif result == 'updated':
                             updated += 1
+                        elif result == 'versioned':
+                            versioned += 1
+                        elif result == 'unchanged':
+                            unchanged += 1
+                        if len(self.versoes_novas) >= TAMANHO_LOTE_DIFFS:
+                            self._agendar_diffs()
                             
                     except Exception as e:
                         errors.append(f"Linha {row_num}: {str(e)}")
@@ -118,16 +143,58 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Erro ao ler arquivo: {str(e)}'))
             return
+        finally:
+            self._agendar_diffs()
 
         # Resumo
         self.stdout.write(self.style.SUCCESS(
             f'\nImportação concluída:\n'
             f'  - {imported} registros criados\n'
             f'  - {updated} registros atualizados\n'
+            f'  - {versioned} versões antigas guardadas sem alterar o registro atual\n'
+            f'  - {unchanged} linhas sem alteração\n'
             f'  - {len(errors)} erros'
         ))
 
-    def _import_fv(self, row, update_existing):
+    def _agendar_diffs(self):
+        """Agenda o cálculo das diferenças das versões já gravadas (a task lê as versões confirmadas)"""
+        ids, self.versoes_novas = self.versoes_novas, []
+        if not ids or not self.agendar_diffs:
+            return
+        try:
+            pre_calcular_diffs.delay(ids)
+        except Exception as e:
+            # Sem broker as diferenças são calculadas na primeira comparação
+            self.agendar_diffs = False
+            self.stdout.write(self.style.WARNING(f'Pré-cálculo das diferenças não agendado: {str(e)}'))
+
+    def _gravar_versao(self, tipo, registro_id, data):
+        """
+        Acrescenta a versão em AUD_VERSAO e, se ela for a mais recente, grava o
+        estado no registro AUD (o retrato da versão atual) na mesma transação.
+        Prioridade e observação do registro são mantidas.
+        Retorna 'created', 'updated', 'versioned' ou 'unchanged'.
+        """
+        modelo = MODELO_POR_TIPO[tipo]
+        with transaction.atomic():
+            atual = modelo.objects.select_for_update().filter(pk=registro_id).first()
+            versao = registrar_versao(tipo, registro_id, data, atual=atual)
+            if versao is None:
+                return 'unchanged'
+            self.versoes_novas.append(versao.id)
+            if atual is None:
+                modelo.objects.create(pk=registro_id, **data)
+                return 'created'
+
+            # Estado mais antigo que o atual (ex.: CSV fora de ordem) fica só no histórico
+            if not substitui_retrato(data_ref_dos_dados(data), atual.data_ref):
+                return 'versioned'
+            for campo, valor in data.items():
+                setattr(atual, campo, valor)
+            atual.save()
+            return 'updated'
+
+    def _import_fv(self, row):
         """Importa registro AUD_FV"""
         # Mapeia campos do CSV para o modelo
         data = {
@@ -146,20 +213,10 @@ class Command(BaseCommand):
         if not data['id']:
             raise ValueError("Campo ID é obrigatório")
 
-        if update_existing:
-            obj, created = CustomizacaoFV.objects.update_or_create(
-                id=data['id'],
-                defaults={k: v for k, v in data.items() if k != 'id'}
-            )
-            return 'created' if created else 'updated'
-        else:
-            CustomizacaoFV.objects.get_or_create(
-                id=data['id'],
-                defaults={k: v for k, v in data.items() if k != 'id'}
-            )
-            return 'created'
+        registro_id = data.pop('id')
+        return self._gravar_versao('fv', registro_id, data)
 
-    def _import_sql(self, row, update_existing):
+    def _import_sql(self, row):
         """Importa registro AUD_SQL"""
         # Mapeia campos do CSV para o modelo
         # Nota: CODSENTENCA no CSV pode ser string (ex: "CODEF001.0005"), 
@@ -212,20 +269,9 @@ class Command(BaseCommand):
             'recmodifiedon': parse_datetime_field(row.get('RECMODIFIEDON')),
         }
 
-        if update_existing:
-            obj, created = CustomizacaoSQL.objects.update_or_create(
-                codsentenca=codsentenca,
-                defaults=data
-            )
-            return 'created' if created else 'updated'
-        else:
-            CustomizacaoSQL.objects.get_or_create(
-                codsentenca=codsentenca,
-                defaults=data
-            )
-            return 'created'
+        return self._gravar_versao('sql', codsentenca, data)
 
-    def _import_report(self, row, update_existing):
+    def _import_report(self, row):
         """Importa registro AUD_REPORT"""
         # Mapeia campos do CSV para o modelo
         data = {
@@ -243,15 +289,5 @@ class Command(BaseCommand):
         if not data['id']:
             raise ValueError("Campo ID é obrigatório")
 
-        if update_existing:
-            obj, created = CustomizacaoReport.objects.update_or_create(
-                id=data['id'],
-                defaults={k: v for k, v in data.items() if k != 'id'}
-            )
-            return 'created' if created else 'updated'
-        else:
-            CustomizacaoReport.objects.get_or_create(
-                id=data['id'],
-                defaults={k: v for k, v in data.items() if k != 'id'}
-            )
-            return 'created'
\ No newline at end of file
+        registro_id = data.pop('id')
+        return self._gravar_versao('report', registro_id, data)
\ No newline at end of file
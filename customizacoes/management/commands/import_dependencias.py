@@ -0,0 +1,272 @@
+# customizacoes/management/commands/import_dependencias.py
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from openpyxl import load_workbook
+
+from customizacoes.busca import indexar_dependencias
+from customizacoes.models import (
+    CAMPO_POR_TIPO, MODELO_POR_TIPO, TAMANHO_LOTE_IN, CadastroDependencias, par_origem_destino, tipo_da_tabela
+)
+from customizacoes.propagacao import propagar_prioridades
+
+# Linhas validadas e gravadas por transação
+TAMANHO_LOTE_PADRAO = 500
+
+# Registros por INSERT (SQL Server aceita no máximo 2100 parâmetros por comando)
+BULK_BATCH_SIZE = 300
+
+# Quantidade máxima de erros listados individualmente no resumo
+MAX_ERROS_LISTADOS = 50
+
+
+def _para_int(valor):
+    """Converte o valor da célula em int, ou None se vazio. Levanta ValueError se inválido"""
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        if not valor.is_integer():
+            raise ValueError(f"ID inválido: {valor}")
+        return int(valor)
+    if isinstance(valor, int):
+        return valor
+    valor = str(valor).strip()
+    if not valor:
+        return None
+    try:
+        return int(float(valor)) if '.' in valor else int(valor)
+    except ValueError:
+        raise ValueError(f"ID inválido: {valor}")
+
+
+def _ler_csv(caminho):
+    """Itera (número da linha, {coluna: valor}) de um CSV"""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        for numero, linha in enumerate(csv.DictReader(f), start=2):
+            yield numero, {(k or '').strip().upper(): v for k, v in linha.items()}
+
+
+def _ler_xlsx(caminho, aba=None):
+    """Itera (número da linha, {coluna: valor}) de uma planilha, em modo somente leitura"""
+    workbook = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = workbook[aba] if aba else workbook.active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = [str(c or '').strip().upper() for c in next(linhas, ())]
+        for numero, valores in enumerate(linhas, start=2):
+            if all(v is None for v in valores):
+                continue
+            yield numero, dict(zip(cabecalho, valores))
+    finally:
+        workbook.close()
+
+
+def _extrair_par(linha):
+    """
+    Converte uma linha em (id_aud_sql, id_aud_report, id_aud_fv). Aceita as colunas
+    ID_AUD_SQL / ID_AUD_REPORT / ID_AUD_FV ou o layout do export
+    (ORIGEM_TABELA, ORIGEM_ID, DESTINO_TABELA, DESTINO_ID).
+    """
+    valores = {'sql': None, 'report': None, 'fv': None}
+    if 'ORIGEM_TABELA' in linha:
+        for lado in ('ORIGEM', 'DESTINO'):
+            tabela = str(linha.get(f'{lado}_TABELA') or '').strip()
+            tipo = tipo_da_tabela(tabela)
+            if tipo is None:
+                raise ValueError(f"Tabela inválida: {tabela or '(vazia)'}")
+            if valores[tipo] is not None:
+                raise ValueError("Origem e destino devem ser de tipos diferentes.")
+            valores[tipo] = _para_int(linha.get(f'{lado}_ID'))
+    else:
+        for tipo, campo in CAMPO_POR_TIPO.items():
+            valores[tipo] = _para_int(linha.get(campo.upper()))
+
+    if sum(1 for v in valores.values() if v is not None) != 2:
+        raise ValueError("Exatamente 2 campos devem ser preenchidos.")
+    return valores['sql'], valores['report'], valores['fv']
+
+
+class Command(BaseCommand):
+    help = 'Importa dependências (SQL/Report/FV) de um CSV ou XLSX para Cadastro_Dependencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', type=str, help='Caminho do arquivo CSV ou XLSX')
+        parser.add_argument(
+            '--aba',
+            type=str,
+            help='Nome da aba do XLSX (padrão: a aba ativa)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE_PADRAO,
+            help=f'Linhas validadas e gravadas por transação (padrão: {TAMANHO_LOTE_PADRAO})'
+        )
+        parser.add_argument(
+            '--criado-por',
+            type=int,
+            help='ID do usuário gravado em CRIADO_POR'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida o arquivo, sem gravar'
+        )
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        if not os.path.exists(caminho):
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao == '.csv':
+            linhas = _ler_csv(caminho)
+        elif extensao in ('.xlsx', '.xlsm'):
+            linhas = _ler_xlsx(caminho, options['aba'])
+        else:
+            raise CommandError('Formato não suportado. Use CSV ou XLSX.')
+
+        self.tamanho_lote = max(1, options['lote'])
+        self.criado_por = options['criado_por']
+        self.dry_run = options['dry_run']
+
+        self.stats = {'lidas': 0, 'criadas': 0, 'existentes': 0, 'repetidas': 0, 'invalidas': 0, 'inexistentes': 0}
+        self.erros = []
+        self.vistos = set()  # pares já lidos no arquivo
+        self.ids_validos = {tipo: set() for tipo in MODELO_POR_TIPO}
+        self.ids_inexistentes = {tipo: set() for tipo in MODELO_POR_TIPO}
+        self.origens = set()
+
+        maior_id_antes = CadastroDependencias.objects.assinatura()[1]
+        inicio = time.monotonic()
+
+        lote = []
+        for numero, linha in linhas:
+            self.stats['lidas'] += 1
+            lote.append((numero, linha))
+            if len(lote) >= self.tamanho_lote:
+                self._processar_lote(lote)
+                lote = []
+        if lote:
+            self._processar_lote(lote)
+
+        duracao = time.monotonic() - inicio
+
+        if self.stats['criadas'] and not self.dry_run:
+            # bulk_create não dispara signals: indexa a busca e propaga as prioridades
+            indexar_dependencias(
+                CadastroDependencias.objects.filter(id__gt=maior_id_antes).values_list('id', flat=True)
+            )
+            propagar_prioridades(origens=list(self.origens))
+
+        self._resumo(duracao)
+
+    def _erro(self, numero, mensagem, chave):
+        self.stats[chave] += 1
+        self.erros.append(f'Linha {numero}: {mensagem}')
+
+    def _processar_lote(self, lote):
+        """Valida um lote de linhas com consultas em conjunto e insere as novas dependências"""
+        candidatas = []
+        for numero, linha in lote:
+            try:
+                par = _extrair_par(linha)
+            except ValueError as e:
+                self._erro(numero, str(e), 'invalidas')
+                continue
+            if par in self.vistos:
+                self.stats['repetidas'] += 1
+                continue
+            self.vistos.add(par)
+            candidatas.append((numero, par))
+
+        # Existência dos registros AUD: uma query IN por tabela, com cache entre lotes
+        for tipo, posicao in (('sql', 0), ('report', 1), ('fv', 2)):
+            pendentes = list({
+                par[posicao] for _, par in candidatas if par[posicao] is not None
+            } - self.ids_validos[tipo] - self.ids_inexistentes[tipo])
+            modelo = MODELO_POR_TIPO[tipo]
+            for inicio in range(0, len(pendentes), TAMANHO_LOTE_IN):
+                ids = pendentes[inicio:inicio + TAMANHO_LOTE_IN]
+                encontrados = set(modelo.objects.filter(pk__in=ids).values_list('pk', flat=True))
+                self.ids_validos[tipo] |= encontrados
+                self.ids_inexistentes[tipo] |= set(ids) - encontrados
+
+        validas = []
+        for numero, par in candidatas:
+            faltando = [
+                f'{MODELO_POR_TIPO[tipo]._meta.db_table} {par[posicao]}'
+                for tipo, posicao in (('sql', 0), ('report', 1), ('fv', 2))
+                if par[posicao] is not None and par[posicao] in self.ids_inexistentes[tipo]
+            ]
+            if faltando:
+                self._erro(numero, f"Registro não encontrado: {', '.join(faltando)}", 'inexistentes')
+                continue
+            validas.append(par)
+
+        if not validas:
+            return
+        try:
+            self._inserir(validas)
+        except IntegrityError:
+            # Outro processo cadastrou um dos pares entre a verificação e o insert
+            self._inserir(validas)
+
+    def _pares_existentes(self, pares):
+        """Pares do lote que já estão cadastrados (uma query por combinação de tabelas)"""
+        existentes = set()
+        combinacoes = (
+            (0, 1, 'id_aud_sql', 'id_aud_report', 'id_aud_fv'),
+            (0, 2, 'id_aud_sql', 'id_aud_fv', 'id_aud_report'),
+            (1, 2, 'id_aud_report', 'id_aud_fv', 'id_aud_sql'),
+        )
+        for a, b, campo_a, campo_b, campo_vazio in combinacoes:
+            do_tipo = [par for par in pares if par[a] is not None and par[b] is not None]
+            # Duas listas IN por query: metade do limite para cada uma
+            for inicio in range(0, len(do_tipo), TAMANHO_LOTE_IN // 2):
+                trecho = do_tipo[inicio:inicio + TAMANHO_LOTE_IN // 2]
+                encontrados = set(CadastroDependencias.objects.filter(**{
+                    f'{campo_a}__in': {par[a] for par in trecho},
+                    f'{campo_b}__in': {par[b] for par in trecho},
+                    f'{campo_vazio}__isnull': True,
+                }).values_list(campo_a, campo_b))
+                existentes |= {par for par in trecho if (par[a], par[b]) in encontrados}
+        return existentes
+
+    def _inserir(self, pares):
+        with transaction.atomic():
+            existentes = self._pares_existentes(pares)
+            novas = [
+                CadastroDependencias(
+                    id_aud_sql=sql, id_aud_report=report, id_aud_fv=fv, criado_por=self.criado_por
+                )
+                for sql, report, fv in pares if (sql, report, fv) not in existentes
+            ]
+            if novas and not self.dry_run:
+                CadastroDependencias.objects.bulk_create(novas, batch_size=BULK_BATCH_SIZE)
+        self.stats['existentes'] += len(existentes)
+        self.stats['criadas'] += len(novas)
+        for dep in novas:
+            self.origens.add(par_origem_destino(dep.id_aud_sql, dep.id_aud_report, dep.id_aud_fv)[0])
+
+    def _resumo(self, duracao):
+        for erro in self.erros[:MAX_ERROS_LISTADOS]:
+            self.stdout.write(self.style.WARNING(erro))
+        if len(self.erros) > MAX_ERROS_LISTADOS:
+            self.stdout.write(self.style.WARNING(f'... e mais {len(self.erros) - MAX_ERROS_LISTADOS} erros'))
+
+        stats = self.stats
+        por_segundo = stats['lidas'] / duracao if duracao > 0 else stats['lidas']
+        criadas = 'seriam criadas (dry-run)' if self.dry_run else 'criadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'\nImportação concluída em {duracao:.1f}s ({por_segundo:.0f} linhas/s):\n'
+            f'  - {stats["lidas"]} linhas lidas\n'
+            f'  - {stats["criadas"]} dependências {criadas}\n'
+            f'  - {stats["existentes"]} já cadastradas (ignoradas)\n'
+            f'  - {stats["repetidas"]} repetidas no arquivo (ignoradas)\n'
+            f'  - {stats["invalidas"]} linhas inválidas\n'
+            f'  - {stats["inexistentes"]} com registro AUD inexistente'
+        ))
@@ -0,0 +1,13 @@
+# customizacoes/management/commands/inicializar_versoes.py
+from django.core.management.base import BaseCommand
+
+from customizacoes.versoes import inicializar_versoes
+
+
+class Command(BaseCommand):
+    help = 'Cria em AUD_VERSAO a versão 1 (estado atual) dos registros AUD que ainda não têm versões'
+
+    def handle(self, *args, **options):
+        for tabela, criadas in inicializar_versoes().items():
+            self.stdout.write(f'  - {tabela}: {criadas} versões criadas')
+        self.stdout.write(self.style.SUCCESS('\nVersões inicializadas.'))
@@ -0,0 +1,52 @@
+# customizacoes/management/commands/limpar_dependencias_orfas.py
+from django.core.management.base import BaseCommand
+from customizacoes.dependencias_orfas import TAMANHO_LOTE_PADRAO, encontrar_orfas, limpar_orfas
+from customizacoes.models import MODELO_POR_TIPO
+
+
+class Command(BaseCommand):
+    help = 'Encontra dependências que apontam para registros AUD inexistentes e, opcionalmente, remove ou coloca em quarentena'
+
+    def add_arguments(self, parser):
+        acao = parser.add_mutually_exclusive_group()
+        acao.add_argument(
+            '--remover',
+            action='store_true',
+            help='Remove as dependências órfãs'
+        )
+        acao.add_argument(
+            '--quarentena',
+            action='store_true',
+            help='Move as dependências órfãs para Cadastro_Dependencias_Quarentena'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE_PADRAO,
+            help=f'Quantidade de dependências por transação (padrão: {TAMANHO_LOTE_PADRAO})'
+        )
+
+    def handle(self, *args, **options):
+        orfas = encontrar_orfas()
+        total = len({dep_id for ids in orfas.values() for dep_id in ids})
+
+        for tipo, ids in orfas.items():
+            tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+            self.stdout.write(f'  - {tabela}: {len(ids)} dependências com referência inexistente')
+            if ids:
+                amostra = ', '.join(str(i) for i in ids[:20])
+                self.stdout.write(f'    IDs: {amostra}{" ..." if len(ids) > 20 else ""}')
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nenhuma dependência órfã encontrada.'))
+            return
+
+        if options['remover'] or options['quarentena']:
+            acao = 'quarentena' if options['quarentena'] else 'remover'
+            tratadas = limpar_orfas(orfas, acao, max(1, options['lote']))
+            verbo = 'movidas para quarentena' if acao == 'quarentena' else 'removidas'
+            self.stdout.write(self.style.SUCCESS(f'\n{tratadas} dependências órfãs {verbo}.'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'\n{total} dependências órfãs encontradas. Use --remover ou --quarentena para tratá-las.'
+            ))
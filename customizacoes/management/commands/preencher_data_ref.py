@@ -0,0 +1,42 @@
+# customizacoes/management/commands/preencher_data_ref.py
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from customizacoes.models import DATA_REF_CALCULADA, MODELO_POR_TIPO
+
+# Registros por UPDATE (intervalo de chaves primárias)
+TAMANHO_LOTE_PADRAO = 5000
+
+
+class Command(BaseCommand):
+    help = 'Preenche DATA_REF (COALESCE(RECMODIFIEDON, RECCREATEDON)) nas tabelas AUD onde estiver divergente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE_PADRAO,
+            help=f'Registros por UPDATE (padrão: {TAMANHO_LOTE_PADRAO})'
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = max(1, options['lote'])
+        # Divergente: DATA_REF vazia com alguma data preenchida, ou diferente da data calculada
+        divergentes = (
+            Q(data_ref__isnull=True, recmodifiedon__isnull=False) |
+            Q(data_ref__isnull=True, reccreatedon__isnull=False) |
+            Q(data_ref__isnull=False, recmodifiedon__isnull=True, reccreatedon__isnull=True) |
+            (Q(data_ref__isnull=False) & ~Q(data_ref=DATA_REF_CALCULADA))
+        )
+
+        for modelo in MODELO_POR_TIPO.values():
+            pks = list(modelo.objects.order_by('pk').values_list('pk', flat=True))
+            atualizados = 0
+            for inicio in range(0, len(pks), tamanho_lote):
+                trecho = pks[inicio:inicio + tamanho_lote]
+                atualizados += modelo.objects.filter(
+                    divergentes, pk__gte=trecho[0], pk__lte=trecho[-1]
+                ).update(data_ref=DATA_REF_CALCULADA)
+            self.stdout.write(f'  - {modelo._meta.db_table}: {atualizados} registros atualizados')
+
+        self.stdout.write(self.style.SUCCESS('\nDATA_REF preenchida.'))
@@ -0,0 +1,15 @@
+# customizacoes/management/commands/reconciliar_timeline.py
+from django.core.management.base import BaseCommand
+from customizacoes.timeline import reconciliar_timeline
+
+
+class Command(BaseCommand):
+    help = 'Confere a linha do tempo unificada (AUD_TIMELINE) contra as tabelas AUD e corrige divergências'
+
+    def handle(self, *args, **options):
+        resultado = reconciliar_timeline()
+        for tabela, (criadas, atualizadas, removidas) in resultado.items():
+            self.stdout.write(
+                f'  - {tabela}: {criadas} criadas, {atualizadas} atualizadas, {removidas} removidas'
+            )
+        self.stdout.write(self.style.SUCCESS('\nLinha do tempo reconciliada.'))
@@ -0,0 +1,13 @@
+# customizacoes/management/commands/reconstruir_estatisticas.py
+from django.core.management.base import BaseCommand
+from customizacoes.estatisticas import reconstruir_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Recria as estatísticas de alteração por registro (AUD_ESTATISTICA) a partir das versões de AUD_VERSAO'
+
+    def handle(self, *args, **options):
+        resultado = reconstruir_estatisticas()
+        for tabela, lidos in resultado.items():
+            self.stdout.write(f'  - {tabela}: {lidos} versões lidas')
+        self.stdout.write(self.style.SUCCESS('\nEstatísticas reconstruídas.'))
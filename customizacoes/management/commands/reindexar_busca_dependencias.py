@@ -0,0 +1,11 @@
+# customizacoes/management/commands/reindexar_busca_dependencias.py
+from django.core.management.base import BaseCommand
+from customizacoes.busca import reindexar_tudo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os termos de busca do cadastro de dependências (Cadastro_Dependencias_Busca)'
+
+    def handle(self, *args, **options):
+        total = reindexar_tudo()
+        self.stdout.write(self.style.SUCCESS(f'{total} dependência(s) reindexada(s).'))
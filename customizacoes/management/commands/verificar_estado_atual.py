@@ -0,0 +1,54 @@
+# customizacoes/management/commands/verificar_estado_atual.py
+from django.core.management.base import BaseCommand, CommandError
+
+from customizacoes.versoes import verificar_estado_atual
+
+# Registros listados como exemplo de cada divergência
+EXEMPLOS = 10
+
+DESCRICOES = {
+    'divergentes': 'registros diferentes da versão mais recente',
+    'sem_versao': 'registros sem versões em AUD_VERSAO',
+    'sem_registro': 'registros com versões mas ausentes da tabela',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói a partir de AUD_VERSAO o estado atual esperado das tabelas AUD '
+        '(versão mais recente de cada registro) e mostra as divergências'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Grava a versão mais recente nos registros divergentes e recria os ausentes'
+        )
+        parser.add_argument(
+            '--estrito',
+            action='store_true',
+            help='Termina com erro se houver divergências (ignorado com --corrigir)'
+        )
+
+    def handle(self, *args, **options):
+        corrigir = options['corrigir']
+        total = 0
+        for tabela, divergencias in verificar_estado_atual(corrigir=corrigir).items():
+            self.stdout.write(f'\n{tabela}')
+            for situacao, ids in divergencias.items():
+                total += len(ids)
+                exemplos = ', '.join(str(registro_id) for registro_id in ids[:EXEMPLOS])
+                sufixo = f' ({exemplos}{", ..." if len(ids) > EXEMPLOS else ""})' if ids else ''
+                self.stdout.write(f'  - {len(ids)} {DESCRICOES[situacao]}{sufixo}')
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('\nTabelas AUD iguais à versão mais recente de cada registro.'))
+        elif corrigir:
+            self.stdout.write(self.style.SUCCESS(f'\n{total} divergências corrigidas.'))
+        elif options['estrito']:
+            raise CommandError(f'{total} divergências entre as tabelas AUD e AUD_VERSAO.')
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'\n{total} divergências. Use --corrigir para reconstruir a partir de AUD_VERSAO.'
+            ))
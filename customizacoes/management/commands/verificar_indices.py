@@ -0,0 +1,150 @@
+# customizacoes/management/commands/verificar_indices.py
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F
+from django.utils import timezone
+
+from customizacoes.models import (
+    AudEstatisticaRegistro, AudTimeline, AudVersao, CadastroDependencias, CustomizacaoFV, CustomizacaoReport, CustomizacaoSQL,
+    DependenciaBusca,
+)
+
+# Trecho do plano do SQLite com o índice usado em cada tabela
+PADRAO_INDICE = re.compile(
+    r'(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?(INDEX (\w+)|INTEGER PRIMARY KEY))?'
+)
+
+
+def _consultas():
+    """
+    (endpoint, descrição, queryset, índice esperado) das consultas principais de cada
+    endpoint. O esperado pode ser uma tupla de nomes aceitos; None indica consulta só
+    informativa (não acusa regressão).
+    """
+    agora = timezone.now()
+    return [
+        ('/api/dependencias/', 'listagem (mais recentes)',
+         CadastroDependencias.objects.order_by('-data_criacao')[:10], 'idx_dep_data_criacao'),
+        ('/api/dependencias/', 'filtro origem_tabela=AUD_SQL',
+         CadastroDependencias.objects.filter(id_aud_sql__isnull=False).order_by('-data_criacao')[:10],
+         'idx_dep_data_criacao'),
+        ('/api/dependencias/', 'dependências de um Report',
+         CadastroDependencias.objects.filter(id_aud_report=1).order_by('-data_criacao'), 'idx_dep_report_data'),
+        ('/api/dependencias/', 'dependências de uma FV',
+         CadastroDependencias.objects.filter(id_aud_fv=1).order_by('-data_criacao'), 'idx_dep_fv_data'),
+        ('/api/dependencias/', 'busca por prefixo (LIKE com ESCAPE não usa índice no SQLite)',
+         DependenciaBusca.objects.filter(termo__startswith='abc').values('dependencia_id'), None),
+        ('/api/dependencias/criar-multiplas/', 'pares já cadastrados',
+         CadastroDependencias.objects.filter(id_aud_sql=1, id_aud_report__in=[1, 2], id_aud_fv__isnull=True),
+         'uniq_dependencia_sql_report'),
+        ('/api/sql/', 'listagem por título', CustomizacaoSQL.objects.order_by('titulo')[:10], 'idx_aud_sql_titulo'),
+        ('/api/reports/', 'listagem por código',
+         CustomizacaoReport.objects.order_by('codigo')[:10], 'idx_aud_report_codigo'),
+        ('/api/fv/', 'listagem por nome', CustomizacaoFV.objects.order_by('nome')[:10], 'idx_aud_fv_nome'),
+        ('/api/insights/prioridades', 'contagem por prioridade (AUD_SQL)',
+         CustomizacaoSQL.objects.values_list('prioridade').annotate(total=Count('pk')).order_by(),
+         'idx_aud_sql_prioridade'),
+        ('/api/insights/prioridades', 'contagem por prioridade (AUD_REPORT)',
+         CustomizacaoReport.objects.values_list('prioridade').annotate(total=Count('pk')).order_by(),
+         'idx_aud_report_prioridade'),
+        ('/api/insights/prioridades', 'contagem por prioridade (AUD_FV)',
+         CustomizacaoFV.objects.values_list('prioridade').annotate(total=Count('pk')).order_by(),
+         'idx_aud_fv_prioridade'),
+        ('/api/insights/registros-frequentes', 'mais alterados',
+         AudEstatisticaRegistro.objects.order_by('-versoes', 'tabela', 'registro_id')[:20], 'idx_estat_versoes'),
+        ('/api/insights/registros-frequentes', 'menos editores (ordem crescente)',
+         AudEstatisticaRegistro.objects.order_by('editores', '-tabela', '-registro_id')[:20], 'idx_estat_editores'),
+        ('/api/historico-alteracoes/', 'página sem filtro de tabela',
+         AudTimeline.objects.filter(data_ref__lt=agora).order_by('-data_ref', 'tabela', 'registro_id')[:20],
+         'idx_timeline_data_ref'),
+        ('/api/historico-alteracoes/', 'página de uma tabela',
+         AudTimeline.objects.filter(tabela='AUD_SQL', data_ref__lt=agora).order_by('-data_ref', 'registro_id')[:20],
+         'idx_timeline_tabela_data'),
+        ('/api/notificacoes/', 'somente não lidas',
+         AudTimeline.objects.filter(lida=0).order_by('-data_ref', 'tabela', 'registro_id')[:50],
+         'idx_timeline_lida_data'),
+        ('/api/estado-em/', 'página do estado em uma data',
+         AudVersao.objects.filter(tabela__in=['AUD_SQL', 'AUD_FV'], data_ref__lte=agora)
+         .order_by('tabela', 'registro_id')[:50],
+         # Qualquer índice iniciado por (TABELA, ID_REGISTRO); a constraint única vira o índice automático no SQLite
+         ('uniq_versao_registro', 'sqlite_autoindex_AUD_VERSAO_1', 'idx_versao_registro_data')),
+        ('/api/mudancas/', 'página de mudanças entre duas datas',
+         AudVersao.objects.filter(data_ref__gt=agora - timedelta(days=30), data_ref__lte=agora)
+         .order_by('-data_ref', 'tabela', 'registro_id')[:50],
+         'idx_versao_data'),
+        ('/api/comparar-registros/', 'versão anterior de um registro',
+         AudVersao.objects.filter(tabela='AUD_SQL', registro_id=1, versao__lt=5).order_by('-versao')[:1],
+         ('uniq_versao_registro', 'sqlite_autoindex_AUD_VERSAO_1')),
+        ('/api/versoes/', 'versão em vigor em uma data',
+         AudVersao.objects.filter(tabela='AUD_SQL', registro_id=1, data_ref__lte=agora)
+         .order_by(F('data_ref').desc(nulls_last=True), F('versao').desc())[:1],
+         'idx_versao_registro_data'),
+        ('/api/versoes/', 'página de versões de um registro',
+         AudVersao.objects.filter(tabela='AUD_SQL', registro_id=1, versao__lt=50).order_by('-versao')[:50],
+         ('uniq_versao_registro', 'sqlite_autoindex_AUD_VERSAO_1')),
+    ]
+
+
+def _indices_do_plano(plano):
+    """Lista 'tabela: índice' (ou 'tabela: varredura completa') de cada acesso do plano"""
+    acessos = []
+    for linha in plano.splitlines():
+        encontrado = PADRAO_INDICE.search(linha)
+        if not encontrado:
+            continue
+        operacao, tabela, uso, indice = encontrado.groups()
+        if indice:
+            acessos.append((tabela, indice))
+        elif uso:
+            acessos.append((tabela, 'PRIMARY KEY'))
+        else:
+            acessos.append((tabela, 'varredura completa' if operacao == 'SCAN' else 'busca sem índice'))
+    return acessos
+
+
+class Command(BaseCommand):
+    help = 'Mostra, por endpoint, o índice usado por cada consulta principal (plano do SQLite local)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estrito',
+            action='store_true',
+            help='Termina com erro se alguma consulta não usar o índice esperado'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                f'O comando lê o plano do SQLite; o banco configurado é {connection.vendor}.'
+            )
+
+        regressoes = []
+        endpoint_atual = None
+        for endpoint, descricao, queryset, esperado in _consultas():
+            if endpoint != endpoint_atual:
+                self.stdout.write(f'\n{endpoint}')
+                endpoint_atual = endpoint
+            plano = queryset.explain()
+            acessos = _indices_do_plano(plano)
+            usados = ', '.join(f'{tabela}: {indice}' for tabela, indice in acessos) or '(sem acesso a tabela)'
+            ordenacao_extra = ' [ordenação em memória]' if 'USE TEMP B-TREE' in plano else ''
+
+            aceitos = {esperado} if isinstance(esperado, str) else set(esperado or ())
+            if aceitos and not aceitos & {indice for _, indice in acessos}:
+                regressoes.append(f'{endpoint} - {descricao}')
+                self.stdout.write(self.style.ERROR(
+                    f'  - {descricao}: {usados}{ordenacao_extra} (esperado {" ou ".join(sorted(aceitos))})'
+                ))
+            else:
+                self.stdout.write(f'  - {descricao}: {usados}{ordenacao_extra}')
+
+        if regressoes:
+            mensagem = f'\n{len(regressoes)} consultas sem o índice esperado.'
+            if options['estrito']:
+                raise CommandError(mensagem)
+            self.stdout.write(self.style.WARNING(mensagem))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nTodas as consultas usam o índice esperado.'))
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def remover_pares_duplicados(apps, schema_editor):
+    """Mantém apenas a dependência mais antiga de cada par antes de criar as constraints"""
+    CadastroDependencias = apps.get_model('customizacoes', 'CadastroDependencias')
+    vistos = set()
+    duplicadas = []
+    for dep_id, sql, report, fv in CadastroDependencias.objects.order_by('id').values_list(
+        'id', 'id_aud_sql', 'id_aud_report', 'id_aud_fv'
+    ).iterator():
+        chave = (sql, report, fv)
+        if chave in vistos:
+            duplicadas.append(dep_id)
+        else:
+            vistos.add(chave)
+    for inicio in range(0, len(duplicadas), 1000):
+        CadastroDependencias.objects.filter(id__in=duplicadas[inicio:inicio + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0002_cadastrodependencias_prioridade'),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_pares_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cadastrodependencias',
+            constraint=models.UniqueConstraint(condition=models.Q(('id_aud_fv__isnull', True)), fields=('id_aud_sql', 'id_aud_report'), name='uniq_dependencia_sql_report'),
+        ),
+        migrations.AddConstraint(
+            model_name='cadastrodependencias',
+            constraint=models.UniqueConstraint(condition=models.Q(('id_aud_report__isnull', True)), fields=('id_aud_sql', 'id_aud_fv'), name='uniq_dependencia_sql_fv'),
+        ),
+        migrations.AddConstraint(
+            model_name='cadastrodependencias',
+            constraint=models.UniqueConstraint(condition=models.Q(('id_aud_sql__isnull', True)), fields=('id_aud_report', 'id_aud_fv'), name='uniq_dependencia_report_fv'),
+        ),
+    ]
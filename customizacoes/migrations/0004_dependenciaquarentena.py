@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0003_cadastrodependencias_par_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DependenciaQuarentena',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('id_original', models.IntegerField(db_column='ID_ORIGINAL')),
+                ('id_aud_sql', models.IntegerField(blank=True, db_column='ID_AUD_SQL', null=True)),
+                ('id_aud_report', models.IntegerField(blank=True, db_column='ID_AUD_REPORT', null=True)),
+                ('id_aud_fv', models.IntegerField(blank=True, db_column='ID_AUD_FV', null=True)),
+                ('data_criacao', models.DateTimeField(blank=True, db_column='DATA_CRIACAO', null=True)),
+                ('criado_por', models.IntegerField(blank=True, db_column='CRIADO_POR', null=True)),
+                ('motivo', models.CharField(db_column='MOTIVO', max_length=255)),
+                ('data_quarentena', models.DateTimeField(auto_now_add=True, db_column='DATA_QUARENTENA')),
+            ],
+            options={
+                'db_table': 'Cadastro_Dependencias_Quarentena',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0004_dependenciaquarentena'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DependenciaBusca',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('termo', models.CharField(db_column='TERMO', max_length=100)),
+                ('dependencia', models.ForeignKey(db_column='ID_DEPENDENCIA', on_delete=django.db.models.deletion.CASCADE, related_name='termos_busca', to='customizacoes.cadastrodependencias')),
+            ],
+            options={
+                'db_table': 'Cadastro_Dependencias_Busca',
+                'managed': True,
+                'indexes': [models.Index(fields=['termo', 'dependencia'], name='idx_dep_busca_termo')],
+            },
+        ),
+    ]
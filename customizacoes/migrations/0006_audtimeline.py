@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0005_dependenciabusca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudTimeline',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('tabela', models.CharField(db_column='TABELA', max_length=20)),
+                ('registro_id', models.IntegerField(db_column='ID_REGISTRO')),
+                ('versao_ref', models.IntegerField(db_column='VERSAO_REF', default=1)),
+                ('data_ref', models.DateTimeField(db_column='DATA_REF')),
+                ('data_criacao', models.DateTimeField(blank=True, db_column='DATA_CRIACAO', null=True)),
+                ('data_modificacao', models.DateTimeField(blank=True, db_column='DATA_MODIFICACAO', null=True)),
+                ('usuario', models.CharField(blank=True, db_column='USUARIO', max_length=100, null=True)),
+                ('prioridade', models.CharField(blank=True, db_column='PRIORIDADE', max_length=50, null=True)),
+                ('lida', models.IntegerField(db_column='LIDA', default=0)),
+                ('titulo', models.CharField(db_column='TITULO', max_length=255)),
+                ('resumo', models.CharField(db_column='RESUMO', max_length=280)),
+            ],
+            options={
+                'db_table': 'AUD_TIMELINE',
+                'managed': True,
+                'indexes': [
+                    models.Index(
+                        fields=['-data_ref', 'tabela', 'registro_id'],
+                        include=('versao_ref', 'data_criacao', 'data_modificacao', 'usuario', 'prioridade', 'lida', 'titulo', 'resumo'),
+                        name='idx_timeline_data_ref',
+                    ),
+                    models.Index(fields=['tabela', '-data_ref'], name='idx_timeline_tabela_data'),
+                    models.Index(fields=['lida', '-data_ref'], name='idx_timeline_lida_data'),
+                ],
+                'constraints': [models.UniqueConstraint(fields=('tabela', 'registro_id'), name='uniq_timeline_registro')],
+            },
+        ),
+    ]
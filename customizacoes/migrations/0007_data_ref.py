@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:52
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def preencher_data_ref(apps, schema_editor):
+    for nome in ('CustomizacaoSQL', 'CustomizacaoReport', 'CustomizacaoFV'):
+        modelo = apps.get_model('customizacoes', nome)
+        modelo.objects.update(data_ref=Coalesce('recmodifiedon', 'reccreatedon'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0006_audtimeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizacaofv',
+            name='data_ref',
+            field=models.DateTimeField(blank=True, db_column='DATA_REF', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customizacaoreport',
+            name='data_ref',
+            field=models.DateTimeField(blank=True, db_column='DATA_REF', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customizacaosql',
+            name='data_ref',
+            field=models.DateTimeField(blank=True, db_column='DATA_REF', editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaofv',
+            index=models.Index(fields=['data_ref'], name='idx_aud_fv_data_ref'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaoreport',
+            index=models.Index(fields=['data_ref'], name='idx_aud_report_data_ref'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaosql',
+            index=models.Index(fields=['data_ref'], name='idx_aud_sql_data_ref'),
+        ),
+        migrations.RunPython(preencher_data_ref, migrations.RunPython.noop),
+    ]
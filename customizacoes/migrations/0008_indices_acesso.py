@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0007_data_ref'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='audtimeline',
+            name='idx_timeline_tabela_data',
+        ),
+        migrations.RemoveIndex(
+            model_name='audtimeline',
+            name='idx_timeline_lida_data',
+        ),
+        migrations.AddIndex(
+            model_name='audtimeline',
+            index=models.Index(fields=['tabela', '-data_ref', 'registro_id'], name='idx_timeline_tabela_data'),
+        ),
+        migrations.AddIndex(
+            model_name='audtimeline',
+            index=models.Index(fields=['lida', '-data_ref', 'tabela', 'registro_id'], name='idx_timeline_lida_data'),
+        ),
+        migrations.AddIndex(
+            model_name='cadastrodependencias',
+            index=models.Index(fields=['-data_criacao', 'id'], include=('id_aud_sql', 'id_aud_report', 'id_aud_fv', 'criado_por'), name='idx_dep_data_criacao'),
+        ),
+        migrations.AddIndex(
+            model_name='cadastrodependencias',
+            index=models.Index(fields=['id_aud_sql', '-data_criacao'], name='idx_dep_sql_data'),
+        ),
+        migrations.AddIndex(
+            model_name='cadastrodependencias',
+            index=models.Index(fields=['id_aud_report', '-data_criacao'], name='idx_dep_report_data'),
+        ),
+        migrations.AddIndex(
+            model_name='cadastrodependencias',
+            index=models.Index(fields=['id_aud_fv', '-data_criacao'], name='idx_dep_fv_data'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaofv',
+            index=models.Index(fields=['nome'], name='idx_aud_fv_nome'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaofv',
+            index=models.Index(fields=['prioridade'], name='idx_aud_fv_prioridade'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaoreport',
+            index=models.Index(fields=['codigo'], name='idx_aud_report_codigo'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaoreport',
+            index=models.Index(fields=['prioridade'], name='idx_aud_report_prioridade'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaosql',
+            index=models.Index(fields=['titulo'], name='idx_aud_sql_titulo'),
+        ),
+        migrations.AddIndex(
+            model_name='customizacaosql',
+            index=models.Index(fields=['prioridade'], name='idx_aud_sql_prioridade'),
+        ),
+    ]
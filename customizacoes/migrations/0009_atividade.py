@@ -0,0 +1,44 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0008_indices_acesso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtividadeMarca',
+            fields=[
+                ('tabela', models.CharField(db_column='TABELA', max_length=20, primary_key=True, serialize=False)),
+                ('data_ref', models.DateTimeField(db_column='DATA_REF')),
+                ('registro_id', models.IntegerField(db_column='ID_REGISTRO')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, db_column='ATUALIZADO_EM')),
+            ],
+            options={
+                'db_table': 'AUD_ATIVIDADE_MARCA',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='AtividadeDiaria',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('dia', models.DateField(db_column='DIA')),
+                ('usuario', models.CharField(db_column='USUARIO', default='', max_length=100)),
+                ('tabela', models.CharField(db_column='TABELA', max_length=20)),
+                ('codcoligada', models.IntegerField(db_column='CODCOLIGADA', default=0)),
+                ('criacoes', models.IntegerField(db_column='CRIACOES', default=0)),
+                ('modificacoes', models.IntegerField(db_column='MODIFICACOES', default=0)),
+            ],
+            options={
+                'db_table': 'AUD_ATIVIDADE_DIARIA',
+                'managed': True,
+                'indexes': [models.Index(fields=['tabela', 'dia'], name='idx_atividade_tabela_dia'), models.Index(fields=['usuario', 'dia'], name='idx_atividade_usuario_dia')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'usuario', 'tabela', 'codcoligada'), name='uniq_atividade_dia')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-17 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0009_atividade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudEstatisticaEditor',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('tabela', models.CharField(db_column='TABELA', max_length=20)),
+                ('registro_id', models.IntegerField(db_column='ID_REGISTRO')),
+                ('usuario', models.CharField(db_column='USUARIO', max_length=100)),
+            ],
+            options={
+                'db_table': 'AUD_ESTATISTICA_EDITOR',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('tabela', 'registro_id', 'usuario'), name='uniq_estatistica_editor')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AudEstatisticaRegistro',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('tabela', models.CharField(db_column='TABELA', max_length=20)),
+                ('registro_id', models.IntegerField(db_column='ID_REGISTRO')),
+                ('versoes', models.IntegerField(db_column='VERSOES', default=0)),
+                ('editores', models.IntegerField(db_column='EDITORES', default=0)),
+                ('primeira_data', models.DateTimeField(db_column='PRIMEIRA_DATA')),
+                ('ultima_alteracao', models.DateTimeField(db_column='ULTIMA_ALTERACAO')),
+            ],
+            options={
+                'db_table': 'AUD_ESTATISTICA',
+                'managed': True,
+                'indexes': [models.Index(fields=['-versoes', 'tabela', 'registro_id'], name='idx_estat_versoes'), models.Index(fields=['-editores', 'tabela', 'registro_id'], name='idx_estat_editores'), models.Index(fields=['-ultima_alteracao', 'tabela', 'registro_id'], name='idx_estat_ultima')],
+                'constraints': [models.UniqueConstraint(fields=('tabela', 'registro_id'), name='uniq_estatistica_registro')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0010_estatisticas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudVersao',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('tabela', models.CharField(db_column='TABELA', max_length=20)),
+                ('registro_id', models.IntegerField(db_column='ID_REGISTRO')),
+                ('versao', models.IntegerField(db_column='VERSAO')),
+                ('data_ref', models.DateTimeField(blank=True, db_column='DATA_REF', null=True)),
+                ('assinatura', models.CharField(db_column='ASSINATURA', max_length=40)),
+                ('data_importacao', models.DateTimeField(auto_now_add=True, db_column='DATA_IMPORTACAO')),
+                ('codcoligada', models.IntegerField(blank=True, db_column='CODCOLIGADA', null=True)),
+                ('aplicacao', models.CharField(blank=True, db_column='APLICACAO', max_length=100, null=True)),
+                ('titulo', models.CharField(blank=True, db_column='TITULO', max_length=255, null=True)),
+                ('sentenca', models.TextField(blank=True, db_column='SENTENCA', null=True)),
+                ('tamanho', models.IntegerField(blank=True, db_column='TAMANHO', null=True)),
+                ('codaplicacao', models.IntegerField(blank=True, db_column='CODAPLICACAO', null=True)),
+                ('codigo', models.CharField(blank=True, db_column='CODIGO', max_length=100, null=True)),
+                ('nome', models.CharField(blank=True, db_column='NOME', max_length=255, null=True)),
+                ('descricao', models.TextField(blank=True, db_column='DESCRICAO', null=True)),
+                ('idcategoria', models.IntegerField(blank=True, db_column='IDCATEGORIA', null=True)),
+                ('ativo', models.BooleanField(blank=True, db_column='ATIVO', null=True)),
+                ('reccreatedby', models.CharField(blank=True, db_column='RECCREATEDBY', max_length=100, null=True)),
+                ('reccreatedon', models.DateTimeField(blank=True, db_column='RECCREATEDON', null=True)),
+                ('recmodifiedby', models.CharField(blank=True, db_column='RECMODIFIEDBY', max_length=100, null=True)),
+                ('recmodifiedon', models.DateTimeField(blank=True, db_column='RECMODIFIEDON', null=True)),
+            ],
+            options={
+                'db_table': 'AUD_VERSAO',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('tabela', 'registro_id', 'versao'), name='uniq_versao_registro')],
+            },
+        ),
+    ]
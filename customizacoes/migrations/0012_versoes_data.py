@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0011_versoes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audversao',
+            index=models.Index(fields=['tabela', 'registro_id', '-data_ref', '-versao'], name='idx_versao_registro_data'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0012_versoes_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audversao',
+            name='sem_mudanca_semantica',
+            field=models.BooleanField(blank=True, db_column='SEM_MUDANCA_SEMANTICA', null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0013_versao_sem_mudanca_semantica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudDiferenca',
+            fields=[
+                ('id', models.AutoField(db_column='ID', primary_key=True, serialize=False)),
+                ('modo', models.CharField(db_column='MODO', max_length=10)),
+                ('hash_antes', models.CharField(db_column='HASH_ANTES', max_length=40)),
+                ('hash_depois', models.CharField(db_column='HASH_DEPOIS', max_length=40)),
+                ('diff', models.JSONField(db_column='DIFF')),
+                ('data_calculo', models.DateTimeField(auto_now_add=True, db_column='DATA_CALCULO')),
+            ],
+            options={
+                'db_table': 'AUD_DIFERENCA',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('modo', 'hash_antes', 'hash_depois'), name='uniq_diferenca_textos')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:24
+
+from django.db import migrations, models
+
+
+def limpar_atividade(apps, schema_editor):
+    # A atividade passa a ser somada a partir de AUD_VERSAO; a próxima execução recomeça do início
+    apps.get_model('customizacoes', 'AtividadeDiaria').objects.all().delete()
+    apps.get_model('customizacoes', 'AtividadeMarca').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0014_diferencas'),
+    ]
+
+    operations = [
+        migrations.RunPython(limpar_atividade, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='atividademarca',
+            name='data_ref',
+        ),
+        migrations.RemoveField(
+            model_name='atividademarca',
+            name='registro_id',
+        ),
+        migrations.AddField(
+            model_name='atividademarca',
+            name='ultimo_id',
+            field=models.IntegerField(db_column='ULTIMO_ID', default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-17 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0015_atividade_versoes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audversao',
+            index=models.Index(fields=['-data_ref', 'tabela', 'registro_id'], name='idx_versao_data'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:10
+
+from django.db import migrations
+
+
+def limpar_estatisticas(apps, schema_editor):
+    # As estatísticas passam a ser somadas a partir de AUD_VERSAO; a próxima execução recomeça do início
+    apps.get_model('customizacoes', 'AudEstatisticaRegistro').objects.all().delete()
+    apps.get_model('customizacoes', 'AudEstatisticaEditor').objects.all().delete()
+    apps.get_model('customizacoes', 'AtividadeMarca').objects.filter(tabela='AUD_ESTATISTICA').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0016_versoes_data_historico'),
+    ]
+
+    operations = [
+        migrations.RunPython(limpar_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:40
+
+from django.db import migrations
+
+# Funções puras (sem modelos): a assinatura precisa ser a mesma que o import_aud calcula
+from customizacoes.versoes import CAMPOS_POR_TIPO, calcular_assinatura, data_ref_dos_dados
+
+MODELOS = {'sql': 'CustomizacaoSQL', 'report': 'CustomizacaoReport', 'fv': 'CustomizacaoFV'}
+TAMANHO_LOTE = 1000
+TAMANHO_LOTE_ESCRITA = 100
+
+
+def criar_versoes_iniciais(apps, schema_editor):
+    # Registros importados antes de AUD_VERSAO: o estado atual vira a versão 1
+    # (como inicializar_versoes), para que versões, comparação e diferenças os enxerguem
+    banco = schema_editor.connection.alias
+    AudVersao = apps.get_model('customizacoes', 'AudVersao')
+    for tipo, nome_modelo in MODELOS.items():
+        modelo = apps.get_model('customizacoes', nome_modelo)
+        tabela = modelo._meta.db_table
+        campos = CAMPOS_POR_TIPO[tipo]
+        ultimo_id = None
+        while True:
+            registros = modelo.objects.using(banco).order_by('pk')
+            if ultimo_id is not None:
+                registros = registros.filter(pk__gt=ultimo_id)
+            registros = list(registros.values('pk', *campos)[:TAMANHO_LOTE])
+            if not registros:
+                break
+            ultimo_id = registros[-1]['pk']
+
+            com_versao = set(
+                AudVersao.objects.using(banco)
+                .filter(tabela=tabela, registro_id__in=[registro['pk'] for registro in registros])
+                .values_list('registro_id', flat=True).distinct()
+            )
+            novas = []
+            for registro in registros:
+                if registro['pk'] in com_versao:
+                    continue
+                dados = {campo: registro[campo] for campo in campos}
+                novas.append(AudVersao(
+                    tabela=tabela, registro_id=registro['pk'], versao=1,
+                    data_ref=data_ref_dos_dados(dados), assinatura=calcular_assinatura(tipo, dados),
+                    **dados,
+                ))
+            AudVersao.objects.using(banco).bulk_create(novas, batch_size=TAMANHO_LOTE_ESCRITA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customizacoes', '0017_estatisticas_versoes'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_versoes_iniciais, migrations.RunPython.noop),
+    ]
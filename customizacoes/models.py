@@ -1,9 +1,63 @@
 # customizacoes/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 
+# Hierarquia de prioridades usada em comparações e ordenações
+HIERARQUIA_PRIORIDADE = {'Alta': 3, 'Média': 2, 'Baixa': 1}
+
+
+class AudQuerySet(models.QuerySet):
+    def elevar_prioridade(self, prioridade):
+        """
+        Aplica a prioridade apenas onde ela é maior ou igual à atual (mantém a
+        maior), com um UPDATE condicional. Na mesma transação copia a prioridade
+        para as linhas de AUD_TIMELINE dos registros atingidos e invalida os dias
+        delas no cache do histórico e a versão da exportação. Retorna o número
+        de linhas alteradas.
+        """
+        nivel = HIERARQUIA_PRIORIDADE.get(prioridade)
+        if not nivel:
+            return 0
+        maiores = [nome for nome, peso in HIERARQUIA_PRIORIDADE.items() if peso > nivel]
+        from .exportacao import invalidar_exportacao
+        from .historico import invalidar_dias
+
+        tabela = self.model._meta.db_table
+        alvo = self.exclude(prioridade__in=maiores).exclude(prioridade=prioridade)
+        with transaction.atomic():
+            # Espelha na linha do tempo antes do UPDATE, enquanto o filtro ainda casa
+            linhas = AudTimeline.objects.filter(tabela=tabela, registro_id__in=alvo.values('pk'))
+            invalidar_dias(tabela, linhas.values_list('data_ref', flat=True))
+            linhas.update(prioridade=prioridade)
+            alteradas = alvo.update(prioridade=prioridade)
+            if alteradas:
+                invalidar_exportacao()
+            return alteradas
+
+
+class DataReferenciaMixin:
+    """
+    Mantém DATA_REF = COALESCE(RECMODIFIEDON, RECCREATEDON) a cada save. A coluna
+    é gravada (e indexada) para que ordenações e filtros por data usem predicados
+    de intervalo em vez do COALESCE. Escritas feitas fora do ORM são corrigidas
+    pelo comando preencher_data_ref.
+    """
+    def save(self, *args, **kwargs):
+        self.data_ref = self.recmodifiedon or self.reccreatedon
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'reccreatedon', 'recmodifiedon'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'data_ref'}
+        super().save(*args, **kwargs)
+
+
+# Expressão equivalente a DATA_REF, usada no preenchimento em lote
+DATA_REF_CALCULADA = Coalesce('recmodifiedon', 'reccreatedon')
+
+
 # === TABELAS AUD (GERENCIADAS) ===
-class CustomizacaoFV(models.Model):
+class CustomizacaoFV(DataReferenciaMixin, models.Model):
     id = models.IntegerField(primary_key=True, db_column='ID')
     codcoligada = models.IntegerField(db_column='CODCOLIGADA', null=True, blank=True)
     nome = models.CharField(max_length=255, db_column='NOME', blank=True, null=True)
@@ -17,16 +71,25 @@ class CustomizacaoFV(models.Model):
     reccreatedon = models.DateTimeField(db_column='RECCREATEDON', null=True, blank=True)
     recmodifiedby = models.CharField(max_length=100, db_column='RECMODIFIEDBY', blank=True, null=True)
     recmodifiedon = models.DateTimeField(db_column='RECMODIFIEDON', null=True, blank=True)
+    data_ref = models.DateTimeField(db_column='DATA_REF', null=True, blank=True, editable=False)
+
+    objects = AudQuerySet.as_manager()
 
     class Meta:
         managed = True
         db_table = 'AUD_FV'
+        indexes = [
+            models.Index(fields=['data_ref'], name='idx_aud_fv_data_ref'),
+            # Listagem ordenada por nome e contagem agrupada do insights de prioridades
+            models.Index(fields=['nome'], name='idx_aud_fv_nome'),
+            models.Index(fields=['prioridade'], name='idx_aud_fv_prioridade'),
+        ]
 
     def __str__(self):
         return f"FV {self.id}: {self.nome or 'Sem nome'}"
 
 
-class CustomizacaoSQL(models.Model):
+class CustomizacaoSQL(DataReferenciaMixin, models.Model):
     codsentenca = models.IntegerField(primary_key=True, db_column='CODSENTENCA')
     codcoligada = models.IntegerField(db_column='CODCOLIGADA', null=True, blank=True)
     aplicacao = models.CharField(max_length=100, db_column='APLICACAO', blank=True, null=True)
@@ -40,16 +103,25 @@ class CustomizacaoSQL(models.Model):
     reccreatedon = models.DateTimeField(db_column='RECCREATEDON', null=True, blank=True)
     recmodifiedby = models.CharField(max_length=100, db_column='RECMODIFIEDBY', blank=True, null=True)
     recmodifiedon = models.DateTimeField(db_column='RECMODIFIEDON', null=True, blank=True)
+    data_ref = models.DateTimeField(db_column='DATA_REF', null=True, blank=True, editable=False)
+
+    objects = AudQuerySet.as_manager()
 
     class Meta:
         managed = True
         db_table = 'AUD_SQL'
+        indexes = [
+            models.Index(fields=['data_ref'], name='idx_aud_sql_data_ref'),
+            # Listagem ordenada por titulo e contagem agrupada do insights de prioridades
+            models.Index(fields=['titulo'], name='idx_aud_sql_titulo'),
+            models.Index(fields=['prioridade'], name='idx_aud_sql_prioridade'),
+        ]
 
     def __str__(self):
         return f"SQL {self.codsentenca}: {self.titulo or 'Sem título'}"
 
 
-class CustomizacaoReport(models.Model):
+class CustomizacaoReport(DataReferenciaMixin, models.Model):
     id = models.IntegerField(primary_key=True, db_column='ID')
     codcoligada = models.IntegerField(db_column='CODCOLIGADA', null=True, blank=True)
     codaplicacao = models.IntegerField(db_column='CODAPLICACAO', null=True, blank=True)
@@ -62,15 +134,71 @@ class CustomizacaoReport(models.Model):
     reccreatedon = models.DateTimeField(db_column='RECCREATEDON', null=True, blank=True)
     recmodifiedby = models.CharField(max_length=100, db_column='RECMODIFIEDBY', blank=True, null=True)
     recmodifiedon = models.DateTimeField(db_column='RECMODIFIEDON', null=True, blank=True)
+    data_ref = models.DateTimeField(db_column='DATA_REF', null=True, blank=True, editable=False)
+
+    objects = AudQuerySet.as_manager()
 
     class Meta:
         managed = True
         db_table = 'AUD_REPORT'
+        indexes = [
+            models.Index(fields=['data_ref'], name='idx_aud_report_data_ref'),
+            # Listagem ordenada por codigo e contagem agrupada do insights de prioridades
+            models.Index(fields=['codigo'], name='idx_aud_report_codigo'),
+            models.Index(fields=['prioridade'], name='idx_aud_report_prioridade'),
+        ]
 
     def __str__(self):
         return f"REP {self.id}: {self.codigo or 'Sem código'}"
 
 
+# Modelo AUD correspondente a cada tipo usado pela API ('sql', 'report', 'fv')
+MODELO_POR_TIPO = {
+    'sql': CustomizacaoSQL,
+    'report': CustomizacaoReport,
+    'fv': CustomizacaoFV,
+}
+
+# Campo de CadastroDependencias que referencia cada tipo de registro AUD
+CAMPO_POR_TIPO = {'sql': 'id_aud_sql', 'report': 'id_aud_report', 'fv': 'id_aud_fv'}
+
+# Tipo correspondente a cada nome de tabela AUD (aceita 'AUD_Report' via upper())
+TIPO_POR_TABELA = {modelo._meta.db_table: tipo for tipo, modelo in MODELO_POR_TIPO.items()}
+
+# Limite de IDs por cláusula IN (SQL Server aceita no máximo 2100 parâmetros)
+TAMANHO_LOTE_IN = 1000
+
+
+def tipo_da_tabela(tabela):
+    """Converte 'AUD_SQL' / 'AUD_Report' / 'AUD_FV' (ou o próprio tipo) em 'sql' / 'report' / 'fv'"""
+    if not tabela:
+        return None
+    if tabela.lower() in MODELO_POR_TIPO:
+        return tabela.lower()
+    return TIPO_POR_TABELA.get(tabela.upper())
+
+
+def carregar_registros_aud(tipo, ids):
+    """
+    Busca nome e prioridade de vários registros AUD de um tipo, com uma query IN
+    por lote de ids. Retorna {id: {'nome': ..., 'prioridade': ...}}.
+    """
+    ids = list({i for i in ids if i})
+    registros = {}
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+        if tipo == 'sql':
+            for reg in CustomizacaoSQL.objects.filter(codsentenca__in=lote).values('codsentenca', 'titulo', 'prioridade'):
+                registros[reg['codsentenca']] = {'nome': reg['titulo'] or reg['codsentenca'], 'prioridade': reg['prioridade']}
+        elif tipo == 'report':
+            for reg in CustomizacaoReport.objects.filter(id__in=lote).values('id', 'codigo', 'prioridade'):
+                registros[reg['id']] = {'nome': reg['codigo'] or reg['id'], 'prioridade': reg['prioridade']}
+        elif tipo == 'fv':
+            for reg in CustomizacaoFV.objects.filter(id__in=lote).values('id', 'nome', 'prioridade'):
+                registros[reg['id']] = {'nome': reg['nome'] or str(reg['id']), 'prioridade': reg['prioridade']}
+    return registros
+
+
 # === TABELAS NOVAS (GERENCIADAS) ===
 class Usuario(models.Model):
     id_usuario = models.IntegerField(primary_key=True, db_column='ID_USUARIO')
@@ -86,6 +214,92 @@ class Usuario(models.Model):
         return f"{self.nome} ({self.email})"
 
 
+def _subquery_prioridade(model, campo_id, campo_externo):
+    """Subquery correlacionada com a prioridade (não vazia) de um registro AUD"""
+    return Subquery(
+        model.objects.filter(**{campo_id: OuterRef(campo_externo)})
+        .exclude(prioridade__isnull=True)
+        .exclude(prioridade='')
+        .values('prioridade')[:1]
+    )
+
+
+class CadastroDependenciasQuerySet(models.QuerySet):
+    # Dependência válida: exatamente dois campos preenchidos (origem + destino)
+    FILTRO_PAR = (
+        Q(id_aud_sql__isnull=False, id_aud_report__isnull=False) |
+        Q(id_aud_sql__isnull=False, id_aud_fv__isnull=False) |
+        Q(id_aud_report__isnull=False, id_aud_fv__isnull=False)
+    )
+
+    def com_prioridade_efetiva(self):
+        """
+        Anota 'prioridade_efetiva' calculada no banco: prioridade da origem
+        ou, se vazia, a do destino. A origem é SQL > Report > FV, e o destino
+        é o outro campo preenchido (mesma regra do serializer).
+        """
+        prioridade_sql = _subquery_prioridade(CustomizacaoSQL, 'codsentenca', 'id_aud_sql')
+        prioridade_report = _subquery_prioridade(CustomizacaoReport, 'id', 'id_aud_report')
+        prioridade_fv = _subquery_prioridade(CustomizacaoFV, 'id', 'id_aud_fv')
+
+        origem = Case(
+            When(id_aud_sql__isnull=False, then=prioridade_sql),
+            When(id_aud_report__isnull=False, then=prioridade_report),
+            When(id_aud_fv__isnull=False, then=prioridade_fv),
+            default=Value(None),
+            output_field=models.CharField(),
+        )
+        destino = Case(
+            When(id_aud_sql__isnull=False, id_aud_report__isnull=False, then=prioridade_report),
+            When(id_aud_fv__isnull=False, then=prioridade_fv),
+            default=Value(None),
+            output_field=models.CharField(),
+        )
+        return self.annotate(prioridade_efetiva=Coalesce(origem, destino))
+
+    def assinatura(self):
+        """(quantidade, maior ID) da tabela: muda sempre que dependências são criadas ou removidas"""
+        resultado = self.aggregate(total=Count('id'), maior_id=Max('id'))
+        return resultado['total'], resultado['maior_id'] or 0
+
+    def com_ordem_prioridade(self):
+        """Anota 'prioridade_ordem' (Alta=3, Média=2, Baixa=1, sem prioridade=0)"""
+        queryset = self
+        if 'prioridade_efetiva' not in self.query.annotations:
+            queryset = self.com_prioridade_efetiva()
+        return queryset.annotate(prioridade_ordem=Case(
+            *[When(prioridade_efetiva=nivel, then=Value(peso)) for nivel, peso in HIERARQUIA_PRIORIDADE.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+    def filtrar_prioridade(self, prioridade=None, sem_prioridade=False):
+        """Filtra pela prioridade efetiva em uma única query (paginável no banco)"""
+        queryset = self
+        if 'prioridade_efetiva' not in self.query.annotations:
+            queryset = self.com_prioridade_efetiva()
+        queryset = queryset.filter(self.FILTRO_PAR)
+        if sem_prioridade:
+            return queryset.filter(prioridade_efetiva__isnull=True)
+        if prioridade:
+            return queryset.filter(prioridade_efetiva=prioridade)
+        return queryset
+
+
+def par_origem_destino(id_aud_sql, id_aud_report, id_aud_fv):
+    """
+    Retorna ((tipo_origem, id_origem), (tipo_destino, id_destino)) de uma dependência,
+    com a mesma regra do serializer (origem SQL > Report > FV), ou None se inválida.
+    """
+    if id_aud_sql and id_aud_report:
+        return ('sql', id_aud_sql), ('report', id_aud_report)
+    if id_aud_sql and id_aud_fv:
+        return ('sql', id_aud_sql), ('fv', id_aud_fv)
+    if id_aud_report and id_aud_fv:
+        return ('report', id_aud_report), ('fv', id_aud_fv)
+    return None
+
+
 class CadastroDependencias(models.Model):
     id = models.AutoField(primary_key=True, db_column='ID')
     id_aud_sql = models.IntegerField(null=True, blank=True, db_column='ID_AUD_SQL')
@@ -94,9 +308,42 @@ class CadastroDependencias(models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True, db_column='DATA_CRIACAO')
     criado_por = models.IntegerField(null=True, blank=True, db_column='CRIADO_POR')
 
+    objects = CadastroDependenciasQuerySet.as_manager()
+
     class Meta:
         managed = True
         db_table = 'Cadastro_Dependencias'
+        constraints = [
+            # Um mesmo par origem/destino só pode ser cadastrado uma vez
+            models.UniqueConstraint(
+                fields=['id_aud_sql', 'id_aud_report'],
+                condition=Q(id_aud_fv__isnull=True),
+                name='uniq_dependencia_sql_report',
+            ),
+            models.UniqueConstraint(
+                fields=['id_aud_sql', 'id_aud_fv'],
+                condition=Q(id_aud_report__isnull=True),
+                name='uniq_dependencia_sql_fv',
+            ),
+            models.UniqueConstraint(
+                fields=['id_aud_report', 'id_aud_fv'],
+                condition=Q(id_aud_sql__isnull=True),
+                name='uniq_dependencia_report_fv',
+            ),
+        ]
+        indexes = [
+            # Listagem paginada (mais recentes primeiro), coberta onde o banco suporta INCLUDE
+            models.Index(
+                fields=['-data_criacao', 'id'],
+                include=['id_aud_sql', 'id_aud_report', 'id_aud_fv', 'criado_por'],
+                name='idx_dep_data_criacao',
+            ),
+            # Dependências de um registro, em qualquer lado do par (as constraints únicas só
+            # servem quando o terceiro campo está vazio), e filtro origem_tabela
+            models.Index(fields=['id_aud_sql', '-data_criacao'], name='idx_dep_sql_data'),
+            models.Index(fields=['id_aud_report', '-data_criacao'], name='idx_dep_report_data'),
+            models.Index(fields=['id_aud_fv', '-data_criacao'], name='idx_dep_fv_data'),
+        ]
 
     def __str__(self):
         return f"{self.get_origem_display()} → {self.get_destino_display()}"
@@ -124,4 +371,260 @@ class CadastroDependencias(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class DependenciaBusca(models.Model):
+    """Termos normalizados (nomes, códigos, IDs e criador) usados na busca de dependências"""
+    id = models.AutoField(primary_key=True, db_column='ID')
+    dependencia = models.ForeignKey(
+        CadastroDependencias, on_delete=models.CASCADE,
+        db_column='ID_DEPENDENCIA', related_name='termos_busca'
+    )
+    termo = models.CharField(max_length=100, db_column='TERMO')
+
+    class Meta:
+        managed = True
+        db_table = 'Cadastro_Dependencias_Busca'
+        indexes = [
+            models.Index(fields=['termo', 'dependencia'], name='idx_dep_busca_termo'),
+        ]
+
+    def __str__(self):
+        return f"{self.termo} → {self.dependencia_id}"
+
+
+class DependenciaQuarentena(models.Model):
+    """Dependências órfãs (apontam para registros AUD inexistentes) retiradas do cadastro"""
+    id = models.AutoField(primary_key=True, db_column='ID')
+    id_original = models.IntegerField(db_column='ID_ORIGINAL')
+    id_aud_sql = models.IntegerField(null=True, blank=True, db_column='ID_AUD_SQL')
+    id_aud_report = models.IntegerField(null=True, blank=True, db_column='ID_AUD_REPORT')
+    id_aud_fv = models.IntegerField(null=True, blank=True, db_column='ID_AUD_FV')
+    data_criacao = models.DateTimeField(null=True, blank=True, db_column='DATA_CRIACAO')
+    criado_por = models.IntegerField(null=True, blank=True, db_column='CRIADO_POR')
+    motivo = models.CharField(max_length=255, db_column='MOTIVO')
+    data_quarentena = models.DateTimeField(auto_now_add=True, db_column='DATA_QUARENTENA')
+
+    class Meta:
+        managed = True
+        db_table = 'Cadastro_Dependencias_Quarentena'
+
+    def __str__(self):
+        return f"Quarentena {self.id_original}: {self.motivo}"
+
+
+class AudTimeline(models.Model):
+    """
+    Linha do tempo unificada das tabelas AUD: uma linha compacta por registro,
+    mantida por customizacoes/timeline.py e lida pelo histórico e pelas notificações.
+    """
+    id = models.AutoField(primary_key=True, db_column='ID')
+    tabela = models.CharField(max_length=20, db_column='TABELA')
+    registro_id = models.IntegerField(db_column='ID_REGISTRO')
+    versao_ref = models.IntegerField(default=1, db_column='VERSAO_REF')
+    data_ref = models.DateTimeField(db_column='DATA_REF')
+    data_criacao = models.DateTimeField(null=True, blank=True, db_column='DATA_CRIACAO')
+    data_modificacao = models.DateTimeField(null=True, blank=True, db_column='DATA_MODIFICACAO')
+    usuario = models.CharField(max_length=100, null=True, blank=True, db_column='USUARIO')
+    prioridade = models.CharField(max_length=50, null=True, blank=True, db_column='PRIORIDADE')
+    lida = models.IntegerField(default=0, db_column='LIDA')
+    titulo = models.CharField(max_length=255, db_column='TITULO')
+    resumo = models.CharField(max_length=280, db_column='RESUMO')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_TIMELINE'
+        constraints = [
+            models.UniqueConstraint(fields=['tabela', 'registro_id'], name='uniq_timeline_registro'),
+        ]
+        indexes = [
+            # Índice de cobertura da listagem por data (INCLUDE onde o banco suporta)
+            models.Index(
+                fields=['-data_ref', 'tabela', 'registro_id'],
+                include=[
+                    'versao_ref', 'data_criacao', 'data_modificacao', 'usuario',
+                    'prioridade', 'lida', 'titulo', 'resumo',
+                ],
+                name='idx_timeline_data_ref',
+            ),
+            models.Index(fields=['tabela', '-data_ref', 'registro_id'], name='idx_timeline_tabela_data'),
+            # Notificações não lidas, na mesma ordem da listagem (sem ordenação extra)
+            models.Index(fields=['lida', '-data_ref', 'tabela', 'registro_id'], name='idx_timeline_lida_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabela} {self.registro_id} @ {self.data_ref}"
+
+
+class AtividadeDiaria(models.Model):
+    """
+    Contagem de criações e modificações por (dia, usuário, tabela AUD, coligada),
+    acumulada por customizacoes/atividade.py. Usuário vazio e coligada 0 representam
+    valores ausentes no registro de origem.
+    """
+    id = models.AutoField(primary_key=True, db_column='ID')
+    dia = models.DateField(db_column='DIA')
+    usuario = models.CharField(max_length=100, default='', db_column='USUARIO')
+    tabela = models.CharField(max_length=20, db_column='TABELA')
+    codcoligada = models.IntegerField(default=0, db_column='CODCOLIGADA')
+    criacoes = models.IntegerField(default=0, db_column='CRIACOES')
+    modificacoes = models.IntegerField(default=0, db_column='MODIFICACOES')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_ATIVIDADE_DIARIA'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'usuario', 'tabela', 'codcoligada'], name='uniq_atividade_dia',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tabela', 'dia'], name='idx_atividade_tabela_dia'),
+            models.Index(fields=['usuario', 'dia'], name='idx_atividade_usuario_dia'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.tabela} {self.usuario or '—'}: +{self.criacoes} ~{self.modificacoes}"
+
+
+class AtividadeMarca(models.Model):
+    """
+    Último ID de AUD_VERSAO (ordem de importação) já somado por uma agregação
+    incremental: a atividade diária (chave AUD_VERSAO, customizacoes/atividade.py)
+    e as estatísticas por registro (chave AUD_ESTATISTICA, customizacoes/estatisticas.py).
+    A linha também é a trava das atualizações de cada uma.
+    """
+    tabela = models.CharField(max_length=20, primary_key=True, db_column='TABELA')
+    ultimo_id = models.IntegerField(default=0, db_column='ULTIMO_ID')
+    atualizado_em = models.DateTimeField(auto_now=True, db_column='ATUALIZADO_EM')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_ATIVIDADE_MARCA'
+
+    def __str__(self):
+        return f"{self.tabela} até {self.ultimo_id}"
+
+
+class AudEstatisticaRegistro(models.Model):
+    """
+    Estatísticas de alteração de cada registro AUD (versões, primeira e última data,
+    editores distintos), somadas a partir de AUD_VERSAO por customizacoes/estatisticas.py.
+    """
+    id = models.AutoField(primary_key=True, db_column='ID')
+    tabela = models.CharField(max_length=20, db_column='TABELA')
+    registro_id = models.IntegerField(db_column='ID_REGISTRO')
+    versoes = models.IntegerField(default=0, db_column='VERSOES')
+    editores = models.IntegerField(default=0, db_column='EDITORES')
+    primeira_data = models.DateTimeField(db_column='PRIMEIRA_DATA')
+    ultima_alteracao = models.DateTimeField(db_column='ULTIMA_ALTERACAO')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_ESTATISTICA'
+        constraints = [
+            models.UniqueConstraint(fields=['tabela', 'registro_id'], name='uniq_estatistica_registro'),
+        ]
+        indexes = [
+            # Rankings do endpoint de registros mais alterados (top-N direto do índice)
+            models.Index(fields=['-versoes', 'tabela', 'registro_id'], name='idx_estat_versoes'),
+            models.Index(fields=['-editores', 'tabela', 'registro_id'], name='idx_estat_editores'),
+            models.Index(fields=['-ultima_alteracao', 'tabela', 'registro_id'], name='idx_estat_ultima'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabela} {self.registro_id}: {self.versoes} versões"
+
+
+class AudEstatisticaEditor(models.Model):
+    """Usuários que já alteraram cada registro AUD (base da contagem de editores distintos)"""
+    id = models.AutoField(primary_key=True, db_column='ID')
+    tabela = models.CharField(max_length=20, db_column='TABELA')
+    registro_id = models.IntegerField(db_column='ID_REGISTRO')
+    usuario = models.CharField(max_length=100, db_column='USUARIO')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_ESTATISTICA_EDITOR'
+        constraints = [
+            models.UniqueConstraint(fields=['tabela', 'registro_id', 'usuario'], name='uniq_estatistica_editor'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabela} {self.registro_id}: {self.usuario}"
+
+
+class AudVersao(models.Model):
+    """
+    Versões dos registros AUD, gravadas pelo import_aud (customizacoes/versoes.py).
+    AUD_SQL, AUD_REPORT e AUD_FV guardam só o estado atual de cada registro; aqui
+    fica cada estado importado, numerado por registro. As colunas de origem são a
+    união das três tabelas: as que não pertencem à tabela da versão ficam nulas.
+    """
+    id = models.AutoField(primary_key=True, db_column='ID')
+    tabela = models.CharField(max_length=20, db_column='TABELA')
+    registro_id = models.IntegerField(db_column='ID_REGISTRO')
+    versao = models.IntegerField(db_column='VERSAO')
+    data_ref = models.DateTimeField(null=True, blank=True, db_column='DATA_REF')
+    # Hash das colunas de origem: estado igual ao da última versão não cria versão nova
+    assinatura = models.CharField(max_length=40, db_column='ASSINATURA')
+    data_importacao = models.DateTimeField(auto_now_add=True, db_column='DATA_IMPORTACAO')
+    codcoligada = models.IntegerField(null=True, blank=True, db_column='CODCOLIGADA')
+    aplicacao = models.CharField(max_length=100, null=True, blank=True, db_column='APLICACAO')
+    titulo = models.CharField(max_length=255, null=True, blank=True, db_column='TITULO')
+    sentenca = models.TextField(null=True, blank=True, db_column='SENTENCA')
+    tamanho = models.IntegerField(null=True, blank=True, db_column='TAMANHO')
+    codaplicacao = models.IntegerField(null=True, blank=True, db_column='CODAPLICACAO')
+    codigo = models.CharField(max_length=100, null=True, blank=True, db_column='CODIGO')
+    nome = models.CharField(max_length=255, null=True, blank=True, db_column='NOME')
+    descricao = models.TextField(null=True, blank=True, db_column='DESCRICAO')
+    idcategoria = models.IntegerField(null=True, blank=True, db_column='IDCATEGORIA')
+    ativo = models.BooleanField(null=True, blank=True, db_column='ATIVO')
+    reccreatedby = models.CharField(max_length=100, null=True, blank=True, db_column='RECCREATEDBY')
+    reccreatedon = models.DateTimeField(null=True, blank=True, db_column='RECCREATEDON')
+    recmodifiedby = models.CharField(max_length=100, null=True, blank=True, db_column='RECMODIFIEDBY')
+    recmodifiedon = models.DateTimeField(null=True, blank=True, db_column='RECMODIFIEDON')
+    # Só AUD_SQL: sentença igual à da versão anterior depois de normalizada (vazio = não calculado)
+    sem_mudanca_semantica = models.BooleanField(null=True, blank=True, db_column='SEM_MUDANCA_SEMANTICA')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_VERSAO'
+        constraints = [
+            # Última versão e versão anterior de um registro são buscas diretas neste índice
+            models.UniqueConstraint(fields=['tabela', 'registro_id', 'versao'], name='uniq_versao_registro'),
+        ]
+        indexes = [
+            # Versão em vigor em uma data (mais recente com DATA_REF até a data)
+            models.Index(fields=['tabela', 'registro_id', '-data_ref', '-versao'], name='idx_versao_registro_data'),
+            # Mudanças entre duas datas, na ordem do histórico
+            models.Index(fields=['-data_ref', 'tabela', 'registro_id'], name='idx_versao_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabela} {self.registro_id} v{self.versao}"
+
+
+class AudDiferenca(models.Model):
+    """
+    Diferenças de conteúdo já calculadas (customizacoes/diferencas.py), pela dupla
+    de hashes dos textos e pelo modo. Gravadas pela task pre_calcular_diffs e pela
+    tela de comparação, e lidas por qualquer processo.
+    """
+    id = models.AutoField(primary_key=True, db_column='ID')
+    modo = models.CharField(max_length=10, db_column='MODO')
+    hash_antes = models.CharField(max_length=40, db_column='HASH_ANTES')
+    hash_depois = models.CharField(max_length=40, db_column='HASH_DEPOIS')
+    diff = models.JSONField(db_column='DIFF')
+    data_calculo = models.DateTimeField(auto_now_add=True, db_column='DATA_CALCULO')
+
+    class Meta:
+        managed = True
+        db_table = 'AUD_DIFERENCA'
+        constraints = [
+            models.UniqueConstraint(fields=['modo', 'hash_antes', 'hash_depois'], name='uniq_diferenca_textos'),
+        ]
+
+    def __str__(self):
+        return f"{self.modo} {self.hash_antes[:8]}..{self.hash_depois[:8]}"
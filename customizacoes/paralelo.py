@@ -0,0 +1,100 @@
+# customizacoes/paralelo.py
+"""
+Execução concorrente de consultas independentes (tipicamente uma por tabela AUD).
+
+Com o banco remoto, o tempo das telas que leem AUD_SQL, AUD_REPORT e AUD_FV é
+dominado pelas idas e voltas de rede; rodar as consultas ao mesmo tempo reduz a
+latência ao da consulta mais lenta. As tarefas rodam em um pool de threads do
+processo, com no máximo settings.AUD_CONSULTAS_PARALELAS threads. Cada thread
+usa a sua própria conexão (conexões do Django são por thread), que fica aberta
+entre as tarefas e é reaproveitada conforme CONN_MAX_AGE: uma requisição não
+abre conexões novas com o banco remoto a cada leitura paralela.
+
+Nas conexões dos workers cada consulta tem o tempo limite da chamada
+(settings.AUD_CONSULTAS_TIMEOUT) também no banco: no SQL Server, o timeout de
+consulta do pyodbc. Uma consulta que estoura o tempo é cancelada pelo driver em
+vez de seguir ocupando o worker e a conexão depois da resposta. Se o tempo
+limite estourar, TempoEsgotadoConsultas é uma APIException com status 504, então
+as views respondem Gateway Timeout em vez de erro interno.
+
+Dentro de um bloco atomic as tarefas rodam em sequência na thread atual: outra
+conexão não enxergaria o que a transação ainda não gravou.
+"""
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+PARALELISMO_PADRAO = 3
+TIMEOUT_PADRAO = 30  # segundos
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class TempoEsgotadoConsultas(APIException):
+    """Alguma consulta paralela não terminou dentro do tempo limite"""
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = 'As consultas às tabelas AUD não responderam a tempo.'
+    default_code = 'tempo_esgotado'
+
+
+def _paralelismo():
+    return max(1, int(getattr(settings, 'AUD_CONSULTAS_PARALELAS', PARALELISMO_PADRAO)))
+
+
+def _obter_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_paralelismo(), thread_name_prefix='consultas-aud')
+        return _pool
+
+
+def _limitar_consultas(timeout):
+    """Aplica o tempo limite por consulta na conexão da thread atual"""
+    connection.ensure_connection()
+    if connection.vendor == 'microsoft':
+        # Timeout de consulta do pyodbc (segundos): o driver cancela a consulta no servidor
+        connection.connection.timeout = timeout
+
+
+def _executar_tarefa(funcao, timeout):
+    # Descarta conexões expiradas ou quebradas desta thread antes e depois da consulta
+    close_old_connections()
+    try:
+        _limitar_consultas(timeout)
+        return funcao()
+    finally:
+        close_old_connections()
+
+
+def executar_em_paralelo(tarefas, timeout=None):
+    """
+    Executa {chave: função sem argumentos} e retorna {chave: resultado}.
+    Se alguma tarefa falhar, a primeira exceção é repassada; se o tempo limite
+    (settings.AUD_CONSULTAS_TIMEOUT) estourar, levanta TempoEsgotadoConsultas.
+    """
+    if len(tarefas) <= 1 or _paralelismo() == 1 or connection.in_atomic_block:
+        return {chave: funcao() for chave, funcao in tarefas.items()}
+
+    if timeout is None:
+        timeout = getattr(settings, 'AUD_CONSULTAS_TIMEOUT', TIMEOUT_PADRAO)
+    pool = _obter_pool()
+    futuros = {pool.submit(_executar_tarefa, funcao, timeout): chave for chave, funcao in tarefas.items()}
+    concluidos, pendentes = wait(futuros, timeout=timeout, return_when=FIRST_EXCEPTION)
+    # As que ainda não começaram não rodam mais; as que já rodam param no tempo limite do banco
+    for pendente in pendentes:
+        pendente.cancel()
+
+    for futuro in concluidos:
+        if futuro.exception() is not None:
+            raise futuro.exception()
+    if pendentes:
+        nomes = ', '.join(str(futuros[futuro]) for futuro in pendentes)
+        raise TempoEsgotadoConsultas(f'Consultas sem resposta após {timeout}s: {nomes}')
+
+    return {chave: futuro.result() for futuro, chave in futuros.items()}
@@ -0,0 +1,121 @@
+# customizacoes/propagacao.py
+"""
+Propagação de prioridades pelo grafo de dependências.
+
+Tudo o que é alcançável (origem -> destino) a partir de um registro deve ter
+prioridade pelo menos igual à dele. O cálculo faz uma BFS multi-origem por nível
+de prioridade (Alta, depois Média, depois Baixa) sobre o índice em memória, e a
+gravação é um único UPDATE com CASE por tabela AUD, que nunca reduz prioridades.
+"""
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+
+from .exportacao import invalidar_exportacao
+from .grafo import empacotar, obter_grafo, resolver_nos
+from .models import HIERARQUIA_PRIORIDADE, MODELO_POR_TIPO, TAMANHO_LOTE_IN, TIPO_POR_TABELA
+from .timeline import copiar_prioridade
+
+
+def calcular_propagacao(grafo, origens=None):
+    """
+    Calcula as prioridades que precisam subir.
+
+    origens: lista de (tipo, id) a partir dos quais propagar; se None, propaga
+    a partir de todos os registros do grafo.
+    Retorna a lista de alterações {'tabela', 'id', 'nome', 'prioridade_anterior',
+    'prioridade_nova'}, apenas para registros cuja prioridade aumenta.
+    """
+    if origens is None:
+        nos = grafo.nos()
+    else:
+        nos = set()
+        for tipo, registro_id in origens:
+            no = empacotar(tipo, registro_id)
+            nos.add(no)
+            nos.update(grafo.fecho(no, 'downstream'))
+    if not nos:
+        return []
+
+    resolvidos = resolver_nos(nos)
+    nivel_atual = {no: HIERARQUIA_PRIORIDADE.get(dados['prioridade'], 0) for no, dados in resolvidos.items()}
+    nivel_novo = dict(nivel_atual)
+
+    # Níveis em ordem decrescente: quem já recebeu um nível maior não é revisitado
+    for prioridade, nivel in sorted(HIERARQUIA_PRIORIDADE.items(), key=lambda item: -item[1]):
+        fila = deque(no for no, atual in nivel_atual.items() if atual == nivel)
+        visitados = set(fila)
+        while fila:
+            atual = fila.popleft()
+            for vizinho in grafo.vizinhos(atual, 'downstream'):
+                if vizinho in visitados or vizinho not in nivel_novo:
+                    continue
+                visitados.add(vizinho)
+                if nivel_novo[vizinho] >= nivel:
+                    # Já está no nível (ou acima) e seus destinos foram tratados por ele
+                    continue
+                nivel_novo[vizinho] = nivel
+                fila.append(vizinho)
+
+    nome_por_nivel = {nivel: nome for nome, nivel in HIERARQUIA_PRIORIDADE.items()}
+    alteracoes = []
+    for no, nivel in nivel_novo.items():
+        if nivel > nivel_atual[no]:
+            dados = resolvidos[no]
+            alteracoes.append({
+                'tabela': dados['tabela'],
+                'id': dados['id'],
+                'nome': dados['nome'],
+                'prioridade_anterior': dados['prioridade'],
+                'prioridade_nova': nome_por_nivel[nivel],
+            })
+    alteracoes.sort(key=lambda a: (a['tabela'], a['id']))
+    return alteracoes
+
+
+def aplicar_propagacao(alteracoes):
+    """
+    Grava as alterações com um UPDATE ... CASE por tabela (e por lote de IDs).
+    Cada ramo do CASE só sobe a prioridade, então escritas concorrentes de
+    prioridades maiores são preservadas. Troca a versão da exportação se algo
+    mudou. Retorna o número de linhas alteradas.
+    """
+    ids_por_tipo = {}
+    for alteracao in alteracoes:
+        tipo = TIPO_POR_TABELA[alteracao['tabela']]
+        ids_por_tipo.setdefault(tipo, {}).setdefault(alteracao['prioridade_nova'], []).append(alteracao['id'])
+
+    alteradas = 0
+    with transaction.atomic():
+        for tipo, ids_por_prioridade in ids_por_tipo.items():
+            modelo = MODELO_POR_TIPO[tipo]
+            pares = [(p, i) for p, ids in ids_por_prioridade.items() for i in ids]
+            for inicio in range(0, len(pares), TAMANHO_LOTE_IN):
+                lote = pares[inicio:inicio + TAMANHO_LOTE_IN]
+                ramos = []
+                for prioridade, nivel in HIERARQUIA_PRIORIDADE.items():
+                    ids = [i for p, i in lote if p == prioridade]
+                    if not ids:
+                        continue
+                    maiores = [n for n, peso in HIERARQUIA_PRIORIDADE.items() if peso >= nivel]
+                    ramos.append(When(
+                        Q(pk__in=ids) & ~Q(prioridade__in=maiores),
+                        then=Value(prioridade),
+                    ))
+                ids_lote = [i for _, i in lote]
+                alteradas += modelo.objects.filter(pk__in=ids_lote).update(
+                    prioridade=Case(*ramos, default=F('prioridade'))
+                )
+                copiar_prioridade(tipo, ids_lote)
+        if alteradas:
+            invalidar_exportacao()
+    return alteradas
+
+
+def propagar_prioridades(origens=None, dry_run=False):
+    """Calcula e (exceto em dry-run) aplica a propagação. Retorna as alterações"""
+    alteracoes = calcular_propagacao(obter_grafo(), origens)
+    if alteracoes and not dry_run:
+        aplicar_propagacao(alteracoes)
+    return alteracoes
@@ -1,10 +1,12 @@
 # customizacoes/serializers.py
 
+from django.db import models
 from rest_framework import serializers
 from .models import (
     CustomizacaoFV, CustomizacaoSQL, CustomizacaoReport,
-    CadastroDependencias
+    CadastroDependencias, Usuario, CAMPO_POR_TIPO, carregar_registros_aud
 )
+from .paralelo import executar_em_paralelo
 
 
 class CustomizacaoFVSerializer(serializers.ModelSerializer):
@@ -25,6 +27,47 @@ class CustomizacaoReportSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+def carregar_mapas_dependencias(dependencias):
+    """
+    Resolve em lote os registros AUD e usuários referenciados pelas dependências.
+    Faz no máximo uma query IN por tabela (em paralelo) e retorna mapas {id: dados}.
+    """
+    ids_sql = {d.id_aud_sql for d in dependencias if d.id_aud_sql}
+    ids_report = {d.id_aud_report for d in dependencias if d.id_aud_report}
+    ids_fv = {d.id_aud_fv for d in dependencias if d.id_aud_fv}
+    ids_usuario = {d.criado_por for d in dependencias if d.criado_por}
+
+    tarefas = {
+        tipo: (lambda tipo=tipo, ids=ids: carregar_registros_aud(tipo, ids))
+        for tipo, ids in (('sql', ids_sql), ('report', ids_report), ('fv', ids_fv)) if ids
+    }
+    if ids_usuario:
+        tarefas['usuario'] = lambda: dict(
+            Usuario.objects.filter(id_usuario__in=ids_usuario).values_list('id_usuario', 'nome')
+        )
+    # As tabelas são independentes: consultadas em paralelo
+    mapas = {'sql': {}, 'report': {}, 'fv': {}, 'usuario': {}}
+    mapas.update(executar_em_paralelo(tarefas))
+    return mapas
+
+
+class CadastroDependenciasListSerializer(serializers.ListSerializer):
+    """
+    Serializa uma página de dependências resolvendo todos os registros
+    referenciados de uma vez, de modo que o número de queries não depende
+    do tamanho da página.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        dependencias = list(iterable)
+        self.child.mapas = carregar_mapas_dependencias(dependencias)
+        try:
+            return [self.child.to_representation(item) for item in dependencias]
+        finally:
+            self.child.mapas = None
+
+
 class CadastroDependenciasSerializer(serializers.ModelSerializer):
     origem_label = serializers.SerializerMethodField()
     destino_label = serializers.SerializerMethodField()
@@ -37,10 +80,33 @@ class CadastroDependenciasSerializer(serializers.ModelSerializer):
     prioridade_nivel = serializers.SerializerMethodField()
     criado_por_nome = serializers.SerializerMethodField()
 
+    # Mapas pré-carregados pelo CadastroDependenciasListSerializer (None fora de listagens)
+    mapas = None
+
     class Meta:
         model = CadastroDependencias
         fields = '__all__'
         read_only_fields = ['data_criacao', 'criado_por']
+        list_serializer_class = CadastroDependenciasListSerializer
+        # As constraints condicionais de par único são verificadas em validate()
+        validators = []
+
+    def _mapas_para(self, obj):
+        """Retorna os mapas da página ou, para um objeto isolado, carrega só os dele"""
+        if self.mapas is not None:
+            return self.mapas
+        if not hasattr(obj, '_mapas_dependencia'):
+            obj._mapas_dependencia = carregar_mapas_dependencias([obj])
+        return obj._mapas_dependencia
+
+    def _registro(self, obj, tipo):
+        """Dados (nome, prioridade) do registro AUD do tipo informado, ou None"""
+        if tipo not in CAMPO_POR_TIPO:
+            return None
+        registro_id = getattr(obj, CAMPO_POR_TIPO[tipo])
+        if not registro_id:
+            return None
+        return self._mapas_para(obj)[tipo].get(registro_id)
 
     def get_origem_label(self, obj):
         return obj.get_origem_display()
@@ -103,19 +169,8 @@ class CadastroDependenciasSerializer(serializers.ModelSerializer):
     def get_origem_nome(self, obj):
         """Retorna o nome da origem baseado no tipo"""
         origem_tipo, _ = self._determinar_origem_destino(obj)
-        try:
-            if origem_tipo == 'sql' and obj.id_aud_sql:
-                sql = CustomizacaoSQL.objects.get(codsentenca=obj.id_aud_sql)
-                return sql.titulo or sql.codsentenca
-            elif origem_tipo == 'report' and obj.id_aud_report:
-                report = CustomizacaoReport.objects.get(id=obj.id_aud_report)
-                return report.codigo or obj.id_aud_report
-            elif origem_tipo == 'fv' and obj.id_aud_fv:
-                fv = CustomizacaoFV.objects.get(id=obj.id_aud_fv)
-                return fv.nome or str(obj.id_aud_fv)
-        except Exception as e:
-            pass
-        return None
+        registro = self._registro(obj, origem_tipo)
+        return registro['nome'] if registro else None
 
     def get_destino_tabela(self, obj):
         """Retorna o nome da tabela de destino"""
@@ -142,76 +197,29 @@ class CadastroDependenciasSerializer(serializers.ModelSerializer):
     def get_destino_nome(self, obj):
         """Retorna o nome do destino baseado no tipo"""
         _, destino_tipo = self._determinar_origem_destino(obj)
-        try:
-            if destino_tipo == 'sql' and obj.id_aud_sql:
-                sql = CustomizacaoSQL.objects.get(codsentenca=obj.id_aud_sql)
-                return sql.titulo or sql.codsentenca
-            elif destino_tipo == 'report' and obj.id_aud_report:
-                report = CustomizacaoReport.objects.get(id=obj.id_aud_report)
-                return report.codigo or obj.id_aud_report
-            elif destino_tipo == 'fv' and obj.id_aud_fv:
-                fv = CustomizacaoFV.objects.get(id=obj.id_aud_fv)
-                return fv.nome or str(obj.id_aud_fv)
-        except Exception as e:
-            pass
-        return None
+        registro = self._registro(obj, destino_tipo)
+        return registro['nome'] if registro else None
 
     def get_prioridade_nivel(self, obj):
         """Retorna a prioridade do registro de origem (ou destino se origem não tiver)"""
         origem_tipo, destino_tipo = self._determinar_origem_destino(obj)
-        
-        # Tenta buscar a prioridade da origem primeiro
-        try:
-            if origem_tipo == 'sql' and obj.id_aud_sql:
-                sql = CustomizacaoSQL.objects.get(codsentenca=obj.id_aud_sql)
-                if sql.prioridade:
-                    return sql.prioridade
-            elif origem_tipo == 'report' and obj.id_aud_report:
-                report = CustomizacaoReport.objects.get(id=obj.id_aud_report)
-                if report.prioridade:
-                    return report.prioridade
-            elif origem_tipo == 'fv' and obj.id_aud_fv:
-                fv = CustomizacaoFV.objects.get(id=obj.id_aud_fv)
-                if fv.prioridade:
-                    return fv.prioridade
-        except Exception:
-            pass
-        
-        # Se origem não tiver prioridade, tenta buscar do destino
-        # Usa o campo correto do destino (que é diferente do campo da origem)
-        try:
-            if destino_tipo == 'sql' and obj.id_aud_sql:
-                # Se destino é SQL, usa o campo id_aud_sql (mas só se origem não for SQL)
-                if origem_tipo != 'sql':  # Garante que não está usando o mesmo campo da origem
-                    sql = CustomizacaoSQL.objects.get(codsentenca=obj.id_aud_sql)
-                    if sql.prioridade:
-                        return sql.prioridade
-            elif destino_tipo == 'report' and obj.id_aud_report:
-                # Se destino é Report, usa o campo id_aud_report (mas só se origem não for Report)
-                if origem_tipo != 'report':
-                    report = CustomizacaoReport.objects.get(id=obj.id_aud_report)
-                    if report.prioridade:
-                        return report.prioridade
-            elif destino_tipo == 'fv' and obj.id_aud_fv:
-                # Se destino é FV, usa o campo id_aud_fv (mas só se origem não for FV)
-                if origem_tipo != 'fv':
-                    fv = CustomizacaoFV.objects.get(id=obj.id_aud_fv)
-                    if fv.prioridade:
-                        return fv.prioridade
-        except Exception:
-            pass
-        
+
+        origem = self._registro(obj, origem_tipo)
+        if origem and origem['prioridade']:
+            return origem['prioridade']
+
+        # Se origem não tiver prioridade, usa a do destino (sempre de outro tipo)
+        if destino_tipo != origem_tipo:
+            destino = self._registro(obj, destino_tipo)
+            if destino and destino['prioridade']:
+                return destino['prioridade']
+
         return None
 
     def get_criado_por_nome(self, obj):
         """Retorna o nome do usuário que criou a dependência"""
         if obj.criado_por:
-            try:
-                from .models import Usuario
-                usuario = Usuario.objects.get(id_usuario=obj.criado_por)
-                return usuario.nome
-            except:
-                return None
+            return self._mapas_para(obj)['usuario'].get(obj.criado_por)
         return None
 
     def validate(self, data):
@@ -230,6 +238,12 @@ class CadastroDependenciasSerializer(serializers.ModelSerializer):
         if len(set(tipos)) != 2:
             raise serializers.ValidationError("Origem e destino devem ser de tipos diferentes.")
 
+        duplicadas = CadastroDependencias.objects.filter(id_aud_sql=sql, id_aud_report=rep, id_aud_fv=fv)
+        if self.instance is not None:
+            duplicadas = duplicadas.exclude(pk=self.instance.pk)
+        if duplicadas.exists():
+            raise serializers.ValidationError("Esta dependência já está cadastrada.")
+
         return data
 
     def create(self, validated_data):
@@ -41,4 +41,43 @@ def enviar_relatorio_fv(destinatario):
     )
     email.attach('fvs_ativas.pdf', buffer.getvalue(), 'application/pdf')
     email.send()
-    buffer.close()
\ No newline at end of file
+    buffer.close()
+
+
+@shared_task
+def limpar_dependencias_orfas(acao=None, tamanho_lote=500):
+    """
+    Encontra dependências que apontam para registros AUD inexistentes.
+    Com acao='remover' ou 'quarentena', trata-as em lotes.
+    """
+    from .dependencias_orfas import encontrar_orfas, limpar_orfas
+
+    orfas = encontrar_orfas()
+    resultado = {tipo: len(ids) for tipo, ids in orfas.items()}
+    if acao in ('remover', 'quarentena'):
+        resultado['tratadas'] = limpar_orfas(orfas, acao, tamanho_lote)
+    return resultado
+
+
+@shared_task
+def atualizar_atividade():
+    """Soma à atividade diária as versões importadas desde a última execução (Celery beat)"""
+    from .atividade import atualizar_atividade as atualizar
+
+    return atualizar()
+
+
+@shared_task
+def atualizar_estatisticas():
+    """Soma às estatísticas por registro as versões importadas desde a última execução (Celery beat)"""
+    from .estatisticas import atualizar_estatisticas as atualizar
+
+    return atualizar()
+
+
+@shared_task
+def pre_calcular_diffs(versao_ids):
+    """Grava em AUD_DIFERENCA a diferença de cada versão nova para a anterior (agendada pelo import_aud)"""
+    from .versoes import pre_calcular_diffs as calcular
+
+    return calcular(versao_ids)
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .atividade import MARGEM_IMPORTACAO, TABELA_ORIGEM, atualizar_atividade, reconstruir_atividade
+from .estatisticas import atualizar_estatisticas, reconstruir_estatisticas
+from .models import AtividadeDiaria, AtividadeMarca, AudEstatisticaRegistro, AudVersao, CustomizacaoSQL
+
+
+def _data(dia, hora=12):
+    return timezone.make_aware(datetime(2024, 3, dia, hora))
+
+
+def _versao(registro_id, versao, criado_em, modificado_em=None, usuario='ana', tabela='AUD_SQL', recente=False):
+    registro = AudVersao.objects.create(
+        tabela=tabela, registro_id=registro_id, versao=versao, data_ref=modificado_em or criado_em,
+        assinatura=f'{registro_id}-{versao}', codcoligada=1,
+        reccreatedby='ana', reccreatedon=criado_em,
+        recmodifiedby=usuario if modificado_em else None, recmodifiedon=modificado_em,
+    )
+    if not recente:
+        # Fora da margem de importação
+        AudVersao.objects.filter(pk=registro.pk).update(
+            data_importacao=timezone.now() - MARGEM_IMPORTACAO - timedelta(seconds=1)
+        )
+    return registro
+
+
+class AtividadeIncrementalTests(TestCase):
+    """Soma incremental da atividade a partir de AUD_VERSAO, pela ordem de importação"""
+
+    def _versao(self, *args, **kwargs):
+        return _versao(*args, **kwargs)
+
+    def _contagens(self):
+        return {
+            (linha.tabela, linha.dia.day, linha.usuario): (linha.criacoes, linha.modificacoes)
+            for linha in AtividadeDiaria.objects.all()
+        }
+
+    def test_primeira_versao_conta_criacao_e_modificacao(self):
+        self._versao(1, 1, _data(1), _data(2), usuario='bia')
+        self.assertEqual(atualizar_atividade(), {'AUD_SQL': 1})
+        self.assertEqual(self._contagens(), {('AUD_SQL', 1, 'ana'): (1, 0), ('AUD_SQL', 2, 'bia'): (0, 1)})
+
+    def test_execucao_repetida_nao_soma_de_novo(self):
+        self._versao(1, 1, _data(1))
+        atualizar_atividade()
+        self.assertEqual(atualizar_atividade(), {})
+        self.assertEqual(self._contagens(), {('AUD_SQL', 1, 'ana'): (1, 0)})
+
+    def test_versao_importada_depois_com_datas_antigas_e_somada(self):
+        self._versao(1, 1, _data(10))
+        atualizar_atividade()
+        # Importada depois da marca, mas criada e modificada antes da versão já somada
+        self._versao(2, 1, _data(1), _data(5), tabela='AUD_FV')
+        self.assertEqual(atualizar_atividade(), {'AUD_FV': 1})
+        self.assertEqual(self._contagens(), {
+            ('AUD_SQL', 10, 'ana'): (1, 0),
+            ('AUD_FV', 1, 'ana'): (1, 0),
+            ('AUD_FV', 5, 'ana'): (0, 1),
+        })
+
+    def test_versao_seguinte_conta_so_modificacao(self):
+        self._versao(1, 1, _data(1), _data(2))
+        atualizar_atividade()
+        self._versao(1, 2, _data(1), _data(3), usuario='bia')
+        # Mesma data de modificação da versão anterior: não é outra modificação
+        self._versao(1, 3, _data(1), _data(3), usuario='bia')
+        atualizar_atividade()
+        self.assertEqual(self._contagens(), {
+            ('AUD_SQL', 1, 'ana'): (1, 0),
+            ('AUD_SQL', 2, 'ana'): (0, 1),
+            ('AUD_SQL', 3, 'bia'): (0, 1),
+        })
+
+    def test_lotes_avancam_a_marca_pelo_id(self):
+        versoes = [self._versao(registro_id, 1, _data(registro_id)) for registro_id in range(1, 6)]
+        self.assertEqual(atualizar_atividade(tamanho_lote=2), {'AUD_SQL': 5})
+        self.assertEqual(AtividadeMarca.objects.get(tabela=TABELA_ORIGEM).ultimo_id, versoes[-1].pk)
+        self.assertEqual(sum(criacoes for criacoes, _ in self._contagens().values()), 5)
+
+    def test_versao_recente_segura_as_seguintes(self):
+        antiga = self._versao(1, 1, _data(1))
+        recente = self._versao(2, 1, _data(2), recente=True)
+        self._versao(3, 1, _data(3))
+        self.assertEqual(atualizar_atividade(), {'AUD_SQL': 1})
+        self.assertEqual(AtividadeMarca.objects.get(tabela=TABELA_ORIGEM).ultimo_id, antiga.pk)
+
+        AudVersao.objects.filter(pk=recente.pk).update(data_importacao=timezone.now() - timedelta(hours=1))
+        self.assertEqual(atualizar_atividade(), {'AUD_SQL': 2})
+        self.assertEqual(len(self._contagens()), 3)
+
+    def test_reconstrucao_chega_as_mesmas_contagens(self):
+        self._versao(1, 1, _data(1), _data(2))
+        atualizar_atividade()
+        self._versao(1, 2, _data(1), _data(4), usuario='bia')
+        self._versao(2, 1, _data(3), tabela='AUD_REPORT')
+        atualizar_atividade()
+        incremental = self._contagens()
+
+        self.assertEqual(reconstruir_atividade(), {'AUD_SQL': 2, 'AUD_REPORT': 1})
+        self.assertEqual(self._contagens(), incremental)
+
+
+class EstatisticasVersoesTests(TestCase):
+    """Estatísticas por registro somadas a partir de AUD_VERSAO"""
+
+    def _estatisticas(self):
+        return {
+            (linha.tabela, linha.registro_id): (linha.versoes, linha.editores, linha.primeira_data, linha.ultima_alteracao)
+            for linha in AudEstatisticaRegistro.objects.all()
+        }
+
+    def test_versoes_intermediarias_contam(self):
+        _versao(501, 1, _data(1))
+        _versao(501, 2, _data(1), _data(2), usuario='bob')
+        _versao(501, 3, _data(1), _data(3), usuario='cid')
+        self.assertEqual(atualizar_estatisticas(), {'AUD_SQL': 3})
+        self.assertEqual(self._estatisticas(), {('AUD_SQL', 501): (3, 3, _data(1), _data(3))})
+
+    def test_soma_incremental_nao_repete_versoes(self):
+        _versao(501, 1, _data(1))
+        atualizar_estatisticas()
+        self.assertEqual(atualizar_estatisticas(), {})
+        _versao(501, 2, _data(1), _data(4), usuario='bob')
+        # Outro estado com o mesmo editor: só a contagem de versões sobe
+        _versao(501, 3, _data(1), _data(5), usuario='bob')
+        atualizar_estatisticas(tamanho_lote=1)
+        self.assertEqual(self._estatisticas(), {('AUD_SQL', 501): (3, 2, _data(1), _data(5))})
+
+    def test_versao_recente_espera_a_margem(self):
+        _versao(501, 1, _data(1), recente=True)
+        self.assertEqual(atualizar_estatisticas(), {})
+        self.assertEqual(self._estatisticas(), {})
+
+    def test_reconstrucao_chega_as_mesmas_contagens_dos_registros_existentes(self):
+        CustomizacaoSQL.objects.create(codsentenca=501, reccreatedon=_data(1))
+        _versao(501, 1, _data(1))
+        atualizar_estatisticas()
+        _versao(501, 2, _data(1), _data(4), usuario='bob')
+        atualizar_estatisticas()
+        incremental = self._estatisticas()
+
+        # Registro que não está mais em AUD_SQL
+        _versao(777, 1, _data(2))
+        self.assertEqual(reconstruir_estatisticas(), {'AUD_SQL': 3})
+        self.assertEqual(self._estatisticas(), incremental)
@@ -0,0 +1,234 @@
+# customizacoes/timeline.py
+"""
+Manutenção da linha do tempo unificada (AUD_TIMELINE).
+
+Cada registro de AUD_SQL, AUD_REPORT e AUD_FV tem uma linha com a data de
+referência (RECMODIFIEDON, ou RECCREATEDON), usuário, prioridade, lida, título e
+um resumo curto. O histórico e as notificações leem só essa tabela, por índice
+em DATA_REF, em vez de combinar as três tabelas AUD a cada requisição.
+
+A tabela é atualizada nos pontos de escrita: signals dos modelos AUD (observação,
+prioridade e lida via save), import_aud (em lote, com atualizacao_em_lote),
+elevar_prioridade e a propagação de prioridades. O comando reconciliar_timeline
+reconstrói o que estiver divergente. Cada atualização invalida, no cache do
+histórico, os baldes dos dias que ela atinge, e remove as estatísticas por
+registro (customizacoes/estatisticas.py) dos registros excluídos.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Left
+from django.db.models.signals import post_delete, post_save
+
+from .estatisticas import remover_estatisticas
+from .historico import invalidar_dias
+from .models import AudTimeline, MODELO_POR_TIPO, TAMANHO_LOTE_IN
+
+# Registros sem data nenhuma ficam no fim da ordenação (e antes de qualquer data_inicio)
+DATA_SEM_REFERENCIA = datetime(1900, 1, 1, tzinfo=dt_timezone.utc)
+
+TAMANHO_RESUMO = 280
+
+# Registros por UPDATE/INSERT em lote (SQL Server aceita no máximo 2100 parâmetros)
+TAMANHO_LOTE_ESCRITA = 100
+
+CAMPOS_TIMELINE = [
+    'versao_ref', 'data_ref', 'data_criacao', 'data_modificacao', 'usuario',
+    'prioridade', 'lida', 'titulo', 'resumo',
+]
+
+_estado = threading.local()
+
+# Outras atualizações acumuladas por atualizacao_em_lote (ex.: termos de busca): {chave: função(itens)}
+_finalizadores_lote = {}
+
+
+def _truncar(texto, limite=TAMANHO_RESUMO):
+    if not texto:
+        return 'Sem descrição disponível.'
+    texto = str(texto).strip()
+    if len(texto) <= limite:
+        return texto
+    return f"{texto[:limite-3]}..."
+
+
+def _carregar_fontes(tipo, ids):
+    """Campos da linha do tempo de vários registros AUD de um tipo: {id: dados}"""
+    modelo = MODELO_POR_TIPO[tipo]
+    campos = ['pk', 'prioridade', 'lida', 'reccreatedby', 'reccreatedon', 'recmodifiedby', 'recmodifiedon']
+    # Textos longos vêm cortados do banco: o resumo só usa o começo
+    textos = {
+        'sql': {'titulo_fonte': F('titulo'), 'texto_1': Left('observacao', TAMANHO_RESUMO), 'texto_2': Left('sentenca', TAMANHO_RESUMO)},
+        'report': {'titulo_fonte': F('codigo'), 'texto_1': Left('descricao', TAMANHO_RESUMO), 'texto_2': Left('observacao', TAMANHO_RESUMO)},
+        'fv': {'titulo_fonte': F('nome'), 'texto_1': Left('descricao', TAMANHO_RESUMO), 'texto_2': Left('observacao', TAMANHO_RESUMO)},
+    }[tipo]
+    rotulo = {'sql': 'SQL', 'report': 'Report', 'fv': 'FV'}[tipo]
+
+    fontes = {}
+    for reg in modelo.objects.filter(pk__in=ids).values(*campos, **textos):
+        fontes[reg['pk']] = {
+            'data_ref': reg['recmodifiedon'] or reg['reccreatedon'] or DATA_SEM_REFERENCIA,
+            'data_criacao': reg['reccreatedon'],
+            'data_modificacao': reg['recmodifiedon'],
+            'usuario': reg['recmodifiedby'] or reg['reccreatedby'],
+            'prioridade': reg['prioridade'] or None,
+            'lida': reg['lida'] or 0,
+            'titulo': (reg['titulo_fonte'] or f"{rotulo} {reg['pk']}")[:255],
+            'resumo': _truncar(reg['texto_1'] or reg['texto_2']),
+        }
+    return fontes
+
+
+def atualizar_timeline(tipo, ids, conteudo_alterado=True):
+    """
+    Sincroniza as linhas da timeline dos registros informados com as tabelas AUD:
+    cria as que faltam, atualiza as divergentes e remove as de registros excluídos.
+    Invalida o cache do histórico nos dias afetados; com conteudo_alterado=True
+    (escritas nos registros) também nos dias das linhas que não mudaram, já que
+    descrição e observação ficam só no cache. Retorna (criadas, atualizadas, removidas).
+    """
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    ids = list({i for i in ids if i is not None})
+    criadas = atualizadas = removidas = 0
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_IN]
+        fontes = _carregar_fontes(tipo, lote)
+        existentes = {
+            linha.registro_id: linha
+            for linha in AudTimeline.objects.filter(tabela=tabela, registro_id__in=lote)
+        }
+
+        novas, alteradas = [], []
+        dias_conteudo, dias_contagem = [], []
+        for registro_id, dados in fontes.items():
+            linha = existentes.get(registro_id)
+            if linha is None:
+                novas.append(AudTimeline(tabela=tabela, registro_id=registro_id, **dados))
+                dias_contagem.append(dados['data_ref'])
+                continue
+            if all(getattr(linha, campo) == valor for campo, valor in dados.items()):
+                if conteudo_alterado:
+                    dias_conteudo.append(linha.data_ref)
+                continue
+            if linha.data_ref != dados['data_ref']:
+                # Nova data de referência: o registro mudou de versão (e de dia no histórico)
+                linha.versao_ref += 1
+                dias_contagem.extend([linha.data_ref, dados['data_ref']])
+            else:
+                dias_conteudo.append(linha.data_ref)
+            for campo, valor in dados.items():
+                setattr(linha, campo, valor)
+            alteradas.append(linha)
+        excluidos = [registro_id for registro_id in existentes if registro_id not in fontes]
+        dias_contagem.extend(existentes[registro_id].data_ref for registro_id in excluidos)
+
+        with transaction.atomic():
+            AudTimeline.objects.bulk_create(novas, batch_size=TAMANHO_LOTE_ESCRITA)
+            AudTimeline.objects.bulk_update(alteradas, CAMPOS_TIMELINE, batch_size=TAMANHO_LOTE_ESCRITA)
+            if excluidos:
+                AudTimeline.objects.filter(tabela=tabela, registro_id__in=excluidos).delete()
+                remover_estatisticas(tabela, excluidos)
+        invalidar_dias(tabela, dias_conteudo)
+        invalidar_dias(tabela, dias_contagem, contagem=True)
+        criadas += len(novas)
+        atualizadas += len(alteradas)
+        removidas += len(excluidos)
+    return criadas, atualizadas, removidas
+
+
+def copiar_prioridade(tipo, ids):
+    """Copia a prioridade atual dos registros para a timeline, com um UPDATE por lote"""
+    modelo = MODELO_POR_TIPO[tipo]
+    tabela = modelo._meta.db_table
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        linhas = AudTimeline.objects.filter(tabela=tabela, registro_id__in=ids[inicio:inicio + TAMANHO_LOTE_IN])
+        invalidar_dias(tabela, linhas.values_list('data_ref', flat=True))
+        linhas.update(prioridade=Subquery(
+            modelo.objects.filter(pk=OuterRef('registro_id')).values('prioridade')[:1]
+        ))
+
+
+def reconciliar_timeline():
+    """Confere a timeline inteira contra as tabelas AUD. Retorna {tabela: (criadas, atualizadas, removidas)}"""
+    resultado = {}
+    for tipo, modelo in MODELO_POR_TIPO.items():
+        tabela = modelo._meta.db_table
+        total = [0, 0, 0]
+        ids = modelo.objects.order_by('pk').values_list('pk', flat=True)
+        lote = []
+        for registro_id in ids.iterator(chunk_size=5000):
+            lote.append(registro_id)
+            if len(lote) >= TAMANHO_LOTE_IN:
+                total = [a + b for a, b in zip(total, atualizar_timeline(tipo, lote, conteudo_alterado=False))]
+                lote = []
+        if lote:
+            total = [a + b for a, b in zip(total, atualizar_timeline(tipo, lote, conteudo_alterado=False))]
+        # Linhas de registros que não existem mais (anti-join)
+        orfas = AudTimeline.objects.filter(tabela=tabela).exclude(registro_id__in=modelo.objects.values('pk'))
+        invalidar_dias(tabela, orfas.values_list('data_ref', flat=True), contagem=True)
+        remover_estatisticas(tabela, orfas.values_list('registro_id', flat=True))
+        removidas, _ = orfas.delete()
+        total[2] += removidas
+        resultado[tabela] = tuple(total)
+    return resultado
+
+
+@contextmanager
+def atualizacao_em_lote():
+    """
+    Acumula as alterações feitas pelos signals e atualiza a timeline uma vez no
+    final, com queries em lote (usado em importações de muitos registros). As
+    atualizações registradas com registrar_no_lote também rodam uma vez no final.
+    Se o bloco levantar uma exceção as pendências são descartadas: a transação
+    pode estar quebrada, e reconciliar_timeline corrige o que ficar para trás.
+    """
+    if getattr(_estado, 'pendentes', None) is not None:
+        yield
+        return
+    _estado.pendentes = {tipo: set() for tipo in MODELO_POR_TIPO}
+    _estado.adicionais = {chave: set() for chave in _finalizadores_lote}
+    try:
+        yield
+    finally:
+        pendentes, _estado.pendentes = _estado.pendentes, None
+        adicionais, _estado.adicionais = _estado.adicionais, None
+    # Só na saída normal do bloco
+    for tipo, ids in pendentes.items():
+        if ids:
+            atualizar_timeline(tipo, ids)
+    for chave, itens in adicionais.items():
+        if itens:
+            _finalizadores_lote[chave](itens)
+
+
+def registrar_no_lote(chave, finalizar):
+    """Registra uma atualização acumulada em atualizacao_em_lote: finalizar(itens) roda uma vez no final"""
+    _finalizadores_lote[chave] = finalizar
+
+
+def adicionar_ao_lote(chave, itens):
+    """Acumula itens para a atualização registrada como chave. Retorna False fora de um lote"""
+    adicionais = getattr(_estado, 'adicionais', None)
+    if adicionais is None:
+        return False
+    adicionais[chave].update(itens)
+    return True
+
+
+def _registro_alterado(sender, instance, **kwargs):
+    tipo = next(tipo for tipo, modelo in MODELO_POR_TIPO.items() if modelo is sender)
+    pendentes = getattr(_estado, 'pendentes', None)
+    if pendentes is not None:
+        pendentes[tipo].add(instance.pk)
+        return
+    registro_id = instance.pk
+    transaction.on_commit(lambda: atualizar_timeline(tipo, [registro_id]))
+
+
+for _modelo in MODELO_POR_TIPO.values():
+    post_save.connect(_registro_alterado, sender=_modelo, dispatch_uid=f'timeline-save-{_modelo._meta.db_table}')
+    post_delete.connect(_registro_alterado, sender=_modelo, dispatch_uid=f'timeline-delete-{_modelo._meta.db_table}')
@@ -24,6 +24,11 @@ from .views import (
     HistoricoAlteracoesView,
     AdicionarObservacaoRegistroView,
     CompararRegistrosView,
+    EstadoEmView,
+    MudancasView,
+    VersoesRegistroView,
+    AtividadeView,
+    RegistrosFrequentesView,
     NotificacoesView,
     MarcarNotificacaoLidaView,
 )
@@ -59,6 +64,8 @@ urlpatterns = [
     path('insights/report', InsightsReportView.as_view(), name='insights-report'),
     path('insights/dependencias', InsightsDependenciasView.as_view(), name='insights-dependencias'),
     path('insights/prioridades', InsightsPrioridadesView.as_view(), name='insights-prioridades'),
+    path('insights/atividade', AtividadeView.as_view(), name='insights-atividade'),
+    path('insights/registros-frequentes', RegistrosFrequentesView.as_view(), name='insights-registros-frequentes'),
     
     # ========================================================================
     # MODAL & REGISTROS - Modal data and record operations
@@ -70,6 +77,9 @@ urlpatterns = [
     # ========================================================================
     path('historico-alteracoes/', HistoricoAlteracoesView.as_view(), name='historico-alteracoes'),
     path('comparar-registros/', CompararRegistrosView.as_view(), name='comparar-registros'),
+    path('estado-em/', EstadoEmView.as_view(), name='estado-em'),
+    path('mudancas/', MudancasView.as_view(), name='mudancas'),
+    path('versoes/', VersoesRegistroView.as_view(), name='versoes'),
     
     # ========================================================================
     # OBSERVAÇÕES - Observation operations
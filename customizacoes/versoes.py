@@ -0,0 +1,458 @@
+# customizacoes/versoes.py
+"""
+Versões dos registros AUD (AUD_VERSAO).
+
+AUD_SQL, AUD_REPORT e AUD_FV têm CODSENTENCA/ID como chave primária e guardam
+só o estado atual de cada registro. Cada estado importado pelo import_aud é
+gravado também em AUD_VERSAO, com número de versão crescente por registro (na
+ordem de importação). O índice único (TABELA, ID_REGISTRO, VERSAO) faz da
+"última versão" e da "versão anterior" buscas diretas no índice, sem ordenar
+todas as linhas do registro. As versões de um registro são consecutivas (1..n):
+nenhuma é apagada.
+
+Um estado já registrado para o registro (mesma assinatura, que inclui as
+datas de modificação) não cria versão nova, então reimportar o mesmo arquivo
+não altera o histórico; voltar ao conteúdo antigo com nova data é versão nova.
+
+As tabelas AUD_* são o retrato da versão mais recente de cada registro (maior
+DATA_REF e, no empate, maior número de versão): o import_aud grava a versão e o
+retrato na mesma transação, e as listagens, insights e notificações leem só o
+retrato, sem agrupar o histórico. verificar_estado_atual reconstrói o retrato
+esperado a partir de AUD_VERSAO e aponta (ou corrige) as divergências.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import Lag, Lead, RowNumber
+from django.utils import timezone
+
+from .models import AudVersao, MODELO_POR_TIPO, TAMANHO_LOTE_IN, TIPO_POR_TABELA
+
+# Versões por INSERT em lote (SQL Server aceita no máximo 2100 parâmetros)
+TAMANHO_LOTE_ESCRITA = 100
+
+CAMPOS_REC = ('reccreatedby', 'reccreatedon', 'recmodifiedby', 'recmodifiedon')
+
+# Colunas de origem de cada tipo (as mesmas do CSV importado)
+CAMPOS_POR_TIPO = {
+    'sql': ('codcoligada', 'aplicacao', 'titulo', 'sentenca', 'tamanho', *CAMPOS_REC),
+    'report': ('codcoligada', 'codaplicacao', 'codigo', 'descricao', *CAMPOS_REC),
+    'fv': ('codcoligada', 'nome', 'descricao', 'idcategoria', 'ativo', *CAMPOS_REC),
+}
+
+# Versão retratada na tabela AUD: maior DATA_REF (vazia conta como a mais antiga), depois maior versão
+ORDEM_MAIS_RECENTE = (F('data_ref').desc(nulls_last=True), F('versao').desc())
+
+# Campo usado como título de cada tipo
+CAMPO_TITULO = {'sql': 'titulo', 'report': 'codigo', 'fv': 'nome'}
+
+# Texto comparado linha a linha entre versões de cada tipo
+CAMPO_CONTEUDO = {'sql': 'sentenca', 'report': 'descricao', 'fv': 'descricao'}
+
+# Campos de cada tipo na resposta do endpoint de comparação
+CAMPOS_COMPARACAO = {
+    'sql': ('titulo', 'sentenca', 'aplicacao', 'tamanho'),
+    'report': ('codigo', 'descricao', 'codaplicacao'),
+    'fv': ('nome', 'descricao', 'idcategoria', 'ativo'),
+}
+
+
+def _com_fuso(valor):
+    """Datas do CSV chegam sem fuso: usa o fuso padrão, como o ORM faz ao gravar"""
+    if isinstance(valor, datetime) and timezone.is_naive(valor):
+        return timezone.make_aware(valor)
+    return valor
+
+
+def _normalizar(valor):
+    valor = _com_fuso(valor)
+    if isinstance(valor, datetime):
+        return valor.astimezone(dt_timezone.utc).isoformat()
+    return valor
+
+
+def calcular_assinatura(tipo, dados):
+    """Hash das colunas de origem (dict do import ou registro/versão com os mesmos atributos)"""
+    if not isinstance(dados, dict):
+        dados = {campo: getattr(dados, campo) for campo in CAMPOS_POR_TIPO[tipo]}
+    valores = [_normalizar(dados.get(campo)) for campo in CAMPOS_POR_TIPO[tipo]]
+    return hashlib.sha1(json.dumps(valores, default=str).encode()).hexdigest()
+
+
+def data_ref_dos_dados(dados):
+    """DATA_REF do estado: COALESCE(RECMODIFIEDON, RECCREATEDON), com fuso"""
+    return _com_fuso(dados.get('recmodifiedon') or dados.get('reccreatedon'))
+
+
+def _nova_versao(tipo, registro_id, numero, dados):
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    return AudVersao(
+        tabela=tabela, registro_id=registro_id, versao=numero,
+        data_ref=data_ref_dos_dados(dados), assinatura=calcular_assinatura(tipo, dados),
+        **{campo: _com_fuso(dados.get(campo)) for campo in CAMPOS_POR_TIPO[tipo]},
+    )
+
+
+def substitui_retrato(nova_data, data_atual):
+    """Se uma versão nova com DATA_REF nova_data passa a ser a retratada (mesma regra de ORDEM_MAIS_RECENTE)"""
+    return data_atual is None or (nova_data is not None and nova_data >= data_atual)
+
+
+def dados_do_registro(tipo, registro):
+    """Colunas de origem de um registro AUD (ou de uma versão)"""
+    return {campo: getattr(registro, campo) for campo in CAMPOS_POR_TIPO[tipo]}
+
+
+def ultima_versao(tabela, registro_id):
+    return AudVersao.objects.filter(tabela=tabela, registro_id=registro_id).order_by('-versao').first()
+
+
+def versao_anterior(tabela, registro_id, versao):
+    """Versão imediatamente anterior à informada (busca no índice único), ou None"""
+    return (
+        AudVersao.objects.filter(tabela=tabela, registro_id=registro_id, versao__lt=versao)
+        .order_by('-versao').first()
+    )
+
+
+def versao_na_data(tabela, registro_id, data, dia_inteiro=False):
+    """
+    Versão mais recente do registro com DATA_REF no mesmo segundo de `data` (com
+    dia_inteiro=True, no mesmo dia do calendário no fuso do projeto), ou None.
+    """
+    if dia_inteiro:
+        inicio = timezone.make_aware(datetime.combine(timezone.localtime(data).date(), datetime.min.time()))
+        fim = inicio + timedelta(days=1)
+    else:
+        inicio = data.replace(microsecond=0)
+        fim = inicio + timedelta(seconds=1)
+    return (
+        AudVersao.objects.filter(
+            tabela=tabela, registro_id=registro_id, data_ref__gte=inicio, data_ref__lt=fim,
+        )
+        .order_by(*ORDEM_MAIS_RECENTE).first()
+    )
+
+
+def registrar_versao(tipo, registro_id, dados, atual=None):
+    """
+    Acrescenta uma versão com o estado `dados` (colunas de origem), se ele ainda
+    não estiver registrado para o registro. `atual` é o registro AUD existente:
+    quando o registro ainda não tem versões, o estado dele vira a versão 1 antes
+    da nova. Deve ser chamada dentro de uma transação. Retorna a versão criada
+    ou None se o estado não mudou.
+    """
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    ultima = (
+        AudVersao.objects.select_for_update()
+        .filter(tabela=tabela, registro_id=registro_id).order_by('-versao').first()
+    )
+    if ultima is None and atual is not None:
+        ultima = _nova_versao(tipo, registro_id, 1, dados_do_registro(tipo, atual))
+        ultima.save()
+
+    assinatura = calcular_assinatura(tipo, dados)
+    if ultima is not None and AudVersao.objects.filter(
+        tabela=tabela, registro_id=registro_id, assinatura=assinatura
+    ).exists():
+        return None
+    versao = _nova_versao(tipo, registro_id, ultima.versao + 1 if ultima else 1, dados)
+    versao.save()
+    return versao
+
+
+def inicializar_versoes():
+    """
+    Cria a versão 1 (estado atual) dos registros AUD que ainda não têm versões,
+    como os importados antes de AUD_VERSAO existir. Retorna {tabela: versões criadas}.
+    """
+    resultado = {}
+    for tipo, modelo in MODELO_POR_TIPO.items():
+        tabela = modelo._meta.db_table
+        criadas = 0
+        ultimo_id = None
+        while True:
+            registros = modelo.objects.order_by('pk')
+            if ultimo_id is not None:
+                registros = registros.filter(pk__gt=ultimo_id)
+            registros = list(registros.only('pk', *CAMPOS_POR_TIPO[tipo])[:TAMANHO_LOTE_IN])
+            if not registros:
+                break
+            ultimo_id = registros[-1].pk
+
+            com_versao = set(
+                AudVersao.objects.filter(tabela=tabela, registro_id__in=[registro.pk for registro in registros])
+                .values_list('registro_id', flat=True).distinct()
+            )
+            novas = [
+                _nova_versao(tipo, registro.pk, 1, dados_do_registro(tipo, registro))
+                for registro in registros if registro.pk not in com_versao
+            ]
+            with transaction.atomic():
+                AudVersao.objects.bulk_create(novas, batch_size=TAMANHO_LOTE_ESCRITA)
+            criadas += len(novas)
+        resultado[tabela] = criadas
+    return resultado
+
+
+def _versoes_mais_recentes(tabela, ids):
+    """{id do registro: versão retratada} dos registros informados, em uma query"""
+    retratada = (
+        AudVersao.objects.filter(tabela=tabela, registro_id=OuterRef('registro_id'))
+        .order_by(*ORDEM_MAIS_RECENTE).values('id')[:1]
+    )
+    return {
+        versao.registro_id: versao
+        for versao in AudVersao.objects.filter(tabela=tabela, registro_id__in=ids, id=Subquery(retratada))
+    }
+
+
+def verificar_estado_atual(corrigir=False):
+    """
+    Compara cada tabela AUD com a versão mais recente de cada registro em
+    AUD_VERSAO. Retorna {tabela: {'divergentes': [ids], 'sem_versao': [ids],
+    'sem_registro': [ids]}}. Com corrigir=True, grava a versão mais recente nos
+    registros divergentes, recria os registros ausentes e cria a versão 1 dos
+    registros sem versão (prioridade e observação dos registros são mantidas).
+    """
+    from .timeline import atualizacao_em_lote
+
+    resultado = {}
+    for tipo, modelo in MODELO_POR_TIPO.items():
+        tabela = modelo._meta.db_table
+        divergencias = {'divergentes': [], 'sem_versao': [], 'sem_registro': []}
+        ultimo_id = None
+        while True:
+            registros = modelo.objects.order_by('pk')
+            if ultimo_id is not None:
+                registros = registros.filter(pk__gt=ultimo_id)
+            registros = list(registros[:TAMANHO_LOTE_IN])
+            if not registros:
+                break
+            ultimo_id = registros[-1].pk
+
+            versoes = _versoes_mais_recentes(tabela, [registro.pk for registro in registros])
+            sem_versao, divergentes = [], []
+            for registro in registros:
+                versao = versoes.get(registro.pk)
+                if versao is None:
+                    sem_versao.append(registro)
+                elif versao.assinatura != calcular_assinatura(tipo, registro):
+                    divergentes.append((registro, versao))
+            divergencias['sem_versao'].extend(registro.pk for registro in sem_versao)
+            divergencias['divergentes'].extend(registro.pk for registro, _ in divergentes)
+
+            if corrigir and (sem_versao or divergentes):
+                with transaction.atomic(), atualizacao_em_lote():
+                    AudVersao.objects.bulk_create(
+                        [_nova_versao(tipo, registro.pk, 1, dados_do_registro(tipo, registro)) for registro in sem_versao],
+                        batch_size=TAMANHO_LOTE_ESCRITA,
+                    )
+                    for registro, versao in divergentes:
+                        for campo, valor in dados_do_registro(tipo, versao).items():
+                            setattr(registro, campo, valor)
+                        registro.save()
+
+        # Versões de registros que não estão na tabela AUD (anti-join com a chave primária)
+        ausentes = list(
+            AudVersao.objects.filter(tabela=tabela)
+            .exclude(registro_id__in=modelo.objects.values('pk'))
+            .values_list('registro_id', flat=True).distinct().order_by('registro_id')
+        )
+        divergencias['sem_registro'] = ausentes
+        if corrigir:
+            for inicio in range(0, len(ausentes), TAMANHO_LOTE_IN):
+                versoes = _versoes_mais_recentes(tabela, ausentes[inicio:inicio + TAMANHO_LOTE_IN])
+                with transaction.atomic(), atualizacao_em_lote():
+                    for registro_id, versao in versoes.items():
+                        modelo.objects.create(pk=registro_id, **dados_do_registro(tipo, versao))
+        resultado[tabela] = divergencias
+    return resultado
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor else None
+
+
+def formatar_comparacao(tipo, origem, registro):
+    """
+    Item do endpoint de comparação a partir de uma versão (ou do próprio registro
+    AUD, quando ele ainda não tem versões). Prioridade e observação são do
+    registro AUD, não da versão.
+    """
+    item = {'id': registro.pk}
+    if tipo == 'sql':
+        item['codsentenca'] = registro.pk
+    for campo in CAMPOS_COMPARACAO[tipo]:
+        item[campo] = getattr(origem, campo)
+    item.update({
+        # Mantém o contrato anterior: 'reccreatedby' traz o último usuário que alterou
+        'reccreatedby': origem.recmodifiedby or origem.reccreatedby,
+        'reccreatedon': _isoformat(origem.reccreatedon),
+        'recmmodifiedon': _isoformat(origem.recmodifiedon),
+        'prioridade': registro.prioridade,
+        'observacao': registro.observacao,
+    })
+    return item
+
+
+def comparar_versoes(tipo, registro_id, data=None, dia_inteiro=False):
+    """
+    (registro atual, registro anterior) formatados para a comparação. O atual é a
+    versão com DATA_REF em `data` (por padrão, a do registro AUD; com
+    dia_inteiro=True, a mais recente do dia de `data`) ou a última; o anterior é
+    a versão imediatamente anterior a ele. Retorna None se o registro não existir.
+    """
+    modelo = MODELO_POR_TIPO[tipo]
+    tabela = modelo._meta.db_table
+    registro = modelo.objects.filter(pk=registro_id).first()
+    if registro is None:
+        return None
+
+    # Sem data, o atual é o estado do registro AUD (a última versão importada pode ser mais antiga)
+    data = data or registro.data_ref
+    versao = versao_na_data(tabela, registro_id, data, dia_inteiro) if data else None
+    if versao is None:
+        versao = ultima_versao(tabela, registro_id)
+    if versao is None:
+        return formatar_comparacao(tipo, registro, registro), None
+
+    anterior = versao_anterior(tabela, registro_id, versao.versao)
+    return (
+        formatar_comparacao(tipo, versao, registro),
+        formatar_comparacao(tipo, anterior, registro) if anterior else None,
+    )
+
+
+def pre_calcular_diffs(versao_ids):
+    """
+    Calcula e grava em AUD_DIFERENCA a diferença de conteúdo de cada versão para
+    a anterior do mesmo registro, para que a tela de comparação a encontre em
+    qualquer processo. Nas versões de AUD_SQL também calcula a diferença
+    semântica e marca as que não mudam a sentença normalizada. Retorna quantas
+    diferenças foram calculadas.
+    """
+    from .diferencas import obter_diff
+
+    calculadas = 0
+    for inicio in range(0, len(versao_ids), TAMANHO_LOTE_IN):
+        marcadas = []
+        for versao in AudVersao.objects.filter(id__in=versao_ids[inicio:inicio + TAMANHO_LOTE_IN]):
+            anterior = versao_anterior(versao.tabela, versao.registro_id, versao.versao)
+            if anterior is None:
+                continue
+            tipo = TIPO_POR_TABELA[versao.tabela]
+            campo = CAMPO_CONTEUDO[tipo]
+            obter_diff(getattr(anterior, campo), getattr(versao, campo))
+            if tipo == 'sql':
+                semantico = obter_diff(anterior.sentenca, versao.sentenca, modo='semantico')
+                versao.sem_mudanca_semantica = semantico['sem_mudanca_semantica']
+                marcadas.append(versao)
+            calculadas += 1
+        AudVersao.objects.bulk_update(marcadas, ['sem_mudanca_semantica'], batch_size=TAMANHO_LOTE_ESCRITA)
+    return calculadas
+
+
+# ----------------------------------------------------------------------
+# Histórico de um registro
+# ----------------------------------------------------------------------
+COLUNAS_HISTORICO = (
+    'versao', 'data_ref', 'data_importacao', 'recmodifiedby', 'reccreatedby', 'assinatura', 'sem_mudanca_semantica',
+)
+
+
+def _item_historico(tipo, versao):
+    """Metadados de uma versão na listagem do histórico de um registro"""
+    return {
+        'versao': versao['versao'],
+        'titulo': versao[CAMPO_TITULO[tipo]],
+        'usuario': versao['recmodifiedby'] or versao['reccreatedby'],
+        'data_ref': _isoformat(versao['data_ref']),
+        'data_importacao': _isoformat(versao['data_importacao']),
+        'assinatura': versao['assinatura'],
+        'sem_mudanca_semantica': versao['sem_mudanca_semantica'],
+    }
+
+
+def codificar_cursor_versao(versao):
+    """Cursor opaco com o número da última versão da página"""
+    return base64.urlsafe_b64encode(json.dumps([versao]).encode()).decode()
+
+
+def decodificar_cursor_versao(cursor):
+    """Retorna o número da versão. Levanta ValueError se o cursor for inválido"""
+    try:
+        versao, = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Cursor inválido.')
+    if not isinstance(versao, int):
+        raise ValueError('Cursor inválido.')
+    return versao
+
+
+def pagina_versoes(tipo, registro_id, cursor=None, tamanho=50):
+    """
+    Uma página das versões do registro, da mais nova para a mais antiga, por
+    keyset sobre o índice único (sem conteúdo). Retorna (itens, próximo cursor, total).
+    """
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    ultima = ultima_versao(tabela, registro_id)
+    queryset = AudVersao.objects.filter(tabela=tabela, registro_id=registro_id)
+    if cursor:
+        queryset = queryset.filter(versao__lt=decodificar_cursor_versao(cursor))
+    linhas = list(
+        queryset.order_by('-versao').values(*COLUNAS_HISTORICO, CAMPO_TITULO[tipo])[:tamanho + 1]
+    )
+    proximo = codificar_cursor_versao(linhas[tamanho - 1]['versao']) if len(linhas) > tamanho else None
+    return [_item_historico(tipo, linha) for linha in linhas[:tamanho]], proximo, ultima.versao if ultima else 0
+
+
+def versao_em(tipo, registro_id, data):
+    """Número da versão em vigor na data (a mais recente com DATA_REF até a data), ou None"""
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    return (
+        AudVersao.objects.filter(tabela=tabela, registro_id=registro_id, data_ref__lte=data)
+        .order_by(*ORDEM_MAIS_RECENTE).values_list('versao', flat=True).first()
+    )
+
+
+def versoes_vizinhas(tipo, registro_id, versao, vizinhos=2):
+    """
+    A versão informada e até `vizinhos` versões de cada lado, com o conteúdo, em
+    uma query com janela: LAG/LEAD trazem a data da versão anterior e da
+    seguinte, calculadas sobre todas as versões do registro; só as linhas da
+    faixa pedida saem do banco.
+    """
+    tabela = MODELO_POR_TIPO[tipo]._meta.db_table
+    ordem = {'order_by': F('versao').asc()}
+    linhas = (
+        AudVersao.objects.filter(tabela=tabela, registro_id=registro_id)
+        .annotate(
+            posicao=Window(RowNumber(), **ordem),
+            data_anterior=Window(Lag('data_ref'), **ordem),
+            data_seguinte=Window(Lead('data_ref'), **ordem),
+        )
+        # Versões consecutivas: a posição na janela é o próprio número da versão
+        .filter(posicao__gte=versao - vizinhos, posicao__lte=versao + vizinhos)
+        .order_by('versao')
+    )
+    itens = []
+    for linha in linhas:
+        item = {
+            'versao': linha.versao,
+            'alvo': linha.versao == versao,
+            'usuario': linha.recmodifiedby or linha.reccreatedby,
+            'data_ref': _isoformat(linha.data_ref),
+            'data_anterior': _isoformat(linha.data_anterior),
+            'data_seguinte': _isoformat(linha.data_seguinte),
+            'sem_mudanca_semantica': linha.sem_mudanca_semantica,
+        }
+        item.update({campo: getattr(linha, campo) for campo in CAMPOS_COMPARACAO[tipo]})
+        item['reccreatedon'] = _isoformat(linha.reccreatedon)
+        item['recmodifiedon'] = _isoformat(linha.recmodifiedon)
+        itens.append(item)
+    return itens
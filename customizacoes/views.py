@@ -1,20 +1,51 @@
 # customizacoes/views.py
+import time
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
-from django.db import transaction
-from django.db.models import Count, Q
-from django.db.models.functions import Coalesce
+from django.db import IntegrityError, transaction
+from django.db.models import Count
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.http import HttpResponse
 from .models import (
     CustomizacaoFV, CustomizacaoSQL, CustomizacaoReport,
-    CadastroDependencias
+    CadastroDependencias, AudTimeline, AudEstatisticaRegistro, HIERARQUIA_PRIORIDADE, MODELO_POR_TIPO, CAMPO_POR_TIPO,
+    TIPO_POR_TABELA, par_origem_destino, tipo_da_tabela
 )
 from .serializers import *
+from .grafo import empacotar, listar_agrupamentos, obter_grafo, resolver_nos
+from .propagacao import propagar_prioridades
+from .exportacao import exportar_csv, exportar_json, exportar_xlsx, versao_exportacao
+from .busca import filtrar_busca, indexar_dependencias
+from .historico import TABELAS_HISTORICO, buscar_pagina
+from .atividade import AGRUPAMENTOS, ESCALAS, consultar_atividade
+from .estado import buscar_estado, buscar_mudancas, data_pura, interpretar_data, resumir_mudancas
+from .timeline import DATA_SEM_REFERENCIA
+from .paralelo import TempoEsgotadoConsultas, executar_em_paralelo
+from .versoes import CAMPO_CONTEUDO, comparar_versoes, pagina_versoes, versao_em, versoes_vizinhas
+from .diferencas import MODOS_DIFF, obter_diff, sem_mudanca_semantica
+
+
+# Tamanho dos lotes de insert/IN (SQL Server aceita no máximo 2100 parâmetros por comando)
+BULK_BATCH_SIZE = 300
+
+# Formatos do export do grafo: (gerador, content type)
+FORMATOS_EXPORTACAO = {
+    'json': (exportar_json, 'application/json'),
+    'csv': (exportar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (exportar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Maior page_size aceito pelo histórico de alterações e pelo estado em uma data
+HISTORICO_PAGE_SIZE_MAX = 200
+
+# Maior número de versões de cada lado no histórico de um registro
+VERSOES_VIZINHAS_MAX = 20
 
 
 class StandardPagination(PageNumberPagination):
@@ -97,257 +128,296 @@ class CadastroDependenciasViewSet(viewsets.ModelViewSet):
             elif origem_tabela == 'AUD_FV':
                 queryset = queryset.filter(id_aud_fv__isnull=False)
         
-        # Filtro por prioridade
+        # Filtro por prioridade (origem ou, se vazia, destino) calculado no banco
         prioridade = self.request.query_params.get('prioridade')
-        sem_prioridade = self.request.query_params.get('sem_prioridade')
-        
+        sem_prioridade = self.request.query_params.get('sem_prioridade') == 'true'
         if prioridade or sem_prioridade:
-            from .models import CustomizacaoSQL, CustomizacaoReport, CustomizacaoFV
-            
-            def _determinar_origem_destino(dep):
-                """Determina qual campo é origem e qual é destino (mesma lógica do serializer)"""
-                origem_tipo = None
-                destino_tipo = None
-                
-                if dep.id_aud_sql and dep.id_aud_report:
-                    origem_tipo = 'sql'
-                    destino_tipo = 'report'
-                elif dep.id_aud_sql and dep.id_aud_fv:
-                    origem_tipo = 'sql'
-                    destino_tipo = 'fv'
-                elif dep.id_aud_report and dep.id_aud_sql:
-                    origem_tipo = 'report'
-                    destino_tipo = 'sql'
-                elif dep.id_aud_report and dep.id_aud_fv:
-                    origem_tipo = 'report'
-                    destino_tipo = 'fv'
-                elif dep.id_aud_fv and dep.id_aud_sql:
-                    origem_tipo = 'fv'
-                    destino_tipo = 'sql'
-                elif dep.id_aud_fv and dep.id_aud_report:
-                    origem_tipo = 'fv'
-                    destino_tipo = 'report'
-                
-                return origem_tipo, destino_tipo
-            
-            def _obter_prioridade(dep, origem_tipo, destino_tipo):
-                """Obtém a prioridade da origem, ou do destino se origem não tiver (mesma lógica do serializer)"""
-                # Tenta buscar a prioridade da origem primeiro
-                try:
-                    if origem_tipo == 'sql' and dep.id_aud_sql:
-                        sql = CustomizacaoSQL.objects.get(codsentenca=dep.id_aud_sql)
-                        if sql.prioridade:
-                            return sql.prioridade
-                    elif origem_tipo == 'report' and dep.id_aud_report:
-                        report = CustomizacaoReport.objects.get(id=dep.id_aud_report)
-                        if report.prioridade:
-                            return report.prioridade
-                    elif origem_tipo == 'fv' and dep.id_aud_fv:
-                        fv = CustomizacaoFV.objects.get(id=dep.id_aud_fv)
-                        if fv.prioridade:
-                            return fv.prioridade
-                except Exception:
-                    pass
-                
-                # Se origem não tiver prioridade, tenta buscar do destino
-                try:
-                    if destino_tipo == 'sql' and dep.id_aud_sql and origem_tipo != 'sql':
-                        sql = CustomizacaoSQL.objects.get(codsentenca=dep.id_aud_sql)
-                        if sql.prioridade:
-                            return sql.prioridade
-                    elif destino_tipo == 'report' and dep.id_aud_report and origem_tipo != 'report':
-                        report = CustomizacaoReport.objects.get(id=dep.id_aud_report)
-                        if report.prioridade:
-                            return report.prioridade
-                    elif destino_tipo == 'fv' and dep.id_aud_fv and origem_tipo != 'fv':
-                        fv = CustomizacaoFV.objects.get(id=dep.id_aud_fv)
-                        if fv.prioridade:
-                            return fv.prioridade
-                except Exception:
-                    pass
-                
-                return None
-            
-            # Lista para armazenar IDs de dependências que atendem ao filtro
-            ids_filtrados = []
-            
-            # Itera sobre todas as dependências para verificar a prioridade
-            for dep in queryset:
-                origem_tipo, destino_tipo = _determinar_origem_destino(dep)
-                if not origem_tipo or not destino_tipo:
-                    continue
-                
-                prioridade_final = _obter_prioridade(dep, origem_tipo, destino_tipo)
-                
-                # Verifica se atende ao filtro
-                if sem_prioridade == 'true':
-                    # Filtra por "Sem Prioridade" - quando não há prioridade ou está vazia
-                    if not prioridade_final or (isinstance(prioridade_final, str) and prioridade_final.strip() == ''):
-                        ids_filtrados.append(dep.id)
-                elif prioridade:
-                    # Filtra por prioridade específica
-                    if prioridade_final == prioridade:
-                        ids_filtrados.append(dep.id)
-            
-            # Aplica o filtro pelos IDs encontrados
-            queryset = queryset.filter(id__in=ids_filtrados)
+            queryset = queryset.filtrar_prioridade(prioridade=prioridade, sem_prioridade=sem_prioridade)
+
+        # Ordenação por prioridade efetiva (?ordering=prioridade ou -prioridade)
+        ordering = self.request.query_params.get('ordering')
+        if ordering in ('prioridade', '-prioridade'):
+            queryset = queryset.com_ordem_prioridade().order_by(
+                f"{'-' if ordering.startswith('-') else ''}prioridade_ordem", '-data_criacao'
+            )
         
-        # Filtro por busca (nome, ID ou usuário)
+        # Filtro por busca (nome, ID ou usuário) pelo índice de termos
         search = self.request.query_params.get('search')
         if search:
-            # Busca em origem_nome, destino_nome, origem_id, destino_id ou criado_por_nome
-            # Como esses campos são calculados no serializer, precisamos fazer uma busca mais ampla
-            # Busca por ID nas tabelas relacionadas
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(id_aud_sql__icontains=search) |
-                Q(id_aud_report__icontains=search) |
-                Q(id_aud_fv__icontains=search) |
-                Q(criado_por__icontains=search)
-            )
-        
+            queryset = filtrar_busca(queryset, search)
+
         return queryset
 
     def perform_create(self, serializer):
         # Salva com o ID do usuário ao invés do objeto User
         user_id = getattr(self.request.user, 'id', None) if self.request.user.is_authenticated else None
-        serializer.save(criado_por=user_id)
+        dep = serializer.save(criado_por=user_id)
 
-    def _obter_prioridade_maior(self, prioridade_atual, prioridade_nova):
-        """
-        Compara duas prioridades e retorna a maior.
-        Hierarquia: Alta > Média > Baixa
-        """
-        if not prioridade_nova:
-            return prioridade_atual
-        
-        if not prioridade_atual:
-            return prioridade_nova
-        
-        hierarquia = {'Alta': 3, 'Média': 2, 'Baixa': 1}
-        nivel_atual = hierarquia.get(prioridade_atual, 0)
-        nivel_novo = hierarquia.get(prioridade_nova, 0)
-        
-        return prioridade_nova if nivel_novo >= nivel_atual else prioridade_atual
-    
-    def _atualizar_prioridade_registro(self, tipo, registro_id, nova_prioridade):
-        """
-        Atualiza a prioridade de um registro, mantendo a maior se já existir uma.
-        """
-        try:
-            if tipo == 'sql':
-                registro = CustomizacaoSQL.objects.filter(codsentenca=registro_id).first()
-                if registro:
-                    prioridade_final = self._obter_prioridade_maior(registro.prioridade, nova_prioridade)
-                    registro.prioridade = prioridade_final
-                    registro.save()
-            elif tipo == 'report':
-                registro = CustomizacaoReport.objects.filter(id=registro_id).first()
-                if registro:
-                    prioridade_final = self._obter_prioridade_maior(registro.prioridade, nova_prioridade)
-                    registro.prioridade = prioridade_final
-                    registro.save()
-            elif tipo == 'fv':
-                registro = CustomizacaoFV.objects.filter(id=registro_id).first()
-                if registro:
-                    prioridade_final = self._obter_prioridade_maior(registro.prioridade, nova_prioridade)
-                    registro.prioridade = prioridade_final
-                    registro.save()
-        except Exception as e:
-            # Log do erro mas continua o processo
-            pass
+        # Propaga a prioridade da origem para tudo o que passa a ser alcançável
+        par = par_origem_destino(dep.id_aud_sql, dep.id_aud_report, dep.id_aud_fv)
+        if par:
+            propagar_prioridades(origens=[par[0]])
 
     @action(detail=False, methods=['post'], url_path='criar-multiplas')
     def criar_multiplas(self, request):
+        """
+        Cria dependências de uma origem para vários destinos de forma set-based:
+        valida existência com uma query por tabela, ignora pares já cadastrados,
+        insere com bulk_create e eleva prioridades com um UPDATE por tabela.
+        """
         origem_tipo = request.data.get('origem_tipo')
         origem_id = request.data.get('origem_id')
         destinos = request.data.get('destinos', [])
         prioridade = request.data.get('prioridade')  # Recebe a prioridade do frontend
 
-        if origem_tipo not in ['sql', 'report', 'fv'] or not origem_id:
+        if origem_tipo not in MODELO_POR_TIPO or not origem_id:
+            return Response({"error": "Origem inválida."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            origem_id = int(origem_id)
+        except (TypeError, ValueError):
             return Response({"error": "Origem inválida."}, status=status.HTTP_400_BAD_REQUEST)
         if not destinos:
             return Response({"error": "Pelo menos 1 destino é necessário."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Valida prioridade se fornecida
-        if prioridade and prioridade not in ['Alta', 'Média', 'Baixa']:
+        if prioridade and prioridade not in HIERARQUIA_PRIORIDADE:
             return Response({"error": "Prioridade inválida. Use: Alta, Média ou Baixa."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Valida que origem e destino são de tipos diferentes
-        created = []
-        with transaction.atomic():
-            # Atualiza prioridade na origem se fornecida (mantém a maior se já existir)
-            if prioridade:
-                self._atualizar_prioridade_registro(origem_tipo, origem_id, prioridade)
+        if not MODELO_POR_TIPO[origem_tipo].objects.filter(pk=origem_id).exists():
+            return Response({"error": "Origem não encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
-            # Coleta todos os IDs de destino para atualizar prioridade depois
-            destinos_ids = []
-            
-            for dest in destinos:
-                dest_tipo = dest.get('tipo')
-                dest_id = dest.get('id')
-                if dest_tipo not in ['sql', 'report', 'fv']:
+        # Agrupa os destinos por tipo, descartando inválidos, repetidos e do mesmo tipo da origem
+        destinos_por_tipo = {}
+        invalidos = []
+        for dest in destinos:
+            dest_tipo = dest.get('tipo') if isinstance(dest, dict) else None
+            dest_id = dest.get('id') if isinstance(dest, dict) else None
+            try:
+                dest_id = int(dest_id)
+            except (TypeError, ValueError):
+                dest_id = None
+            if dest_tipo not in MODELO_POR_TIPO or dest_id is None or dest_tipo == origem_tipo:
+                invalidos.append(dest)
+                continue
+            destinos_por_tipo.setdefault(dest_tipo, [])
+            if dest_id not in destinos_por_tipo[dest_tipo]:
+                destinos_por_tipo[dest_tipo].append(dest_id)
+
+        campo_origem = CAMPO_POR_TIPO[origem_tipo]
+        criado_por = getattr(request.user, 'id', None) if request.user.is_authenticated else None
+
+        novas = []
+        destinos_criados = []
+        duplicados = []
+        inexistentes = []
+        destinos_vinculados = {}
+        for dest_tipo, ids in destinos_por_tipo.items():
+            campo_destino = CAMPO_POR_TIPO[dest_tipo]
+            existentes = set(
+                MODELO_POR_TIPO[dest_tipo].objects.filter(pk__in=ids).values_list('pk', flat=True)
+            )
+            # O terceiro campo vazio garante que é exatamente o mesmo par (constraint única)
+            (campo_vazio,) = set(CAMPO_POR_TIPO.values()) - {campo_origem, campo_destino}
+            ja_cadastrados = set(
+                CadastroDependencias.objects.filter(**{
+                    campo_origem: origem_id,
+                    f'{campo_destino}__in': ids,
+                    f'{campo_vazio}__isnull': True,
+                }).values_list(campo_destino, flat=True)
+            )
+            for dest_id in ids:
+                if dest_id not in existentes:
+                    inexistentes.append({'tipo': dest_tipo, 'id': dest_id})
                     continue
-                
-                # Valida que origem e destino são de tipos diferentes
-                if origem_tipo == dest_tipo:
-                    continue  # Pula se origem e destino são do mesmo tipo
-
-                data = {
-                    'id_aud_sql': None,
-                    'id_aud_report': None,
-                    'id_aud_fv': None,
-                    'criado_por': getattr(request.user, 'id', None) if request.user.is_authenticated else None
-                }
+                destinos_vinculados.setdefault(dest_tipo, []).append(dest_id)
+                if dest_id in ja_cadastrados:
+                    duplicados.append({'tipo': dest_tipo, 'id': dest_id})
+                    continue
+                novas.append(CadastroDependencias(**{
+                    campo_origem: origem_id,
+                    campo_destino: dest_id,
+                    'criado_por': criado_por,
+                }))
+                destinos_criados.append({'tipo': dest_tipo, 'id': dest_id})
 
-                # Origem
-                if origem_tipo == 'sql':
-                    data['id_aud_sql'] = origem_id
-                elif origem_tipo == 'report':
-                    data['id_aud_report'] = origem_id
-                elif origem_tipo == 'fv':
-                    data['id_aud_fv'] = origem_id
-
-                # Destino (só preenche se for diferente da origem)
-                if dest_tipo == 'sql':
-                    data['id_aud_sql'] = dest_id
-                elif dest_tipo == 'report':
-                    data['id_aud_report'] = dest_id
-                elif dest_tipo == 'fv':
-                    data['id_aud_fv'] = dest_id
-
-                # Valida que exatamente 2 campos estão preenchidos
-                campos_preenchidos = sum(1 for v in [data['id_aud_sql'], data['id_aud_report'], data['id_aud_fv']] if v is not None)
-                if campos_preenchidos != 2:
-                    continue  # Pula se não tiver exatamente 2 campos
+        try:
+            with transaction.atomic():
+                CadastroDependencias.objects.bulk_create(novas, batch_size=BULK_BATCH_SIZE)
 
-                try:
-                    dep = CadastroDependencias(**data)
-                    dep.full_clean()
-                    dep.save()
-                    created.append(dep.id)
-                    
-                    # Adiciona à lista de destinos para atualizar prioridade depois
-                    destinos_ids.append((dest_tipo, dest_id))
-                            
-                except ValidationError as e:
-                    # Se houver erro de validação, continua para o próximo destino
-                    continue
+                # Eleva a prioridade da origem e de todos os destinos vinculados (mantém a maior)
+                if prioridade:
+                    MODELO_POR_TIPO[origem_tipo].objects.filter(pk=origem_id).elevar_prioridade(prioridade)
+                    for dest_tipo, ids in destinos_vinculados.items():
+                        MODELO_POR_TIPO[dest_tipo].objects.filter(pk__in=ids).elevar_prioridade(prioridade)
+        except IntegrityError:
+            # Outro processo cadastrou um dos pares entre a verificação e o insert
+            return Response(
+                {"error": "Algumas dependências foram cadastradas simultaneamente. Tente novamente."},
+                status=status.HTTP_409_CONFLICT
+            )
 
-            # Atualiza prioridade em TODOS os destinos após criar as dependências
-            # Isso garante que todos recebam a prioridade, mesmo se houver erro em algum
-            if prioridade:
-                for dest_tipo, dest_id in destinos_ids:
-                    self._atualizar_prioridade_registro(dest_tipo, dest_id, prioridade)
+        # Propaga a prioridade da origem para tudo o que ficou alcançável a partir dela
+        if novas or prioridade:
+            propagar_prioridades(origens=[(origem_tipo, origem_id)])
+
+        created = [dep.id for dep in novas]
+        if novas and None in created:
+            # Backend sem suporte a retorno de IDs no bulk_create: busca os IDs pelos pares
+            created = []
+            for dest_tipo, ids in destinos_por_tipo.items():
+                campo_destino = CAMPO_POR_TIPO[dest_tipo]
+                (campo_vazio,) = set(CAMPO_POR_TIPO.values()) - {campo_origem, campo_destino}
+                ids_criados = [d['id'] for d in destinos_criados if d['tipo'] == dest_tipo]
+                created.extend(CadastroDependencias.objects.filter(**{
+                    campo_origem: origem_id,
+                    f'{campo_destino}__in': ids_criados,
+                    f'{campo_vazio}__isnull': True,
+                }).values_list('id', flat=True))
+
+        # bulk_create não dispara signals: indexa os termos de busca das novas dependências
+        indexar_dependencias(created)
 
         # Notificação removida - tabela Notificacao não existe mais no banco
 
         return Response({
             "criadas": len(created),
-            "ids": created
+            "ids": created,
+            "destinos_criados": destinos_criados,
+            "duplicados": duplicados,
+            "inexistentes": inexistentes,
+            "invalidos": invalidos
         }, status=status.HTTP_201_CREATED)
 
 
+    @action(detail=False, methods=['get'], url_path='impacto')
+    def impacto(self, request):
+        """
+        Análise de impacto de um registro AUD: fecho transitivo downstream
+        (o que depende dele) e upstream (do que ele depende), com a profundidade,
+        o nome e a prioridade de cada nó. Usa o índice em memória do grafo.
+        """
+        inicio = time.perf_counter()
+        tipo = tipo_da_tabela(request.query_params.get('tabela'))
+        if not tipo:
+            return Response(
+                {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            registro_id = int(request.query_params.get('id'))
+        except (TypeError, ValueError):
+            return Response({"error": "Parâmetro 'id' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        profundidade_max = request.query_params.get('profundidade_max')
+        if profundidade_max is not None:
+            try:
+                profundidade_max = max(1, int(profundidade_max))
+            except ValueError:
+                return Response({"error": "Parâmetro 'profundidade_max' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        grafo = obter_grafo()
+        no = empacotar(tipo, registro_id)
+        downstream = grafo.fecho(no, 'downstream', profundidade_max)
+        upstream = grafo.fecho(no, 'upstream', profundidade_max)
+        resolvidos = resolver_nos({no, *downstream, *upstream})
+
+        def _listar(fecho):
+            itens = [dict(resolvidos[n], profundidade=profundidade) for n, profundidade in fecho.items()]
+            itens.sort(key=lambda item: (item['profundidade'], item['tabela'], item['id']))
+            return itens
+
+        return Response({
+            'registro': resolvidos[no],
+            'downstream': _listar(downstream),
+            'upstream': _listar(upstream),
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2)
+        })
+
+
+    @action(detail=False, methods=['get'], url_path='agrupamentos-biconexos')
+    def agrupamentos_biconexos(self, request):
+        """
+        Agrupamentos de registros AUD ligados por caminhos de dependência
+        redundantes (ex.: SQL -> Report -> FV junto com SQL -> FV), com nome e
+        prioridade de cada membro. Não são ciclos: as dependências sempre vão de
+        SQL para Report para FV. O cálculo fica em cache até a tabela mudar.
+        """
+        agrupamentos = listar_agrupamentos(obter_grafo())
+        return Response({'total': len(agrupamentos), 'agrupamentos': agrupamentos})
+
+
+    @action(detail=False, methods=['post'], url_path='propagar-prioridades')
+    def propagar(self, request):
+        """
+        Propaga prioridades pelo grafo: tudo o que é alcançável a partir de um
+        registro recebe pelo menos a prioridade dele. Sem 'tabela'/'id' propaga
+        a partir de todos os registros. Com 'dry_run' apenas retorna o diff.
+        """
+        dry_run = str(request.data.get('dry_run', False)).lower() in ('1', 'true')
+        tabela = request.data.get('tabela')
+        origens = None
+        if tabela:
+            tipo = tipo_da_tabela(tabela)
+            try:
+                registro_id = int(request.data.get('id'))
+            except (TypeError, ValueError):
+                registro_id = None
+            if not tipo or registro_id is None:
+                return Response(
+                    {"error": "Informe uma tabela válida (AUD_SQL, AUD_REPORT ou AUD_FV) e o id."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            origens = [(tipo, registro_id)]
+
+        alteracoes = propagar_prioridades(origens=origens, dry_run=dry_run)
+        return Response({
+            'dry_run': dry_run,
+            'total': len(alteracoes),
+            'alteracoes': alteracoes
+        })
+
+
+    @action(detail=False, methods=['get'], url_path='exportar')
+    def exportar(self, request):
+        """
+        Exporta o grafo completo em ?formato=json (nós/arestas compactos), csv
+        (lista de arestas) ou xlsx (matriz de adjacência). Com o cache
+        compartilhado a resposta leva um ETag derivado da assinatura do grafo e
+        da versão da exportação (trocada a cada escrita de nome, prioridade ou
+        dependência); se nada mudou, responde 304 sem gerar nada.
+        """
+        formato = request.query_params.get('formato', 'json').lower()
+        if formato not in FORMATOS_EXPORTACAO:
+            return Response(
+                {"error": "Formato inválido. Use: json, csv ou xlsx"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        grafo = obter_grafo()
+        versao = versao_exportacao()
+        etag = None
+        if versao is not None:
+            total, maior_id = grafo.assinatura
+            etag = f'"dependencias-{total}-{maior_id}-{versao}-{formato}"'
+            if etag in request.headers.get('If-None-Match', ''):
+                resposta = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                resposta['ETag'] = etag
+                return resposta
+
+        # Só as arestas vêm do índice em memória; nomes e prioridades mudam sem
+        # alterar o grafo e são resolvidos a cada exportação
+        conteudo = FORMATOS_EXPORTACAO[formato][0](grafo)
+
+        if formato == 'json':
+            resposta = Response(conteudo)
+        else:
+            resposta = HttpResponse(conteudo, content_type=FORMATOS_EXPORTACAO[formato][1])
+            resposta['Content-Disposition'] = f'attachment; filename="dependencias.{formato}"'
+        if etag:
+            resposta['ETag'] = etag
+        return resposta
+
+
 # Insights - Endpoints de contagem
 class InsightsFVView(APIView):
     def get(self, request):
@@ -394,36 +464,97 @@ class InsightsDependenciasView(APIView):
 class InsightsPrioridadesView(APIView):
     def get(self, request):
         try:
-            # Conta registros por nível de prioridade nas tabelas AUD
-            from collections import Counter
-            
-            # Busca prioridades de todas as tabelas AUD
-            prioridades_sql = CustomizacaoSQL.objects.exclude(prioridade__isnull=True).exclude(prioridade='').values_list('prioridade', flat=True)
-            prioridades_report = CustomizacaoReport.objects.exclude(prioridade__isnull=True).exclude(prioridade='').values_list('prioridade', flat=True)
-            prioridades_fv = CustomizacaoFV.objects.exclude(prioridade__isnull=True).exclude(prioridade='').values_list('prioridade', flat=True)
-            
-            # Conta todas as prioridades
-            todas_prioridades = list(prioridades_sql) + list(prioridades_report) + list(prioridades_fv)
-            contador = Counter(todas_prioridades)
-            
-            # Cria um dicionário com as contagens
-            result = dict(contador)
-            
-            # Conta registros sem prioridade
-            sem_prioridade_sql = CustomizacaoSQL.objects.filter(Q(prioridade__isnull=True) | Q(prioridade='')).count()
-            sem_prioridade_report = CustomizacaoReport.objects.filter(Q(prioridade__isnull=True) | Q(prioridade='')).count()
-            sem_prioridade_fv = CustomizacaoFV.objects.filter(Q(prioridade__isnull=True) | Q(prioridade='')).count()
-            sem_prioridade = sem_prioridade_sql + sem_prioridade_report + sem_prioridade_fv
+            # Conta registros por nível de prioridade nas tabelas AUD (uma query agrupada por tabela, em paralelo)
+            def contar_prioridades(modelo):
+                return list(modelo.objects.values_list('prioridade').annotate(total=Count('pk')).order_by())
+
+            contagens = executar_em_paralelo({
+                tipo: (lambda modelo=modelo: contar_prioridades(modelo))
+                for tipo, modelo in MODELO_POR_TIPO.items()
+            })
+
+            # Cria um dicionário com as contagens; nulos e vazios contam como sem prioridade
+            result = {}
+            sem_prioridade = 0
+            for linhas in contagens.values():
+                for prioridade, total in linhas:
+                    if prioridade:
+                        result[prioridade] = result.get(prioridade, 0) + total
+                    else:
+                        sem_prioridade += total
             
             if sem_prioridade > 0:
                 result['Sem Prioridade'] = sem_prioridade
             
             result['total'] = sum(result.values())
             return Response(result)
+        except TempoEsgotadoConsultas as e:
+            return Response({"error": str(e.detail)}, status=e.status_code)
         except Exception as e:
             return Response({"error": str(e), "Alta": 0, "Média": 0, "Baixa": 0, "total": 0}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class RegistrosFrequentesView(APIView):
+    """
+    Endpoint dos registros AUD mais alterados (sinal de risco), paginado por página.
+    Ordena por ?ordenar=versoes|editores|ultima_alteracao (prefixo '-' = decrescente,
+    padrão -versoes) e filtra por ?tabela. Lê as estatísticas somadas de AUD_VERSAO.
+    """
+    ORDENACOES = ('versoes', 'editores', 'ultima_alteracao')
+
+    def get(self, request):
+        ordenar = request.query_params.get('ordenar', '-versoes')
+        campo = ordenar.lstrip('-')
+        if campo not in self.ORDENACOES:
+            return Response(
+                {"error": "Ordenação inválida. Use: versoes, editores ou ultima_alteracao (com '-' para decrescente)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Desempates no sentido inverso na ordem crescente: o índice é lido de trás para frente
+        if ordenar.startswith('-'):
+            ordem = (f'-{campo}', 'tabela', 'registro_id')
+        else:
+            ordem = (campo, '-tabela', '-registro_id')
+
+        queryset = AudEstatisticaRegistro.objects.order_by(*ordem)
+        filtro_tabela = request.query_params.get('tabela')
+        if filtro_tabela:
+            if filtro_tabela not in TABELAS_HISTORICO:
+                return Response(
+                    {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(tabela=filtro_tabela)
+
+        paginator = StandardPagination()
+        pagina = paginator.paginate_queryset(queryset, request, view=self)
+
+        # Títulos da página: uma query na timeline por tabela presente
+        titulos = {}
+        ids_por_tabela = {}
+        for estatistica in pagina:
+            ids_por_tabela.setdefault(estatistica.tabela, []).append(estatistica.registro_id)
+        for tabela, ids in ids_por_tabela.items():
+            for registro_id, titulo in AudTimeline.objects.filter(
+                tabela=tabela, registro_id__in=ids
+            ).values_list('registro_id', 'titulo'):
+                titulos[(tabela, registro_id)] = titulo
+
+        return paginator.get_paginated_response([
+            {
+                'id': f"{tipo_da_tabela(estatistica.tabela)}-{estatistica.registro_id}",
+                'tabela': estatistica.tabela,
+                'registro_id': estatistica.registro_id,
+                'titulo': titulos.get((estatistica.tabela, estatistica.registro_id)),
+                'versoes': estatistica.versoes,
+                'editores': estatistica.editores,
+                'primeira_data': estatistica.primeira_data.isoformat(),
+                'ultima_alteracao': estatistica.ultima_alteracao.isoformat(),
+            }
+            for estatistica in pagina
+        ])
+
+
 class RegistrosModalView(APIView):
     """
     Endpoint para buscar registros formatados para o modal de dependências.
@@ -482,10 +613,10 @@ class RegistrosModalView(APIView):
 class HistoricoAlteracoesView(APIView):
     """
     Endpoint para buscar histórico de alterações de todas as tabelas AUD.
-    Retorna registros de AUD_SQL, AUD_REPORT e AUD_FV com prioridade relacionada (se houver).
+    Retorna registros de AUD_SQL, AUD_REPORT e AUD_FV com prioridade relacionada (se houver),
+    do mais recente para o mais antigo, paginados por cursor (?cursor=...&page_size=...).
     """
     def get(self, request):
-        from django.db import connection
         from datetime import datetime
         
         # Obtém filtros da query string
@@ -498,231 +629,247 @@ class HistoricoAlteracoesView(APIView):
         data_fim_dt = None
         if data_inicio:
             try:
-                data_inicio_dt = datetime.strptime(data_inicio, '%Y-%m-%d')
+                data_inicio_dt = timezone.make_aware(datetime.strptime(data_inicio, '%Y-%m-%d'))
             except ValueError:
                 pass
         if data_fim:
             try:
                 data_fim_dt = datetime.strptime(data_fim, '%Y-%m-%d')
                 # Adiciona 23:59:59 para incluir o dia inteiro
-                data_fim_dt = data_fim_dt.replace(hour=23, minute=59, second=59)
+                data_fim_dt = timezone.make_aware(data_fim_dt.replace(hour=23, minute=59, second=59))
             except ValueError:
                 pass
-        
-        # Busca prioridades e observações diretamente das tabelas AUD
-        # Mapeia prioridades por ID de cada tabela
-        prioridades_sql = {}
-        prioridades_report = {}
-        prioridades_fv = {}
-        
-        # Mapeia observações por ID de cada tabela
-        observacoes_sql = {}
-        observacoes_report = {}
-        observacoes_fv = {}
-        
-        # Busca registros SQL
-        for sql in CustomizacaoSQL.objects.all():
-            if sql.prioridade:
-                prioridades_sql[sql.codsentenca] = sql.prioridade
-            if sql.observacao:
-                observacoes_sql[sql.codsentenca] = sql.observacao
-        
-        # Busca registros REPORT
-        for report in CustomizacaoReport.objects.all():
-            if report.prioridade:
-                prioridades_report[report.id] = report.prioridade
-            if report.observacao:
-                observacoes_report[report.id] = report.observacao
-        
-        # Busca registros FV
-        for fv in CustomizacaoFV.objects.all():
-            if fv.prioridade:
-                prioridades_fv[fv.id] = fv.prioridade
-            if fv.observacao:
-                observacoes_fv[fv.id] = fv.observacao
-        
-        historico = []
-        
-        # AUD_SQL: CODSENTENCA, RECMODIFIEDBY (ou RECCREATEDBY), TITULO
-        if not filtro_tabela or filtro_tabela == 'AUD_SQL':
-            with connection.cursor() as cursor:
-                # Monta query com filtros de data se necessário
-                query = """
-                    SELECT CODSENTENCA, TITULO, RECCREATEDBY, RECCREATEDON, 
-                           RECMODIFIEDBY, RECMODIFIEDON
-                    FROM AUD_SQL
-                    WHERE 1=1
-                """
-                params = []
-                
-                if data_inicio_dt:
-                    query += " AND (RECCREATEDON >= %s OR RECMODIFIEDON >= %s)"
-                    params.extend([data_inicio_dt, data_inicio_dt])
-                
-                if data_fim_dt:
-                    query += " AND (RECCREATEDON <= %s OR RECMODIFIEDON <= %s OR RECCREATEDON IS NULL)"
-                    params.extend([data_fim_dt, data_fim_dt])
-                
-                query += " ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC"
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    codsentenca = row[0]
-                    titulo = row[1] if len(row) > 1 else None
-                    reccreatedby = row[2] if len(row) > 2 else None
-                    reccreatedon = row[3] if len(row) > 3 else None
-                    recmodifiedby = row[4] if len(row) > 4 else None
-                    recmodifiedon = row[5] if len(row) > 5 else None
-                    
-                    # Filtra por data se necessário (filtro adicional no Python para garantir)
-                    data_referencia = recmodifiedon if recmodifiedon else reccreatedon
-                    if data_referencia:
-                        if data_inicio_dt and data_referencia < data_inicio_dt:
-                            continue
-                        if data_fim_dt and data_referencia > data_fim_dt:
-                            continue
-                    
-                    # Usa RECMODIFIEDBY se existir, senão usa RECCREATEDBY
-                    usuario = recmodifiedby if recmodifiedby else (reccreatedby or 'N/A')
-                    
-                    historico.append({
-                        'tabela': 'AUD_SQL',
-                        'id': codsentenca,
-                        'codsentenca': codsentenca,
-                        'reccreatedby': usuario,
-                        'titulo': titulo or 'N/A',
-                        'prioridade': prioridades_sql.get(codsentenca),
-                        'observacao': observacoes_sql.get(codsentenca),
-                        'data_criacao': reccreatedon.isoformat() if reccreatedon and hasattr(reccreatedon, 'isoformat') else (str(reccreatedon) if reccreatedon else None),
-                        'data_modificacao': recmodifiedon.isoformat() if recmodifiedon and hasattr(recmodifiedon, 'isoformat') else (str(recmodifiedon) if recmodifiedon else None)
-                    })
-        
-        # AUD_REPORT: ID, RECMODIFIEDBY (ou RECCREATEDBY), DESCRICAO
-        if not filtro_tabela or filtro_tabela == 'AUD_REPORT':
-            with connection.cursor() as cursor:
-                query = """
-                    SELECT ID, DESCRICAO, RECCREATEDBY, RECCREATEDON, 
-                           RECMODIFIEDBY, RECMODIFIEDON
-                    FROM AUD_REPORT
-                    WHERE 1=1
-                """
-                params = []
-                
-                if data_inicio_dt:
-                    query += " AND (RECCREATEDON >= %s OR RECMODIFIEDON >= %s)"
-                    params.extend([data_inicio_dt, data_inicio_dt])
-                
-                if data_fim_dt:
-                    query += " AND (RECCREATEDON <= %s OR RECMODIFIEDON <= %s OR RECCREATEDON IS NULL)"
-                    params.extend([data_fim_dt, data_fim_dt])
-                
-                query += " ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC"
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    aud_id = row[0]
-                    descricao = row[1] if len(row) > 1 else None
-                    reccreatedby = row[2] if len(row) > 2 else None
-                    reccreatedon = row[3] if len(row) > 3 else None
-                    recmodifiedby = row[4] if len(row) > 4 else None
-                    recmodifiedon = row[5] if len(row) > 5 else None
-                    
-                    # Filtra por data se necessário
-                    data_referencia = recmodifiedon if recmodifiedon else reccreatedon
-                    if data_referencia:
-                        if data_inicio_dt and data_referencia < data_inicio_dt:
-                            continue
-                        if data_fim_dt and data_referencia > data_fim_dt:
-                            continue
-                    
-                    # Usa RECMODIFIEDBY se existir, senão usa RECCREATEDBY
-                    usuario = recmodifiedby if recmodifiedby else (reccreatedby or 'N/A')
-                    
-                    historico.append({
-                        'tabela': 'AUD_REPORT',
-                        'id': aud_id,
-                        'descricao': descricao or 'N/A',
-                        'reccreatedby': usuario,
-                        'prioridade': prioridades_report.get(aud_id),
-                        'observacao': observacoes_report.get(aud_id),
-                        'data_criacao': reccreatedon.isoformat() if reccreatedon and hasattr(reccreatedon, 'isoformat') else (str(reccreatedon) if reccreatedon else None),
-                        'data_modificacao': recmodifiedon.isoformat() if recmodifiedon and hasattr(recmodifiedon, 'isoformat') else (str(recmodifiedon) if recmodifiedon else None)
-                    })
-        
-        # AUD_FV: ID, RECMODIFIEDBY (ou RECCREATEDBY), NOME
-        if not filtro_tabela or filtro_tabela == 'AUD_FV':
-            with connection.cursor() as cursor:
-                query = """
-                    SELECT ID, NOME, RECCREATEDBY, RECCREATEDON, 
-                           RECMODIFIEDBY, RECMODIFIEDON
-                    FROM AUD_FV
-                    WHERE 1=1
-                """
-                params = []
-                
-                if data_inicio_dt:
-                    query += " AND (RECCREATEDON >= %s OR RECMODIFIEDON >= %s)"
-                    params.extend([data_inicio_dt, data_inicio_dt])
-                
-                if data_fim_dt:
-                    query += " AND (RECCREATEDON <= %s OR RECMODIFIEDON <= %s OR RECCREATEDON IS NULL)"
-                    params.extend([data_fim_dt, data_fim_dt])
-                
-                query += " ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC"
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    aud_id = row[0]
-                    nome = row[1] if len(row) > 1 else None
-                    reccreatedby = row[2] if len(row) > 2 else None
-                    reccreatedon = row[3] if len(row) > 3 else None
-                    recmodifiedby = row[4] if len(row) > 4 else None
-                    recmodifiedon = row[5] if len(row) > 5 else None
-                    
-                    # Filtra por data se necessário
-                    data_referencia = recmodifiedon if recmodifiedon else reccreatedon
-                    if data_referencia:
-                        if data_inicio_dt and data_referencia < data_inicio_dt:
-                            continue
-                        if data_fim_dt and data_referencia > data_fim_dt:
-                            continue
-                    
-                    # Usa RECMODIFIEDBY se existir, senão usa RECCREATEDBY
-                    usuario = recmodifiedby if recmodifiedby else (reccreatedby or 'N/A')
-                    
-                    historico.append({
-                        'tabela': 'AUD_FV',
-                        'id': aud_id,
-                        'nome': nome or 'N/A',
-                        'reccreatedby': usuario,
-                        'prioridade': prioridades_fv.get(aud_id),
-                        'observacao': observacoes_fv.get(aud_id),
-                        'data_criacao': reccreatedon.isoformat() if reccreatedon and hasattr(reccreatedon, 'isoformat') else (str(reccreatedon) if reccreatedon else None),
-                        'data_modificacao': recmodifiedon.isoformat() if recmodifiedon and hasattr(recmodifiedon, 'isoformat') else (str(recmodifiedon) if recmodifiedon else None)
-                    })
-        
-        # Ordena por data de criação (mais recente primeiro)
-        historico.sort(key=lambda x: x['data_criacao'] or '', reverse=True)
-        
-        # Paginação
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 20))
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        total = len(historico)
-        results = historico[start:end]
-        
+
+        if filtro_tabela:
+            if filtro_tabela not in TABELAS_HISTORICO:
+                return Response(
+                    {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            tabelas = [filtro_tabela]
+        else:
+            tabelas = list(TABELAS_HISTORICO)
+
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), HISTORICO_PAGE_SIZE_MAX)
+        except ValueError:
+            page_size = 20
+
+        try:
+            results, proximo, anterior, total = buscar_pagina(
+                tabelas, data_inicio_dt, data_fim_dt,
+                cursor=request.query_params.get('cursor'), tamanho=page_size
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def link(cursor):
+            if not cursor:
+                return None
+            params = request.query_params.copy()
+            params['cursor'] = cursor
+            params['page_size'] = page_size
+            params.pop('page', None)
+            return f'?{params.urlencode()}'
+
+        return Response({
+            'count': total,
+            'next': link(proximo),
+            'previous': link(anterior),
+            'results': results
+        })
+
+
+class EstadoEmView(APIView):
+    """
+    Endpoint para o estado das customizações em uma data (?data=AAAA-MM-DD ou data/hora ISO).
+    Retorna a versão (AUD_VERSAO) em vigor na data de cada registro de AUD_SQL, AUD_REPORT e
+    AUD_FV, com filtros (tabela, prioridade, sem_prioridade, usuario) e paginação por cursor.
+    """
+    def get(self, request):
+        data = interpretar_data(request.query_params.get('data'))
+        if data is None:
+            return Response(
+                {"error": "Informe a data no formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filtro_tabela = request.query_params.get('tabela')
+        if filtro_tabela:
+            if filtro_tabela not in TABELAS_HISTORICO:
+                return Response(
+                    {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            tabelas = [filtro_tabela]
+        else:
+            tabelas = list(TABELAS_HISTORICO)
+
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 50)), 1), HISTORICO_PAGE_SIZE_MAX)
+        except ValueError:
+            page_size = 50
+
+        try:
+            results, proximo, total = buscar_estado(
+                data, tabelas,
+                cursor=request.query_params.get('cursor'),
+                tamanho=page_size,
+                prioridade=request.query_params.get('prioridade'),
+                sem_prioridade=request.query_params.get('sem_prioridade') == 'true',
+                usuario=request.query_params.get('usuario'),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_link = None
+        if proximo:
+            params = request.query_params.copy()
+            params['cursor'] = proximo
+            params['page_size'] = page_size
+            next_link = f'?{params.urlencode()}'
+
         return Response({
+            'data': data.isoformat(),
             'count': total,
-            'next': f'?page={page + 1}&page_size={page_size}' if end < total else None,
-            'previous': f'?page={page - 1}&page_size={page_size}' if page > 1 else None,
+            'next': next_link,
+            'results': results
+        })
+
+
+class MudancasView(APIView):
+    """
+    Endpoint para as mudanças entre duas datas (?data_inicio=...&data_fim=..., AAAA-MM-DD ou ISO).
+    Retorna, por tabela, quantos registros foram criados, modificados ou ficaram inalterados, e a
+    lista paginada (cursor) dos criados e modificados (?tipo=criado|modificado), com as versões
+    em vigor em cada data.
+    """
+    def get(self, request):
+        data_inicio = interpretar_data(request.query_params.get('data_inicio'))
+        data_fim = interpretar_data(request.query_params.get('data_fim'))
+        if data_inicio is None or data_fim is None:
+            return Response(
+                {"error": "Informe data_inicio e data_fim no formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if data_inicio >= data_fim:
+            return Response(
+                {"error": "data_inicio deve ser anterior a data_fim"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filtro_tabela = request.query_params.get('tabela')
+        if filtro_tabela:
+            if filtro_tabela not in TABELAS_HISTORICO:
+                return Response(
+                    {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            tabelas = [filtro_tabela]
+        else:
+            tabelas = list(TABELAS_HISTORICO)
+
+        tipo = request.query_params.get('tipo')
+        if tipo and tipo not in ('criado', 'modificado'):
+            return Response(
+                {"error": "Tipo inválido. Use: criado ou modificado"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 50)), 1), HISTORICO_PAGE_SIZE_MAX)
+        except ValueError:
+            page_size = 50
+
+        try:
+            results, proximo = buscar_mudancas(
+                data_inicio, data_fim, tabelas, tipo=tipo,
+                cursor=request.query_params.get('cursor'), tamanho=page_size
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        resumo = resumir_mudancas(data_inicio, data_fim, tabelas)
+
+        situacoes = {'criado': ['criados'], 'modificado': ['modificados']}.get(tipo, ['criados', 'modificados'])
+        next_link = None
+        if proximo:
+            params = request.query_params.copy()
+            params['cursor'] = proximo
+            params['page_size'] = page_size
+            next_link = f'?{params.urlencode()}'
+
+        return Response({
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'resumo': resumo,
+            'count': sum(por_tabela[situacao] for por_tabela in resumo.values() for situacao in situacoes),
+            'next': next_link,
+            'results': results
+        })
+
+
+class AtividadeView(APIView):
+    """
+    Endpoint para os gráficos de atividade: criações e modificações nas tabelas AUD
+    somadas por período (?escala=dia|semana|mes) e pelos agrupamentos pedidos
+    (?agrupar=usuario,tabela,coligada), entre data_inicio e data_fim (padrão: últimos 30 dias).
+    Lê a atividade diária pré-agregada (task atualizar_atividade).
+    """
+    def get(self, request):
+        from datetime import timedelta
+        from django.utils.dateparse import parse_date
+
+        try:
+            dia_fim = parse_date(request.query_params.get('data_fim', '')) or timezone.localdate()
+            dia_inicio = parse_date(request.query_params.get('data_inicio', '')) or dia_fim - timedelta(days=29)
+        except ValueError:
+            return Response(
+                {"error": "Datas inválidas. Use o formato AAAA-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if dia_inicio > dia_fim:
+            return Response(
+                {"error": "data_inicio deve ser anterior a data_fim"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        escala = request.query_params.get('escala', 'dia')
+        if escala not in ESCALAS:
+            return Response(
+                {"error": "Escala inválida. Use: dia, semana ou mes"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        agrupar = [nome.strip() for nome in request.query_params.get('agrupar', '').split(',') if nome.strip()]
+        invalidos = [nome for nome in agrupar if nome not in AGRUPAMENTOS]
+        if invalidos:
+            return Response(
+                {"error": f"Agrupamento inválido: {', '.join(invalidos)}. Use: usuario, tabela, coligada"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        agrupar = list(dict.fromkeys(agrupar))
+
+        filtro_tabela = request.query_params.get('tabela')
+        if filtro_tabela and filtro_tabela not in TABELAS_HISTORICO:
+            return Response(
+                {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        coligada = request.query_params.get('coligada')
+        try:
+            coligada = int(coligada) if coligada else None
+        except ValueError:
+            return Response({"error": "Coligada inválida"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = consultar_atividade(
+            dia_inicio, dia_fim, escala=escala, agrupar=agrupar, tabela=filtro_tabela,
+            usuario=request.query_params.get('usuario'), coligada=coligada,
+        )
+        return Response({
+            'data_inicio': dia_inicio.isoformat(),
+            'data_fim': dia_fim.isoformat(),
+            'escala': escala,
+            'agrupar': agrupar,
             'results': results
         })
 
@@ -800,369 +947,167 @@ class AdicionarObservacaoRegistroView(APIView):
 
 class CompararRegistrosView(APIView):
     """
-    Endpoint para buscar um registro e seu anterior para comparação.
-    Retorna o registro atual e o anterior (se existir) para identificar alterações.
+    Endpoint para buscar um registro e sua versão anterior para comparação.
+    As versões vêm de AUD_VERSAO: o atual é a versão com a data_modificacao
+    informada (ou a última) e o anterior é a versão imediatamente anterior,
+    ambos buscados direto no índice (tabela, id, versão). 'diff' traz a diferença
+    por linha e por palavra do conteúdo (SENTENCA/DESCRICAO); com ?conteudo=false
+    o texto completo não é repetido nos dois registros. Para AUD_SQL, ?modo=semantico
+    compara os tokens do SQL normalizado (ignora espaços, comentários e caixa das
+    palavras-chave) e os dois modos indicam se houve mudança semântica.
     """
     def get(self, request):
         tabela = request.query_params.get('tabela', '').upper()
         registro_id = request.query_params.get('id')
         data_modificacao = request.query_params.get('data_modificacao')  # Data de modificação do registro selecionado
-        
+
         if not tabela or not registro_id:
             return Response(
                 {"error": "Campos obrigatórios: tabela, id"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        from django.db import connection
-        from datetime import datetime, timedelta
-        
-        registro_atual = None
-        registro_anterior = None
-        
+
+        tipo = TIPO_POR_TABELA.get(tabela)
+        if tipo is None:
+            return Response(
+                {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        modo = request.query_params.get('modo', 'texto')
+        if modo not in MODOS_DIFF or (modo == 'semantico' and tipo != 'sql'):
+            return Response(
+                {"error": "Modo inválido. Use: texto ou semantico (semantico só para AUD_SQL)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            if tabela == 'AUD_SQL':
-                # AUD_SQL não tem campo 'id' separado, o identificador é o próprio CODSENTENCA
-                # O parâmetro 'registro_id' recebido contém o CODSENTENCA
-                # Usa raw SQL para buscar o registro atual (específico ou mais recente) e anterior
-                try:
-                    with connection.cursor() as cursor:
-                        # Busca TODOS os registros com o mesmo CODSENTENCA, ordenados por data DESC
-                        # Inclui RECMODIFIEDON para poder filtrar pela data de modificação
-                        cursor.execute("""
-                            SELECT CODSENTENCA, TITULO, SENTENCA, APLICACAO, TAMANHO, 
-                                   RECCREATEDBY, RECCREATEDON, RECMODIFIEDBY, RECMODIFIEDON,
-                                   PRIORIDADE, OBSERVACAO
-                            FROM AUD_SQL 
-                            WHERE CODSENTENCA = %s 
-                            ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC
-                        """, [registro_id])
-                        
-                        rows = cursor.fetchall()
-                        
-                        if not rows or len(rows) == 0:
-                            return Response(
-                                {"error": "Registro não encontrado"},
-                                status=status.HTTP_404_NOT_FOUND
-                            )
-                        
-                        # Se data_modificacao foi fornecida, busca o registro específico
-                        indice_atual = 0
-                        if data_modificacao:
-                            try:
-                                # Converte a data de modificação para comparar
-                                # Remove timezone e microsegundos se houver
-                                import re
-                                # Formato esperado: 2025-10-09T13:39:33.000 ou 2025-10-09 13:39:33
-                                data_mod_str = data_modificacao.replace('T', ' ')
-                                # Remove microsegundos e timezone
-                                data_mod_str = re.sub(r'\.\d+', '', data_mod_str)  # Remove .000
-                                data_mod_str = re.sub(r'[+-]\d{2}:\d{2}$', '', data_mod_str)  # Remove +00:00
-                                data_mod_str = data_mod_str.strip()
-                                if len(data_mod_str) > 19:
-                                    data_mod_str = data_mod_str[:19]
-                                data_mod = datetime.strptime(data_mod_str, '%Y-%m-%d %H:%M:%S')
-                                
-                                # Encontra o índice do registro com a data de modificação correspondente
-                                for idx, row in enumerate(rows):
-                                    recmodifiedon = row[8] if len(row) > 8 else None
-                                    reccreatedon = row[6] if len(row) > 6 else None
-                                    
-                                    # Compara a data de modificação (ou criação se não houver modificação)
-                                    data_registro = recmodifiedon if recmodifiedon else reccreatedon
-                                    if data_registro:
-                                        # Compara apenas data e hora (sem microsegundos)
-                                        if hasattr(data_registro, 'replace'):
-                                            data_registro_clean = data_registro.replace(microsecond=0)
-                                        else:
-                                            data_registro_clean = data_registro
-                                        
-                                        # Compara apenas até o segundo (sem microsegundos)
-                                        if isinstance(data_registro_clean, datetime):
-                                            data_registro_compare = data_registro_clean.replace(microsecond=0)
-                                        else:
-                                            data_registro_compare = data_registro_clean
-                                        
-                                        if data_registro_compare == data_mod:
-                                            indice_atual = idx
-                                            break
-                            except (ValueError, AttributeError) as e:
-                                # Se houver erro ao parsear a data, usa o primeiro registro (mais recente)
-                                pass
-                        
-                        # Registro atual = registro no índice encontrado
-                        row_atual = rows[indice_atual]
-                        reccreatedby_atual = row_atual[7] if len(row_atual) > 7 and row_atual[7] else (row_atual[5] if len(row_atual) > 5 else None)
-                        recmodifiedon_atual = row_atual[8] if len(row_atual) > 8 else None
-                        registro_atual = {
-                            'id': row_atual[0],
-                            'codsentenca': row_atual[0],
-                            'titulo': row_atual[1] if len(row_atual) > 1 else None,
-                            'sentenca': row_atual[2] if len(row_atual) > 2 else None,
-                            'aplicacao': row_atual[3] if len(row_atual) > 3 else None,
-                            'tamanho': row_atual[4] if len(row_atual) > 4 else None,
-                            'reccreatedby': reccreatedby_atual,
-                            'reccreatedon': row_atual[6].isoformat() if len(row_atual) > 6 and row_atual[6] and hasattr(row_atual[6], 'isoformat') else (str(row_atual[6]) if len(row_atual) > 6 and row_atual[6] else None),
-                            'recmmodifiedon': recmodifiedon_atual.isoformat() if recmodifiedon_atual and hasattr(recmodifiedon_atual, 'isoformat') else (str(recmodifiedon_atual) if recmodifiedon_atual else None),
-                            'prioridade': row_atual[9] if len(row_atual) > 9 else None,
-                            'observacao': row_atual[10] if len(row_atual) > 10 else None
-                        }
-                        
-                        # Registro anterior = registro imediatamente anterior ao atual (se existir)
-                        if indice_atual + 1 < len(rows):
-                            row_anterior = rows[indice_atual + 1]
-                            reccreatedby_anterior = row_anterior[7] if len(row_anterior) > 7 and row_anterior[7] else (row_anterior[5] if len(row_anterior) > 5 else None)
-                            recmodifiedon_anterior = row_anterior[8] if len(row_anterior) > 8 else None
-                            registro_anterior = {
-                                'id': row_anterior[0],
-                                'codsentenca': row_anterior[0],
-                                'titulo': row_anterior[1] if len(row_anterior) > 1 else None,
-                                'sentenca': row_anterior[2] if len(row_anterior) > 2 else None,
-                                'aplicacao': row_anterior[3] if len(row_anterior) > 3 else None,
-                                'tamanho': row_anterior[4] if len(row_anterior) > 4 else None,
-                                'reccreatedby': reccreatedby_anterior,
-                                'reccreatedon': row_anterior[6].isoformat() if len(row_anterior) > 6 and row_anterior[6] and hasattr(row_anterior[6], 'isoformat') else (str(row_anterior[6]) if len(row_anterior) > 6 and row_anterior[6] else None),
-                                'recmmodifiedon': recmodifiedon_anterior.isoformat() if recmodifiedon_anterior and hasattr(recmodifiedon_anterior, 'isoformat') else (str(recmodifiedon_anterior) if recmodifiedon_anterior else None),
-                                'prioridade': row_anterior[9] if len(row_anterior) > 9 else None,
-                                'observacao': row_anterior[10] if len(row_anterior) > 10 else None
-                            }
-                        else:
-                            registro_anterior = None
-                except Exception as e:
-                    return Response(
-                        {"error": f"Erro ao buscar registros: {str(e)}"},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-                    
-            elif tabela == 'AUD_REPORT':
-                # AUD_REPORT usa RECMODIFIEDON para data de modificação
-                try:
-                    with connection.cursor() as cursor:
-                        # Busca TODOS os registros com o mesmo ID, ordenados por data DESC
-                        cursor.execute("""
-                            SELECT ID, CODIGO, DESCRICAO, CODAPLICACAO, 
-                                   RECCREATEDBY, RECCREATEDON, RECMODIFIEDBY, RECMODIFIEDON,
-                                   PRIORIDADE, OBSERVACAO
-                            FROM AUD_REPORT 
-                            WHERE ID = %s 
-                            ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC
-                        """, [registro_id])
-                        
-                        rows = cursor.fetchall()
-                        
-                        if not rows or len(rows) == 0:
-                            return Response(
-                                {"error": "Registro não encontrado"},
-                                status=status.HTTP_404_NOT_FOUND
-                            )
-                        
-                        # Se data_modificacao foi fornecida, busca o registro específico
-                        indice_atual = 0
-                        if data_modificacao:
-                            try:
-                                # Converte a data de modificação para comparar
-                                # Remove timezone e microsegundos se houver
-                                import re
-                                # Formato esperado: 2025-10-09T13:39:33.000 ou 2025-10-09 13:39:33
-                                data_mod_str = data_modificacao.replace('T', ' ')
-                                # Remove microsegundos e timezone
-                                data_mod_str = re.sub(r'\.\d+', '', data_mod_str)  # Remove .000
-                                data_mod_str = re.sub(r'[+-]\d{2}:\d{2}$', '', data_mod_str)  # Remove +00:00
-                                data_mod_str = data_mod_str.strip()
-                                if len(data_mod_str) > 19:
-                                    data_mod_str = data_mod_str[:19]
-                                data_mod = datetime.strptime(data_mod_str, '%Y-%m-%d %H:%M:%S')
-                                
-                                # Encontra o índice do registro com a data de modificação correspondente
-                                for idx, row in enumerate(rows):
-                                    recmodifiedon = row[7] if len(row) > 7 else None
-                                    reccreatedon = row[5] if len(row) > 5 else None
-                                    
-                                    # Compara a data de modificação (ou criação se não houver modificação)
-                                    data_registro = recmodifiedon if recmodifiedon else reccreatedon
-                                    if data_registro:
-                                        # Compara apenas data e hora (sem microsegundos)
-                                        if hasattr(data_registro, 'replace'):
-                                            data_registro_clean = data_registro.replace(microsecond=0)
-                                        else:
-                                            data_registro_clean = data_registro
-                                        
-                                        # Compara apenas até o segundo (sem microsegundos)
-                                        if isinstance(data_registro_clean, datetime):
-                                            data_registro_compare = data_registro_clean.replace(microsecond=0)
-                                        else:
-                                            data_registro_compare = data_registro_clean
-                                        
-                                        if data_registro_compare == data_mod:
-                                            indice_atual = idx
-                                            break
-                            except (ValueError, AttributeError) as e:
-                                pass
-                        
-                        # Registro atual = registro no índice encontrado
-                        row_atual = rows[indice_atual]
-                        recmodifiedby_atual = row_atual[6] if len(row_atual) > 6 and row_atual[6] else (row_atual[4] if len(row_atual) > 4 else None)
-                        recmodifiedon_atual = row_atual[7] if len(row_atual) > 7 else None
-                        registro_atual = {
-                            'id': row_atual[0],
-                            'codigo': row_atual[1] if len(row_atual) > 1 else None,
-                            'descricao': row_atual[2] if len(row_atual) > 2 else None,
-                            'codaplicacao': row_atual[3] if len(row_atual) > 3 else None,
-                            'reccreatedby': recmodifiedby_atual,
-                            'reccreatedon': row_atual[5].isoformat() if len(row_atual) > 5 and row_atual[5] and hasattr(row_atual[5], 'isoformat') else (str(row_atual[5]) if len(row_atual) > 5 and row_atual[5] else None),
-                            'recmmodifiedon': recmodifiedon_atual.isoformat() if recmodifiedon_atual and hasattr(recmodifiedon_atual, 'isoformat') else (str(recmodifiedon_atual) if recmodifiedon_atual else None),
-                            'prioridade': row_atual[8] if len(row_atual) > 8 else None,
-                            'observacao': row_atual[9] if len(row_atual) > 9 else None
-                        }
-                        
-                        # Registro anterior = registro imediatamente anterior ao atual (se existir)
-                        if indice_atual + 1 < len(rows):
-                            row_anterior = rows[indice_atual + 1]
-                            recmodifiedby_anterior = row_anterior[6] if len(row_anterior) > 6 and row_anterior[6] else (row_anterior[4] if len(row_anterior) > 4 else None)
-                            recmodifiedon_anterior = row_anterior[7] if len(row_anterior) > 7 else None
-                            reccreatedon_anterior = row_anterior[5] if len(row_anterior) > 5 else None
-                            registro_anterior = {
-                                'id': row_anterior[0],
-                                'codigo': row_anterior[1] if len(row_anterior) > 1 else None,
-                                'descricao': row_anterior[2] if len(row_anterior) > 2 else None,
-                                'codaplicacao': row_anterior[3] if len(row_anterior) > 3 else None,
-                                'reccreatedby': recmodifiedby_anterior,
-                                'reccreatedon': reccreatedon_anterior.isoformat() if reccreatedon_anterior and hasattr(reccreatedon_anterior, 'isoformat') else (str(reccreatedon_anterior) if reccreatedon_anterior else None),
-                                'recmmodifiedon': recmodifiedon_anterior.isoformat() if recmodifiedon_anterior and hasattr(recmodifiedon_anterior, 'isoformat') else (str(recmodifiedon_anterior) if recmodifiedon_anterior else None),
-                                'prioridade': row_anterior[8] if len(row_anterior) > 8 else None,
-                                'observacao': row_anterior[9] if len(row_anterior) > 9 else None
-                            }
-                        else:
-                            registro_anterior = None
-                except Exception as e:
-                    return Response(
-                        {"error": f"Erro ao buscar registros: {str(e)}"},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-                    
-            elif tabela == 'AUD_FV':
+            registro_id = int(registro_id)
+        except ValueError:
+            return Response(
+                {"error": "Registro não encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            # Data inválida: compara a última versão; só a data: a versão mais recente daquele dia
+            comparacao = comparar_versoes(
+                tipo, registro_id, interpretar_data(data_modificacao),
+                dia_inteiro=data_pura(data_modificacao) is not None,
+            )
+        except Exception as e:
+            return Response(
+                {"error": f"Erro ao buscar registros: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if comparacao is None:
+            return Response(
+                {"error": "Registro não encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        registro_atual, registro_anterior = comparacao
+        campo = CAMPO_CONTEUDO[tipo]
+        diff = None
+        if registro_anterior:
+            diff = obter_diff(registro_anterior[campo], registro_atual[campo], modo=modo)
+            if tipo == 'sql' and modo == 'texto':
+                diff = {
+                    **diff,
+                    'sem_mudanca_semantica': sem_mudanca_semantica(registro_anterior[campo], registro_atual[campo]),
+                }
+        if request.query_params.get('conteudo') == 'false':
+            for registro in (registro_atual, registro_anterior):
+                if registro:
+                    registro.pop(campo)
+
+        return Response({
+            'tabela': tabela,
+            'registro_atual': registro_atual,
+            'registro_anterior': registro_anterior,
+            'diff': diff
+        })
+
+
+class VersoesRegistroView(APIView):
+    """
+    Endpoint para o histórico de versões de um registro (?tabela=AUD_SQL&id=...).
+    Sem versão alvo, lista as versões da mais nova para a mais antiga, paginadas
+    por cursor. Com ?versao=N ou ?data=... (versão em vigor na data), retorna a
+    versão e até ?vizinhos=k versões de cada lado, com o conteúdo.
+    """
+    def get(self, request):
+        tabela = request.query_params.get('tabela', '').upper()
+        tipo = TIPO_POR_TABELA.get(tabela)
+        if tipo is None:
+            return Response(
+                {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            registro_id = int(request.query_params.get('id', ''))
+        except ValueError:
+            return Response({"error": "Informe o id do registro"}, status=status.HTTP_400_BAD_REQUEST)
+
+        versao = request.query_params.get('versao')
+        data = request.query_params.get('data')
+        if versao or data:
+            if versao:
                 try:
-                    with connection.cursor() as cursor:
-                        # Busca TODOS os registros com o mesmo ID, ordenados por data DESC
-                        cursor.execute("""
-                            SELECT ID, NOME, DESCRICAO, IDCATEGORIA, ATIVO, 
-                                   RECCREATEDBY, RECCREATEDON, RECMODIFIEDBY, RECMODIFIEDON,
-                                   PRIORIDADE, OBSERVACAO
-                            FROM AUD_FV 
-                            WHERE ID = %s 
-                            ORDER BY COALESCE(RECMODIFIEDON, RECCREATEDON) DESC, RECCREATEDON DESC
-                        """, [registro_id])
-                        
-                        rows = cursor.fetchall()
-                        
-                        if not rows or len(rows) == 0:
-                            return Response(
-                                {"error": "Registro não encontrado"},
-                                status=status.HTTP_404_NOT_FOUND
-                            )
-                        
-                        # Se data_modificacao foi fornecida, busca o registro específico
-                        indice_atual = 0
-                        if data_modificacao:
-                            try:
-                                # Converte a data de modificação para comparar
-                                # Remove timezone e microsegundos se houver
-                                import re
-                                # Formato esperado: 2025-10-09T13:39:33.000 ou 2025-10-09 13:39:33
-                                data_mod_str = data_modificacao.replace('T', ' ')
-                                # Remove microsegundos e timezone
-                                data_mod_str = re.sub(r'\.\d+', '', data_mod_str)  # Remove .000
-                                data_mod_str = re.sub(r'[+-]\d{2}:\d{2}$', '', data_mod_str)  # Remove +00:00
-                                data_mod_str = data_mod_str.strip()
-                                if len(data_mod_str) > 19:
-                                    data_mod_str = data_mod_str[:19]
-                                data_mod = datetime.strptime(data_mod_str, '%Y-%m-%d %H:%M:%S')
-                                
-                                # Encontra o índice do registro com a data de modificação correspondente
-                                for idx, row in enumerate(rows):
-                                    recmodifiedon = row[8] if len(row) > 8 else None
-                                    reccreatedon = row[6] if len(row) > 6 else None
-                                    
-                                    # Compara a data de modificação (ou criação se não houver modificação)
-                                    data_registro = recmodifiedon if recmodifiedon else reccreatedon
-                                    if data_registro:
-                                        # Compara apenas data e hora (sem microsegundos)
-                                        if hasattr(data_registro, 'replace'):
-                                            data_registro_clean = data_registro.replace(microsecond=0)
-                                        else:
-                                            data_registro_clean = data_registro
-                                        
-                                        # Compara apenas até o segundo (sem microsegundos)
-                                        if isinstance(data_registro_clean, datetime):
-                                            data_registro_compare = data_registro_clean.replace(microsecond=0)
-                                        else:
-                                            data_registro_compare = data_registro_clean
-                                        
-                                        if data_registro_compare == data_mod:
-                                            indice_atual = idx
-                                            break
-                            except (ValueError, AttributeError) as e:
-                                pass
-                        
-                        # Registro atual = registro no índice encontrado
-                        row_atual = rows[indice_atual]
-                        recmodifiedby_atual = row_atual[7] if len(row_atual) > 7 and row_atual[7] else (row_atual[5] if len(row_atual) > 5 else None)
-                        recmodifiedon_atual = row_atual[8] if len(row_atual) > 8 else None
-                        registro_atual = {
-                            'id': row_atual[0],
-                            'nome': row_atual[1] if len(row_atual) > 1 else None,
-                            'descricao': row_atual[2] if len(row_atual) > 2 else None,
-                            'idcategoria': row_atual[3] if len(row_atual) > 3 else None,
-                            'ativo': row_atual[4] if len(row_atual) > 4 else None,
-                            'reccreatedby': recmodifiedby_atual,
-                            'reccreatedon': row_atual[6].isoformat() if len(row_atual) > 6 and row_atual[6] and hasattr(row_atual[6], 'isoformat') else (str(row_atual[6]) if len(row_atual) > 6 and row_atual[6] else None),
-                            'recmmodifiedon': recmodifiedon_atual.isoformat() if recmodifiedon_atual and hasattr(recmodifiedon_atual, 'isoformat') else (str(recmodifiedon_atual) if recmodifiedon_atual else None),
-                            'prioridade': row_atual[9] if len(row_atual) > 9 else None,
-                            'observacao': row_atual[10] if len(row_atual) > 10 else None
-                        }
-                        
-                        # Registro anterior = registro imediatamente anterior ao atual (se existir)
-                        if indice_atual + 1 < len(rows):
-                            row_anterior = rows[indice_atual + 1]
-                            recmodifiedby_anterior = row_anterior[7] if len(row_anterior) > 7 and row_anterior[7] else (row_anterior[5] if len(row_anterior) > 5 else None)
-                            recmodifiedon_anterior = row_anterior[8] if len(row_anterior) > 8 else None
-                            reccreatedon_anterior = row_anterior[6] if len(row_anterior) > 6 else None
-                            registro_anterior = {
-                                'id': row_anterior[0],
-                                'nome': row_anterior[1] if len(row_anterior) > 1 else None,
-                                'descricao': row_anterior[2] if len(row_anterior) > 2 else None,
-                                'idcategoria': row_anterior[3] if len(row_anterior) > 3 else None,
-                                'ativo': row_anterior[4] if len(row_anterior) > 4 else None,
-                                'reccreatedby': recmodifiedby_anterior,
-                                'reccreatedon': reccreatedon_anterior.isoformat() if reccreatedon_anterior and hasattr(reccreatedon_anterior, 'isoformat') else (str(reccreatedon_anterior) if reccreatedon_anterior else None),
-                                'recmmodifiedon': recmodifiedon_anterior.isoformat() if recmodifiedon_anterior and hasattr(recmodifiedon_anterior, 'isoformat') else (str(recmodifiedon_anterior) if recmodifiedon_anterior else None),
-                                'prioridade': row_anterior[9] if len(row_anterior) > 9 else None,
-                                'observacao': row_anterior[10] if len(row_anterior) > 10 else None
-                            }
-                        else:
-                            registro_anterior = None
-                except Exception as e:
+                    versao = int(versao)
+                except ValueError:
+                    return Response({"error": "versao deve ser um número"}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                data = interpretar_data(data)
+                if data is None:
                     return Response(
-                        {"error": f"Erro ao buscar registros: {str(e)}"},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                        {"error": "Informe a data no formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS"},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
-            else:
-                return Response(
-                    {"error": "Tabela inválida. Use: AUD_SQL, AUD_REPORT ou AUD_FV"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
+                versao = versao_em(tipo, registro_id, data)
+            try:
+                vizinhos = min(max(int(request.query_params.get('vizinhos', 2)), 0), VERSOES_VIZINHAS_MAX)
+            except ValueError:
+                vizinhos = 2
+
+            results = versoes_vizinhas(tipo, registro_id, versao, vizinhos) if versao else []
+            if not any(item['alvo'] for item in results):
+                return Response({"error": "Versão não encontrada"}, status=status.HTTP_404_NOT_FOUND)
             return Response({
                 'tabela': tabela,
-                'registro_atual': registro_atual,
-                'registro_anterior': registro_anterior
+                'registro_id': registro_id,
+                'versao': versao,
+                'results': results
             })
-            
-        except Exception as e:
-            return Response(
-                {"error": f"Erro ao buscar registros: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 50)), 1), HISTORICO_PAGE_SIZE_MAX)
+        except ValueError:
+            page_size = 50
+        try:
+            results, proximo, total = pagina_versoes(
+                tipo, registro_id, cursor=request.query_params.get('cursor'), tamanho=page_size
             )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not total:
+            return Response({"error": "Registro não encontrado"}, status=status.HTTP_404_NOT_FOUND)
+
+        next_link = None
+        if proximo:
+            params = request.query_params.copy()
+            params['cursor'] = proximo
+            params['page_size'] = page_size
+            next_link = f'?{params.urlencode()}'
+
+        return Response({
+            'tabela': tabela,
+            'registro_id': registro_id,
+            'count': total,
+            'next': next_link,
+            'results': results
+        })
 
 
 class NotificacoesView(APIView):
@@ -1196,20 +1141,12 @@ class NotificacoesView(APIView):
         limit = self._sanitize_limit(request.query_params.get('limit'))
         somente_nao_lidas = request.query_params.get('somente_nao_lidas', 'false').lower() == 'true'
 
-        notificacoes = []
-        notificacoes.extend(self._build_from_queryset(CustomizacaoSQL, 'sql', somente_nao_lidas))
-        notificacoes.extend(self._build_from_queryset(CustomizacaoReport, 'report', somente_nao_lidas))
-        notificacoes.extend(self._build_from_queryset(CustomizacaoFV, 'fv', somente_nao_lidas))
+        # Uma varredura da linha do tempo (AUD_TIMELINE) pelo índice de data
+        queryset = AudTimeline.objects.order_by('-data_ref', 'tabela', 'registro_id')
+        if somente_nao_lidas:
+            queryset = queryset.filter(lida=0)
 
-        notificacoes.sort(key=lambda n: n['ordenacao'], reverse=True)
-
-        # Remove campo interno de ordenação e aplica o limite global
-        resposta = []
-        for notif in notificacoes[:limit]:
-            notif.pop('ordenacao', None)
-            resposta.append(notif)
-
-        return Response(resposta)
+        return Response([self._serialize_linha(linha) for linha in queryset[:limit]])
 
     def _sanitize_limit(self, raw_limit):
         try:
@@ -1218,66 +1155,24 @@ class NotificacoesView(APIView):
             return self.DEFAULT_LIMIT
         return max(1, min(parsed, self.MAX_LIMIT))
 
-    def _build_from_queryset(self, model, tipo, somente_nao_lidas):
-        config = self.TIPO_MAP[tipo]
-        queryset = model.objects.annotate(
-            data_ref=Coalesce('recmodifiedon', 'reccreatedon')
-        ).order_by('-data_ref')[:self.MAX_LIMIT]
-
-        notif_list = []
-        for registro in queryset:
-            lida = bool(getattr(registro, 'lida', 0))
-            if somente_nao_lidas and lida:
-                continue
-            notif = self._serialize_registro(registro, tipo, config)
-            notif_list.append(notif)
-        return notif_list
-
-    def _serialize_registro(self, registro, tipo, config):
-        registro_id = getattr(registro, config['id_field'])
-        tabela = config['tabela']
-        titulo, descricao = self._resolver_titulo_descricao(registro, tipo, registro_id)
-        prioridade = self._normalizar_prioridade(getattr(registro, 'prioridade', None))
-        data_base = getattr(registro, 'data_ref', None) or getattr(registro, 'recmodifiedon', None) or getattr(registro, 'reccreatedon', None) or timezone.now()
-        if timezone.is_naive(data_base):
-            data_base = timezone.make_aware(data_base, timezone.get_default_timezone())
-
-        responsavel = getattr(registro, 'recmodifiedby', None) or getattr(registro, 'reccreatedby', None) or 'Sistema'
+    def _serialize_linha(self, linha):
+        tipo = tipo_da_tabela(linha.tabela)
+        # Registros sem data aparecem com o horário atual, como antes
+        data_base = linha.data_ref if linha.data_ref != DATA_SEM_REFERENCIA else timezone.now()
 
         return {
-            'id': f"{tipo}-{registro_id}",
-            'registro_id': registro_id,
-            'tabela': tabela,
-            'titulo': titulo,
-            'descricao': descricao,
-            'prioridade': prioridade,
-            'lida': bool(getattr(registro, 'lida', 0)),
+            'id': f"{tipo}-{linha.registro_id}",
+            'registro_id': linha.registro_id,
+            'tabela': linha.tabela,
+            'titulo': linha.titulo,
+            'descricao': linha.resumo,
+            'prioridade': self._normalizar_prioridade(linha.prioridade),
+            'lida': bool(linha.lida),
             'data_hora': data_base.isoformat(),
-            'responsavel': responsavel,
-            'origem': config['label'],
-            'ordenacao': data_base.timestamp()
+            'responsavel': linha.usuario or 'Sistema',
+            'origem': self.TIPO_MAP[tipo]['label'],
         }
 
-    def _resolver_titulo_descricao(self, registro, tipo, registro_id):
-        if tipo == 'sql':
-            titulo = registro.titulo or f"SQL {registro_id}"
-            descricao = registro.observacao or registro.sentenca or 'Sem descrição disponível.'
-        elif tipo == 'report':
-            titulo = registro.codigo or f"Report {registro_id}"
-            descricao = registro.descricao or registro.observacao or 'Sem descrição disponível.'
-        else:  # fv
-            titulo = registro.nome or f"FV {registro_id}"
-            descricao = registro.descricao or registro.observacao or 'Sem descrição disponível.'
-        return titulo, self._truncate(descricao)
-
-    def _truncate(self, texto, limite=280):
-        if not texto:
-            return 'Sem descrição disponível.'
-        texto = str(texto).strip()
-        if len(texto) <= limite:
-            return texto
-        return f"{texto[:limite-3]}..."
-
     def _normalizar_prioridade(self, valor):
         if not valor:
             return 'Baixa'
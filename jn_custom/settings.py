@@ -64,6 +64,9 @@ DATABASES = {
         'PORT': '1433',
         'USER': 'jota123',
         'PASSWORD': os.environ.get('AZURE_SQL_PASSWORD', '@Senha231'),
+        # Conexões reaproveitadas entre requisições e pelos workers das consultas paralelas
+        'CONN_MAX_AGE': int(os.environ.get('AZURE_SQL_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'driver': 'ODBC Driver 17 for SQL Server',
             'extra_params': (
@@ -133,8 +136,36 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': timedelta(weeks=1),
         'args': ('seu_email@exemplo.com',),  # Substitua pelo seu email
     },
+    'atualizar-atividade-aud': {
+        'task': 'customizacoes.tasks.atualizar_atividade',
+        'schedule': timedelta(minutes=10),
+    },
+    'atualizar-estatisticas-aud': {
+        'task': 'customizacoes.tasks.atualizar_estatisticas',
+        'schedule': timedelta(minutes=10),
+    },
+}
+
+# 'default' é o cache local de cada processo (throttling do DRF e afins). 'historico' é
+# compartilhado entre o web, os workers do Celery e os comandos (mesmo Redis do Celery,
+# outro banco): os baldes do histórico e as diferenças são invalidados ou preenchidos
+# fora do processo web e só valem se todos os processos enxergarem o mesmo cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'historico': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1'),
+    },
 }
 
+# Threads do pool de consultas às tabelas AUD (customizacoes/paralelo.py), e portanto
+# conexões extras por processo; 1 desativa o paralelismo
+AUD_CONSULTAS_PARALELAS = int(os.environ.get('AUD_CONSULTAS_PARALELAS', 3))
+# Tempo limite (segundos) de cada chamada e de cada consulta nas conexões do pool
+AUD_CONSULTAS_TIMEOUT = int(os.environ.get('AUD_CONSULTAS_TIMEOUT', 30))
+
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM')